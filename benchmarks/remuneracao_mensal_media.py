@@ -0,0 +1,59 @@
+"""
+Compara o cálculo da REMUNERACAO_MENSAL_MEDIA linha a linha (df.apply com lambda, como era feito nos domínios)
+com o cálculo vetorizado de commons.remuneracao.
+
+Uso (a partir da raiz do projeto):
+    python -m benchmarks.remuneracao_mensal_media [quantidade de linhas]
+
+"""
+
+import re
+import sys
+from time import perf_counter
+import numpy as np
+import pandas as pd
+from commons.remuneracao import calcular_remuneracao_mensal_media
+
+RUBRICAS_EXCLUIDAS = ["DECIMO TERCEIRO", "13", " FER"]
+
+
+def gerar_dados(quantidade):
+    gerador = np.random.default_rng(42)
+    return pd.DataFrame({
+        'NOME': [f'SERVIDOR {i}' for i in range(quantidade)],
+        'Rubrica': gerador.choice(['VENCIMENTO', 'GRATIFICACAO', 'DECIMO TERCEIRO', 'ADICIONAL FERIAS', 'AUXILIO'], quantidade),
+        'VantagemDesvantagem': gerador.choice(['V', 'D'], quantidade),
+        'SALARIO_TOTAL': gerador.uniform(1500, 40000, quantidade).round(2),
+    })
+
+
+def medir(descricao, funcao):
+    inicio = perf_counter()
+    resultado = funcao()
+    tempo = perf_counter() - inicio
+    print(f"{descricao:<45} {tempo:8.3f}s")
+    return resultado, tempo
+
+
+def executar(quantidade):
+    df = gerar_dados(quantidade)
+    print(f"{quantidade} linhas")
+
+    linha_a_linha, tempo_linha = medir("salário (df.apply)", lambda: df.apply(lambda row: row['SALARIO_TOTAL'] + row['SALARIO_TOTAL']/3/12 + row['SALARIO_TOTAL']/12, axis=1))
+    vetorizado, tempo_vetor = medir("salário (calcular_remuneracao_mensal_media)", lambda: calcular_remuneracao_mensal_media(df, 'SALARIO_TOTAL'))
+    assert np.allclose(linha_a_linha, vetorizado)
+    print(f"{'':<45} {tempo_linha / tempo_vetor:7.0f}x")
+
+    def rubricas_vetorizado():
+        excluidas = df['Rubrica'].astype(str).str.contains('|'.join(map(re.escape, RUBRICAS_EXCLUIDAS)))
+        vantagens = df['VantagemDesvantagem'].astype(str).str.lower() == 'v'
+        return calcular_remuneracao_mensal_media(df, 'SALARIO_TOTAL', condicao=vantagens & ~excluidas)
+
+    linha_a_linha, tempo_linha = medir("rubricas (df.apply)", lambda: df.apply(lambda row: 0 if any(substring in row["Rubrica"] for substring in RUBRICAS_EXCLUIDAS) else (row['SALARIO_TOTAL'] + row['SALARIO_TOTAL']/3/12 + row['SALARIO_TOTAL']/12) if row['VantagemDesvantagem'].lower() == 'v' else 0, axis=1))
+    vetorizado, tempo_vetor = medir("rubricas (calcular_remuneracao_mensal_media)", rubricas_vetorizado)
+    assert np.allclose(linha_a_linha, vetorizado)
+    print(f"{'':<45} {tempo_linha / tempo_vetor:7.0f}x")
+
+
+if __name__ == "__main__":
+    executar(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
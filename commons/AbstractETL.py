@@ -1,10 +1,24 @@
 import os
+import asyncio
 import duckdb
 import pandas as pd
-from commons.utils import log,get_configuration_value,get_traceback_string
+from commons.utils import log,get_configuration_value,get_traceback_string,gravar_json_atomico,sincronizar_arquivo,sincronizar_diretorio
 from commons.ServidorModel import ServidorModel
 from commons.OrgaoModel import OrgaoModel
 from commons.HTTPRequestManager import HTTPRequestManager
+from commons.AsyncHTTPRequestManager import AsyncHTTPRequestManager
+from commons.HTTPMetrics import http_metrics
+from commons.SourceArchive import source_archive
+from commons.Cassette import usar_cassette
+from commons.IngestaoCSV import IngestaoCSV
+from commons.planilhas import ler_xlsx_em_blocos
+from commons.DatabasePool import database_pool
+from commons.DatabaseRegistry import database_registry
+from commons.FreshnessCache import FreshnessCache
+from commons.RebuildLock import obter_rebuild_lock
+from commons.UnifiedIndex import unified_index
+from commons.snapshot_formats import FORMATO_DUCKDB, EXTENSOES, formato_do_dominio, exportar_snapshot
+from commons.name_keys import VERSAO_ESQUEMA, SQL_COLUNAS_CHAVE, SQL_INDICES, normalizar_nome, limite_prefixo, extrair_login, buscar_logins, montar_tabela_logins
 import hashlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
@@ -15,6 +29,8 @@ from duckduckgo_search import DDGS
 from datetime import datetime
 from urllib.parse import urlparse
 import threading
+import contextvars
+from contextlib import contextmanager
 
 # Criar um bloqueio para controlar o acesso à seção crítica
 lock = threading.Lock()
@@ -22,6 +38,7 @@ lock = threading.Lock()
 
 CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
 CACHE_ORGAOS = os.path.join(CACHE_DIRECTORY, 'orgaos_db.json')
+TAMANHO_BLOCO_INGESTAO = int(get_configuration_value("TAMANHO_BLOCO_INGESTAO", valor_padrao=100000))
 
 class AbstractETL:
     """
@@ -34,6 +51,18 @@ class AbstractETL:
         Returns:
             - ServidorModel: Uma instância da classe ServidorModel preenchida ou None se não encontrado.
 
+    - get_remuneracao_batch: Obtém dados de remuneração de vários servidores do domínio em uma única consulta.
+        Parameters:
+            - emails (list of str): Endereços de e-mail pertencentes ao domínio implementado.
+        Returns:
+            - list of list of ServidorModel: Servidores encontrados para cada email, na ordem de entrada.
+
+    - reprocessar_do_arquivo: Reconstrói o banco do domínio a partir das fontes arquivadas, sem acessar os portais.
+        Parameters:
+            - guids_mais_recentes (list): Identificadores da fonte de dados a reprocessar.
+        Returns:
+            - bool: True se o banco foi reconstruído.
+
     - print_api: Imprime uma mensagem formatada com o nome do domínio.
         Parameters:
             - msg (str): Mensagem a ser impressa.
@@ -56,7 +85,8 @@ class AbstractETL:
         GOOGLE=3
 
 
-    def __init__(self, unidade_federativa, dominio, portal_remuneracoes_url, fn_obter_link_mais_recente, fn_ler_fonte_de_dados_e_transformar_em_dataframe):
+    def __init__(self, unidade_federativa, dominio, portal_remuneracoes_url, fn_obter_link_mais_recente, fn_ler_fonte_de_dados_e_transformar_em_dataframe,
+                 fn_obter_link_mais_recente_async=None, fn_ler_fonte_de_dados_async=None, leituras_simultaneas=1):
 
         # Criar o cache de orgaos caso não exista
         if not os.path.isfile(CACHE_ORGAOS):
@@ -89,7 +119,15 @@ class AbstractETL:
         self.portal_remuneracoes_url = portal_remuneracoes_url
         self.fn_obter_link_mais_recente = fn_obter_link_mais_recente
         self.fn_ler_fonte_de_dados_e_transformar_em_dataframe = fn_ler_fonte_de_dados_e_transformar_em_dataframe
-        self.http_client = HTTPRequestManager(verify_ssl=False)
+        self.http_client = HTTPRequestManager(verify_ssl=False, dominio=dominio)
+        self.async_http_client = AsyncHTTPRequestManager(verify_ssl=False, dominio=dominio)
+        # Corrotinas opcionais usadas por arun no lugar das funções síncronas equivalentes
+        self.fn_obter_link_mais_recente_async = fn_obter_link_mais_recente_async
+        self.fn_ler_fonte_de_dados_async = fn_ler_fonte_de_dados_async
+        # Quantidade de fontes (guids) lidas ao mesmo tempo na reconstrução do banco
+        self.leituras_simultaneas = leituras_simultaneas
+        self.freshness_cache = FreshnessCache(dominio)
+        self.formato_base = formato_do_dominio(dominio)
 
     
     def _searching_web_scrapper(self, orgao, search_engine_enum):
@@ -135,42 +173,11 @@ class AbstractETL:
             return f"Erro ao consultar o {search_domain}: {e}"
         
 
-    def _get_databases(self):
-        diretorio = CACHE_DIRECTORY
-        extensao = ".db"
-
-        # Listar todos os arquivos no diretório
-        arquivos_no_diretorio = os.listdir(diretorio)
-
-        # Filtrar apenas os arquivos com a extensão desejada
-        arquivos_db = [arquivo for arquivo in arquivos_no_diretorio if arquivo.endswith(extensao) and "-" in arquivo]
-        databases = {}
-        for arquivo in arquivos_db:
-            dominio = arquivo.split('-')[0]
-            id = arquivo.split('-', 1)[1].split('.')[0]
-            databases[dominio] = {"hash_arquivo": id.replace('-',''), "lista_servidores": os.path.join(diretorio, arquivo)}    
-        
-        return databases
-    
-    
     def _get_domain_db(self):
         '''
         Retorna o banco de servidores associado ao domínio corrente
         '''
-        prefixo_arquivo = f'{self.dominio}-'
-
-        # Listar todos os arquivos no diretório
-        arquivos_no_diretorio = sorted(os.listdir(CACHE_DIRECTORY), key=lambda arquivo: os.path.getmtime(os.path.join(CACHE_DIRECTORY, arquivo)), reverse=True)
-
-        caminho_arquivo=''
-
-        # Iterar sobre os arquivos e excluir os indesejados
-        for arquivo in arquivos_no_diretorio:
-            if arquivo.startswith(prefixo_arquivo) and arquivo.endswith(".db"):
-                caminho_arquivo = os.path.join(CACHE_DIRECTORY, arquivo)
-                break
-        
-        return caminho_arquivo
+        return self._get_domain_entry().get("lista_servidores", '')
     
     
     def _check_mandatory_columns(self, df_servidores):
@@ -196,27 +203,270 @@ class AbstractETL:
         pass
 
 
+    def obter_links_mais_recentes(self):
+        '''
+        Obtém os identificadores da fonte de dados mais recente, consultando o portal apenas quando o cache de validade expirou.
+
+        Returns:
+            - list: Identificadores retornados por fn_obter_link_mais_recente.
+        '''
+        guids_mais_recentes = self.freshness_cache.obter()
+        if guids_mais_recentes is None:
+            try:
+                guids_mais_recentes = self.fn_obter_link_mais_recente()
+            except Exception as e:
+                self.print_api("Erro ao consultar o portal", e)
+                guids_mais_recentes = None
+            guids_mais_recentes = self._registrar_links(guids_mais_recentes)
+        return guids_mais_recentes
+
+
+    def _registrar_links(self, guids_mais_recentes):
+        '''
+        Registra os identificadores obtidos do portal ou, se o portal estiver indisponível, recorre aos últimos
+        identificadores conhecidos para que a geração corrente do banco continue sendo servida.
+        '''
+        if isinstance(guids_mais_recentes, list) and guids_mais_recentes:
+            self.freshness_cache.registrar(guids_mais_recentes)
+            return guids_mais_recentes
+
+        ultimos_guids = self.freshness_cache.obter_ultimo()
+        if ultimos_guids is not None:
+            self.print_api("Portal indisponível, utilizando a última fonte de dados conhecida.")
+            return ultimos_guids
+        return guids_mais_recentes
+
+
+    def invalidar_cache_links(self):
+        '''
+        Descarta os identificadores em cache, forçando a consulta ao portal na próxima requisição.
+        '''
+        self.freshness_cache.invalidar()
+
+
+    def _preparar_database(self):
+        '''
+        Garante que o banco do domínio corresponda à fonte de dados mais recente, reconstruindo-o se necessário.
+
+        Returns:
+            - bool: True se o banco está pronto para consulta.
+        '''
+        guids_mais_recentes = self.obter_links_mais_recentes()
+        if not isinstance(guids_mais_recentes, list):
+            self.print_api("fn_obter_link_mais_recente precisa retornar uma lista []")
+            return False
+
+        database_path = self.get_database_by_link(guids_mais_recentes)
+        if not os.path.exists(database_path):
+            self.reconstruir_database(guids_mais_recentes)
+        return True
+
+
     def run(self, email):
-        guids_mais_recentes = self.fn_obter_link_mais_recente()
-        if isinstance(guids_mais_recentes, list):
-            database_path = self.get_database_by_link(guids_mais_recentes)
-            servidores = pd.DataFrame()
-            
-            if not os.path.exists(database_path):                
-                # Itera sobre cada guid mais recente e executa a rotina
-                for guid in guids_mais_recentes:
-                    if servidores.empty :
-                        servidores = self.fn_ler_fonte_de_dados_e_transformar_em_dataframe([guid])
-                    else:
-                        servidores = pd.concat([servidores, self.fn_ler_fonte_de_dados_e_transformar_em_dataframe([guid])], ignore_index=True)
-                self.add_to_database(guids_mais_recentes, servidores)   
-            servidor = self.filter_by_email_login(email)
-            for item in servidor:
-                item.email = email    
-            return servidor
-        else:
+        if not self._preparar_database():
+            return None
+        servidor = self.filter_by_email_login(email)
+        for item in servidor:
+            item.email = email    
+        return servidor
+
+
+    async def aobter_links_mais_recentes(self):
+        '''
+        Versão assíncrona de obter_links_mais_recentes, usa fn_obter_link_mais_recente_async quando disponível.
+        '''
+        guids_mais_recentes = self.freshness_cache.obter()
+        if guids_mais_recentes is None:
+            try:
+                if self.fn_obter_link_mais_recente_async is not None:
+                    guids_mais_recentes = await self.fn_obter_link_mais_recente_async()
+                else:
+                    guids_mais_recentes = await asyncio.to_thread(self.fn_obter_link_mais_recente)
+            except Exception as e:
+                self.print_api("Erro ao consultar o portal", e)
+                guids_mais_recentes = None
+            guids_mais_recentes = self._registrar_links(guids_mais_recentes)
+        return guids_mais_recentes
+
+
+    async def arun(self, email):
+        '''
+        Versão assíncrona de run. As etapas de rede são executadas no event loop corrente e as etapas
+        bloqueantes (carga e consulta do banco) em threads, sem bloquear o loop.
+
+        Parameters:
+            - email (str): Endereço de e-mail pertencente ao domínio implementado.
+
+        Returns:
+            - list of ServidorModel: Servidores encontrados ou None se a fonte de dados não pôde ser verificada.
+        '''
+        guids_mais_recentes = await self.aobter_links_mais_recentes()
+        if not isinstance(guids_mais_recentes, list):
             self.print_api("fn_obter_link_mais_recente precisa retornar uma lista []")
             return None
+
+        if not os.path.exists(self.get_database_by_link(guids_mais_recentes)):
+            await asyncio.to_thread(self.reconstruir_database, guids_mais_recentes, asyncio.get_running_loop())
+
+        servidor = await asyncio.to_thread(self.filter_by_email_login, email)
+        for item in servidor:
+            item.email = email
+        return servidor
+
+
+    def get_remuneracao_batch(self, emails):
+        '''
+        Obtém os dados de remuneração de vários servidores do domínio de uma só vez.
+
+        A fonte de dados é verificada uma única vez e todos os emails são resolvidos em uma única consulta ao banco.
+
+        Parameters:
+            - emails (list of str): Endereços de e-mail pertencentes ao domínio implementado.
+
+        Returns:
+            - list of list of ServidorModel: Servidores encontrados para cada email, na ordem de entrada, ou None se a fonte de dados não pôde ser verificada.
+        '''
+        if not self._preparar_database():
+            return None
+        return self.filter_by_email_login_batch(emails)
+
+
+    def _ler_fontes_de_dados(self, guids_mais_recentes, loop=None):
+        '''
+        Itera sobre cada guid mais recente produzindo os blocos de servidores lidos da fonte.
+        As funções de leitura podem retornar um DataFrame completo, um gerador de DataFrames (leitura em blocos) ou uma
+        IngestaoCSV, carregada diretamente pelo DuckDB.
+        Quando chamada a partir de arun (loop informado), a leitura assíncrona do domínio é executada no event loop de origem.
+        Com leituras_simultaneas maior que 1 as fontes são lidas concorrentemente, em threads.
+        '''
+        def ler(guid):
+            if loop is not None and self.fn_ler_fonte_de_dados_async is not None:
+                return asyncio.run_coroutine_threadsafe(self.fn_ler_fonte_de_dados_async([guid]), loop).result()
+            return self.fn_ler_fonte_de_dados_e_transformar_em_dataframe([guid])
+
+        if self.leituras_simultaneas > 1 and len(guids_mais_recentes) > 1:
+            # As fontes são lidas em paralelo e entregues na ordem dos guids, a carga de uma sobrepõe a leitura das seguintes
+            with ThreadPoolExecutor(max_workers=min(self.leituras_simultaneas, len(guids_mais_recentes)), thread_name_prefix='leitura-fontes') as executor:
+                # Cada leitura segue o contexto da reconstrução (ex.: gravação das fontes em uso)
+                leituras = [executor.submit(contextvars.copy_context().run, ler, guid) for guid in guids_mais_recentes]
+                for leitura in leituras:
+                    yield from self._blocos_de_servidores(leitura.result())
+        else:
+            for guid in guids_mais_recentes:
+                yield from self._blocos_de_servidores(ler(guid))
+
+
+    def _blocos_de_servidores(self, servidores):
+        if servidores is None or isinstance(servidores, (pd.DataFrame, IngestaoCSV)):
+            yield servidores
+        else:
+            yield from servidores
+
+
+    def ler_xlsx_em_blocos(self, url, colunas=None, fn_filtro=None, numericas=None, decimal=',', tamanho_bloco=None, headers=None, planilha=0):
+        '''
+        Baixa uma planilha Excel para o disco e a lê em blocos, em streaming sobre o XML da planilha (ver commons.planilhas).
+
+        Parameters:
+            - url (str): URL da planilha.
+            - colunas (list of int): Posições das colunas lidas. O padrão é None (todas).
+            - fn_filtro (function): Recebe os valores da linha (na ordem de colunas) e retorna se ela é mantida. O padrão é None.
+            - numericas (list of int): Posições das colunas convertidas para float, aceitando textos como "1.234,56". O padrão é None.
+            - decimal (str): Separador decimal dos valores numéricos em texto. O padrão é ','.
+            - tamanho_bloco (int): Quantidade de linhas por bloco. O padrão é TAMANHO_BLOCO_INGESTAO do app.conf.
+            - headers (dict): Cabeçalhos da requisição.
+            - planilha (int or str): Índice ou nome da planilha. O padrão é 0.
+
+        Returns:
+            - generator of DataFrame: Blocos da planilha.
+        '''
+        caminho_planilha = self.http_client.download(url, headers=headers)
+        if caminho_planilha is None:
+            raise IOError(f"Falha no download de {url}")
+        try:
+            yield from ler_xlsx_em_blocos(caminho_planilha, tamanho_bloco or TAMANHO_BLOCO_INGESTAO, planilha=planilha, colunas=colunas,
+                                          fn_filtro=fn_filtro, numericas=numericas, decimal=decimal)
+        finally:
+            os.remove(caminho_planilha)
+
+
+    def reconstruir_database(self, guids_mais_recentes, loop=None):
+        """
+        Reconstrói o banco de servidores do domínio garantindo que apenas um chamador (thread ou processo) faça o download e a carga.
+
+        Chamadores concorrentes aguardam o término da reconstrução em andamento ou, se houver uma geração anterior do banco,
+        seguem consultando a geração anterior sem aguardar.
+
+        Parameters:
+            - guids_mais_recentes (list): Identificadores da fonte de dados mais recente.
+            - loop (AbstractEventLoop): Event loop de origem quando chamada por arun, usado pela leitura assíncrona. O padrão é None.
+        """
+        rebuild_lock = obter_rebuild_lock(self.dominio)
+
+        if not rebuild_lock.acquire(bloquear=False):
+            if self._get_domain_db():
+                self.print_api("Reconstrução do banco em andamento, consultando a geração anterior.")
+                return
+            rebuild_lock.acquire()
+
+        try:
+            # Outro chamador pode ter concluído a reconstrução enquanto este aguardava o bloqueio
+            if os.path.exists(self.get_database_by_link(guids_mais_recentes)):
+                return
+
+            # Transferências feitas durante a reconstrução, para distinguir o tempo de rede do tempo de processamento
+            metricas_anteriores = http_metrics.totais(self.dominio)
+            inicio = datetime.now()
+            try:
+                # As fontes lidas são arquivadas, quando habilitado, para permitir o reprocessamento sem novo download
+                gravacao = source_archive.gravacao(self.dominio, guids_mais_recentes) if source_archive.habilitado(self.dominio) else None
+                with self._gravacao_das_fontes(gravacao):
+                    self.add_to_database(guids_mais_recentes, self._ler_fontes_de_dados(guids_mais_recentes, loop))
+                if gravacao is not None:
+                    source_archive.aplicar_retencao(self.dominio)
+            finally:
+                self.log(f"Reconstrução em {(datetime.now() - inicio).total_seconds():.1f}s. {http_metrics.resumo(self.dominio, desde=metricas_anteriores)}")
+        finally:
+            rebuild_lock.release()
+
+
+    def reprocessar_do_arquivo(self, guids_mais_recentes=None):
+        """
+        Reconstrói o banco do domínio a partir das fontes arquivadas (SourceArchive), sem acessar os portais.
+        Permite aplicar alterações nas transformações (ex.: cálculo da REMUNERACAO_MENSAL_MEDIA) sem novo download.
+
+        Parameters:
+            - guids_mais_recentes (list): Identificadores da fonte de dados a reprocessar. O padrão são os últimos obtidos do portal.
+
+        Returns:
+            - bool: True se o banco foi reconstruído, False se não há fontes arquivadas para os identificadores.
+        """
+        guids_mais_recentes = guids_mais_recentes or self.freshness_cache.obter_ultimo()
+        if not guids_mais_recentes or not source_archive.possui(self.dominio, guids_mais_recentes):
+            self.print_api("Nenhuma fonte de dados arquivada para reprocessamento.")
+            return False
+
+        rebuild_lock = obter_rebuild_lock(self.dominio)
+        rebuild_lock.acquire()
+        try:
+            with self._gravacao_das_fontes(source_archive.reproducao(self.dominio, guids_mais_recentes)):
+                self.add_to_database(guids_mais_recentes, self._ler_fontes_de_dados(guids_mais_recentes))
+        finally:
+            rebuild_lock.release()
+        return True
+
+
+    @contextmanager
+    def _gravacao_das_fontes(self, gravacao):
+        '''
+        Direciona para a gravação informada (Cassette) as requisições feitas pela reconstrução enquanto o bloco é executado.
+        A gravação vale apenas para o contexto de execução da reconstrução, consultas simultâneas do domínio não são afetadas.
+        '''
+        if gravacao is None:
+            yield
+            return
+        with usar_cassette(gravacao):
+            yield
         
 
     def health_check(self): 
@@ -228,7 +478,7 @@ class AbstractETL:
         """
         #response = self.http_client.get(self.portal_remuneracoes_url, max_attempts=3)
         #portal_ativo = response.status_code == 200  
-        domain_entry = self._get_databases().get(self.dominio, {})
+        domain_entry = self._get_domain_entry()
         detalhes_db = self.get_file_metadata(domain_entry.get("lista_servidores")) 
         dias_atualizacao = (datetime.now() - detalhes_db.get("data")).days
         return dias_atualizacao <= 31 # and portal_ativo
@@ -281,51 +531,162 @@ class AbstractETL:
         log("[" + self.dominio + "] "+msg)    
 
 
+    def _carregar_lista_servidores(self, con, servidores):
+        '''
+        Carrega os servidores, bloco a bloco, na tabela staging.lista_servidores.
+
+        Parameters:
+            - con (DuckDBPyConnection): Conexão com o banco auxiliar anexado como "staging".
+            - servidores (DataFrame, IngestaoCSV or iterable of both): Servidores lidos da fonte de dados.
+        '''
+        if isinstance(servidores, (pd.DataFrame, IngestaoCSV)):
+            servidores = [servidores]
+
+        tabela_criada = False
+        for bloco in servidores:
+            # Fontes que falharam na leitura retornam None e não contribuem com registros
+            if bloco is None:
+                continue
+            if isinstance(bloco, IngestaoCSV):
+                # Leitura, transformação e carga executadas pelo DuckDB em uma única consulta
+                try:
+                    consulta, parametros = bloco.preparar(con)
+                    self._check_mandatory_columns([coluna[0] for coluna in con.execute(f'SELECT * FROM ({consulta}) LIMIT 0', parametros).description])
+                    if not tabela_criada:
+                        con.execute(f'CREATE TABLE staging.lista_servidores AS {consulta}', parametros)
+                        tabela_criada = True
+                    else:
+                        con.execute(f'INSERT INTO staging.lista_servidores BY NAME {consulta}', parametros)
+                finally:
+                    bloco.liberar(con)
+                continue
+            self._check_mandatory_columns(bloco)
+            con.register('bloco_servidores', bloco)
+            if not tabela_criada:
+                con.execute('CREATE TABLE staging.lista_servidores AS SELECT * FROM bloco_servidores')
+                tabela_criada = True
+            else:
+                con.execute('INSERT INTO staging.lista_servidores BY NAME SELECT * FROM bloco_servidores')
+            con.unregister('bloco_servidores')
+
+        if not tabela_criada:
+            raise ValueError("Nenhum servidor retornado pela fonte de dados.")
+
+
     def add_to_database(self, links, servidores):
         """
         Adiciona informações ao banco de dados global associado ao domínio.
 
         Parameters:
             - links (str or list of str): Links relacionados à remuneração dos servidores, serão os identificadores da fonte de dados mais recente.
-            - servidores (list): Lista de servidores a serem associados ao domínio no banco de dados.
+            - servidores (DataFrame or iterable of DataFrame): Servidores a serem associados ao domínio no banco de dados. 
+              Pode ser um único DataFrame ou um iterável de blocos (DataFrames) produzidos durante a leitura da fonte.
+              Os blocos também podem ser IngestaoCSV, carregadas diretamente pelo DuckDB.
         """
-        self._check_mandatory_columns(servidores)
-
         self.hash_arquivo = self.get_hash_from_links(links)
 
         prefixo_arquivo = f'{self.dominio}-'
-        arquivo_atual = f'{self.hash_arquivo}.db'
+        arquivo_atual = f'{prefixo_arquivo}{self.hash_arquivo}{EXTENSOES[self.formato_base]}'
+        caminho_atual = os.path.join(CACHE_DIRECTORY, arquivo_atual)
+
+        # A nova geração é construída em arquivos temporários e só é publicada depois de completa
+        caminho_temporario = os.path.join(CACHE_DIRECTORY, f'{prefixo_arquivo}{self.hash_arquivo}.building')
+        caminho_staging = os.path.join(CACHE_DIRECTORY, f'{prefixo_arquivo}{self.hash_arquivo}.staging')
+        caminho_snapshot = os.path.join(CACHE_DIRECTORY, f'{prefixo_arquivo}{self.hash_arquivo}.snapshot')
+        for caminho in (caminho_temporario, caminho_staging, caminho_snapshot):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        caminho_particao = None
 
-        con = duckdb.connect(f'{CACHE_DIRECTORY}\\{prefixo_arquivo}{arquivo_atual}')
         try:
-            con.register('lista_servidores', servidores)
-            con.execute('DROP TABLE IF EXISTS servidores')
-            con.execute('CREATE TABLE servidores AS SELECT *, ROW_NUMBER() OVER () AS _ID FROM lista_servidores WITH NO DATA')
-            
-            digest_result = con.execute("SELECT DOMINIO, COUNT(*) FROM servidores GROUP BY DOMINIO").fetchall()
-            digest = {
-                "uf": f"{self.uf}",
-                "portal":f"{self.portal_remuneracoes_url}",
-                "tld": f"{self.dominio}",
-                "subs": [{"d": row[0], "c": row[1]} for row in digest_result]
+            con = duckdb.connect(caminho_temporario)
+            try:
+                # Os blocos são acumulados em um banco auxiliar em disco, mantendo a memória limitada ao tamanho de um bloco
+                con.execute(f"ATTACH '{caminho_staging}' AS staging")
+                self._carregar_lista_servidores(con, servidores)
+
+                con.create_function('normalizar_nome', normalizar_nome, ['VARCHAR'], 'VARCHAR')
+
+                # Grava as colunas de busca já normalizadas, ordenadas para que as buscas por prefixo descartem blocos inteiros
+                con.execute(f'''CREATE TABLE servidores AS 
+                                SELECT *, {SQL_COLUNAS_CHAVE} 
+                                FROM (SELECT *, ROW_NUMBER() OVER () AS _ID, normalizar_nome(NOME) AS NOME_NORMALIZADO FROM staging.lista_servidores) 
+                                ORDER BY NOME_SEM_ESPACOS''')
+                con.execute('DETACH staging')
+                for sql_indice in SQL_INDICES:
+                    con.execute(sql_indice)
+                
+                digest_result = con.execute("SELECT DOMINIO, COUNT(*) FROM servidores GROUP BY DOMINIO").fetchall()
+                digest = {
+                    "uf": f"{self.uf}",
+                    "portal":f"{self.portal_remuneracoes_url}",
+                    "tld": f"{self.dominio}",
+                    "subs": [{"d": row[0], "c": row[1]} for row in digest_result]
+                }
+                con.execute('CHECKPOINT')
+
+                # Nos formatos colunares o banco DuckDB é apenas o meio de construção, o arquivo publicado é o snapshot
+                if self.formato_base != FORMATO_DUCKDB:
+                    exportar_snapshot(con, self.formato_base, caminho_snapshot)
+
+                # Prepara a partição do domínio no índice consolidado, quando habilitado, publicada depois do manifesto
+                if unified_index.habilitado:
+                    try:
+                        caminho_particao = unified_index.preparar(self.dominio, con)
+                    except Exception as e:
+                        self.print_api("Erro ao atualizar o índice unificado", e)
+            finally:    
+                con.close()
+
+            # Garante que o banco esteja em disco antes de torná-lo visível aos leitores
+            caminho_publicado = caminho_temporario if self.formato_base == FORMATO_DUCKDB else caminho_snapshot
+            sincronizar_arquivo(caminho_publicado)
+            os.replace(caminho_publicado, caminho_atual)
+            sincronizar_diretorio(CACHE_DIRECTORY)
+
+            manifesto_anterior = database_registry.ler_manifesto(self.dominio) or {}
+            manifesto = {
+                "hash_arquivo": self.hash_arquivo,
+                "lista_servidores": arquivo_atual,
+                "formato": self.formato_base,
+                "geracao": manifesto_anterior.get("geracao", 0) + 1,
+                "data": datetime.now().isoformat()
             }
+            database_registry.publicar(self.dominio, manifesto)
+
+            # A partição é associada à geração recém publicada, até lá as buscas do domínio não usam o índice consolidado
+            if caminho_particao is not None:
+                try:
+                    unified_index.publicar(self.dominio, caminho_particao, manifesto)
+                except Exception as e:
+                    self.print_api("Erro ao atualizar o índice unificado", e)
+        finally:
+            for caminho in (caminho_temporario, caminho_staging, caminho_snapshot, caminho_particao):
+                if caminho is not None and os.path.exists(caminho):
+                    os.remove(caminho)
 
-            # Salvando o digest no arquivo
-            with open(f'{CACHE_DIRECTORY}\\{self.dominio}.digest', "w") as arquivo:
-                json.dump(digest, arquivo)
-        finally:    
-            con.close()
+        # Salvando o digest no arquivo
+        gravar_json_atomico(os.path.join(CACHE_DIRECTORY, f'{self.dominio}.digest'), digest)
 
-        # Listar todos os arquivos no diretório
-        arquivos_no_diretorio = os.listdir(CACHE_DIRECTORY)
+        # Descarta a conexão de leitura mantida para a geração anterior do banco
+        database_pool.invalidar(self.dominio)
 
-        # Iterar sobre os arquivos e excluir os indesejados
-        for arquivo in arquivos_no_diretorio:
-            if arquivo.lower().startswith(prefixo_arquivo.lower()) and arquivo.lower().endswith(".db") and not arquivo.lower().endswith(arquivo_atual.lower()) and not arquivo.lower().endswith(".wal"):
-                caminho_arquivo = os.path.join(CACHE_DIRECTORY, arquivo)
-                os.remove(caminho_arquivo)
+        # As gerações anteriores são removidas assim que os leitores em andamento as liberarem
+        for arquivo in os.listdir(CACHE_DIRECTORY):
+            if arquivo.lower().startswith(prefixo_arquivo.lower()) and arquivo.lower().endswith(tuple(EXTENSOES.values())) and arquivo.lower() != arquivo_atual.lower():
+                database_pool.aposentar(os.path.join(CACHE_DIRECTORY, arquivo))
         
     
+    def _get_domain_entry(self):
+        '''
+        Retorna a geração corrente do banco do domínio, mantida pelo registro compartilhado do processo.
+
+        Returns:
+            - dict: {"hash_arquivo": str, "lista_servidores": caminho do banco} ou dicionário vazio se não houver banco.
+        '''
+        return database_registry.obter(self.dominio)
+
+
     def filter_by_email_login(self, email):
         '''
         Faz a filtragem dos objetos ServidorCSV que são aderentes ao email passado.
@@ -338,17 +699,26 @@ class AbstractETL:
         '''
 
         caminho_arquivo = self._get_domain_db()
-        dominio = email.split("@")[1]
-        nome, sobrenome = email.split("@")[0].split(".")
-
-        con = duckdb.connect(caminho_arquivo)
-        try:
-
-            query = "SELECT DISTINCT ORGAO, NOME, REMUNERACAO_MENSAL_MEDIA, DOMINIO, SIGLA FROM servidores WHERE (LOWER(NOME) like LOWER(?) OR LOWER(REPLACE(NOME,' ','')) like LOWER(?)) AND (LOWER(concat(SIGLA,'.',DOMINIO)) LIKE LOWER(?) OR DOMINIO LIKE LOWER(?))"
-            params = [f'%{nome}%{sobrenome}%', f'{nome}%{sobrenome}%', f'%{dominio}', f'%{dominio}']
+        nome, sobrenome, dominio = extrair_login(email)
+
+        with database_pool.cursor(self.dominio, caminho_arquivo) as cursor:
+
+            # Nome e sobrenome em sequência em qualquer posição do nome, ou o login como prefixo do nome sem espaços (busca por faixa)
+            query = """SELECT DISTINCT ORGAO, NOME, REMUNERACAO_MENSAL_MEDIA, DOMINIO, SIGLA FROM (
+                            SELECT * FROM servidores WHERE NOME_NORMALIZADO LIKE $sequencia
+                            UNION ALL
+                            SELECT * FROM servidores WHERE NOME_SEM_ESPACOS >= $nome AND NOME_SEM_ESPACOS < $limite_nome AND NOME_SEM_ESPACOS LIKE $prefixo_login
+                       ) WHERE SUBDOMINIO LIKE $dominio OR LOWER(DOMINIO) LIKE $dominio"""
+            params = {
+                'nome': nome,
+                'sequencia': f'%{nome}%{sobrenome}%',
+                'limite_nome': limite_prefixo(nome),
+                'prefixo_login': f'{nome}%{sobrenome}%',
+                'dominio': f'%{dominio}'
+            }
 
             # Executar a consulta
-            cursor = con.execute(query, params)
+            cursor.execute(query, params)
 
             # Lista para armazenar objetos ServidorModel
             lista_servidores = []
@@ -358,19 +728,42 @@ class AbstractETL:
 
             # Iterar sobre os resultados e criar instâncias da classe ServidorModel
             for row in rows:
-                orgao, nome, valor, dominio, sigla = row
-                servidor = ServidorModel(orgao, nome, valor, sigla+'.'+dominio if sigla not in dominio else dominio)
-                lista_servidores.append(servidor)
-
-        finally:
-            con.close()
+                lista_servidores.append(ServidorModel.from_registro(*row))
         
         return lista_servidores
     
 
+    def filter_by_email_login_batch(self, emails):
+        '''
+        Faz a filtragem dos servidores aderentes a cada um dos emails passados, em uma única consulta.
+
+        Parameters:
+            - emails (list of str): Emails dos servidores para busca.
+
+        Returns:
+            - list of list of ServidorModel: Servidores encontrados para cada email, na ordem de entrada.
+        '''
+        resultado = [[] for _ in emails]
+
+        logins = montar_tabela_logins(emails)
+        if logins.empty:
+            return resultado
+
+        with database_pool.cursor(self.dominio, self._get_domain_db()) as cursor:
+            # Os logins são juntados à tabela servidores, resolvendo todos os emails em uma única consulta
+            rows = buscar_logins(cursor, logins)
+
+        for posicao, *registro in rows:
+            servidor = ServidorModel.from_registro(*registro)
+            servidor.email = emails[posicao]
+            resultado[posicao].append(servidor)
+
+        return resultado
+
+
     def get_subdomains(self):
         try:
-            with open(f'{CACHE_DIRECTORY}\\{self.dominio}.digest', "r") as arquivo:
+            with open(os.path.join(CACHE_DIRECTORY, f'{self.dominio}.digest'), "r") as arquivo:
                 digest = json.load(arquivo)
 
             digest["refreshed"] = self.health_check() 
@@ -391,7 +784,7 @@ class AbstractETL:
             - str: Endereço do banco de servidores, ou string vazia se não existir.
         """
         # Obtém a entrada associada ao domínio, retorna False se não existir
-        domain_entry = self._get_databases().get(self.dominio, {})
+        domain_entry = self._get_domain_entry()
 
         # Verifica se exite hash_arquivo
         link_presente = domain_entry.get("hash_arquivo", '').strip() == self.get_hash_from_links(links).strip() 
@@ -422,11 +815,33 @@ class AbstractETL:
 
         string_concatenada = '_'.join(map(lambda x: '_'.join(map(str, x)), links)).lower()
 
+        # A versão do esquema compõe o hash para que bancos gerados com colunas antigas sejam reconstruídos
+        string_concatenada = f'v{VERSAO_ESQUEMA}_{string_concatenada}'
+
+        # Bancos publicados em formato colunar têm hash próprio, de forma que a troca de formato no app.conf force a reconstrução
+        if self.formato_base != FORMATO_DUCKDB:
+            string_concatenada = f'{self.formato_base}_{string_concatenada}'
+
         hash_resultado = str(hashlib.sha256(string_concatenada.encode()).hexdigest())
 
         return hash_resultado   
     
 
+    def obter_tabela_orgaos(self, orgaos):
+        '''
+        Associa os órgãos encontrados na fonte de dados aos respectivos domínios (get_cache_domains), no formato da tabela
+        orgaos das IngestaoCSV.
+
+        Parameters:
+            - orgaos (list of str): Lista dos nomes de órgãos.
+
+        Returns:
+            - DataFrame: Colunas ORGAO, SIGLA e DOMINIO.
+        '''
+        domains = self.get_cache_domains(orgaos)
+        return pd.DataFrame([(domain.nome, domain.sigla, domain.dominio) for domain in domains], columns=['ORGAO', 'SIGLA', 'DOMINIO'])
+
+
     def get_cache_domains(self, orgaos=None):
         '''
         Durante as extrações, recebe a lista de órgãos encontrados nos arquivos CSV associa com os respectivos domínios, salva em cache o resultado retornando todos os valores disponíveis
@@ -0,0 +1,161 @@
+import asyncio
+import warnings
+import contextvars
+import weakref
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from commons.HTTPRequestManager import HTTPRequestManager
+from commons.HostPolicy import tempo_backoff
+from commons.utils import get_configuration_value
+
+# Número padrão de requisições simultâneas por gerenciador
+CONCORRENCIA_PADRAO = 10
+
+# Número padrão de threads do pool compartilhado por todos os gerenciadores do processo
+THREADS_PADRAO = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _obter_executor():
+    """
+    Retorna o pool de threads que executa as requisições de todos os gerenciadores assíncronos do processo, criado no
+    primeiro uso. O tamanho é lido do app.conf pela chave HTTP_THREADS_ASYNC ou, na ausência dela, 32.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=int(get_configuration_value("HTTP_THREADS_ASYNC", valor_padrao=THREADS_PADRAO)), thread_name_prefix='http-async')
+        return _executor
+
+
+def executar_corrotina(corrotina):
+    """
+    Executa uma corrotina a partir de código síncrono e retorna o seu resultado.
+
+    Só pode ser usada fora de um event loop em execução (a corrotina é executada com asyncio.run). Dentro de uma
+    corrotina, esperar o resultado de forma síncrona bloquearia o event loop do chamador, e RuntimeError é levantado:
+    o chamador deve usar a variante assíncrona (ex.: AbstractETL.arun, AsyncHTTPRequestManager.get ou os métodos
+    *_async dos domínios).
+
+    Parâmetros:
+        corrotina (coroutine): Corrotina a ser executada.
+
+    Retorna:
+        O resultado da corrotina. Exceções levantadas pela corrotina são propagadas.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(corrotina)
+
+    # A corrotina não será executada, é fechada para não gerar o aviso de corrotina nunca aguardada
+    corrotina.close()
+    raise RuntimeError("Método síncrono chamado de dentro de um event loop em execução, use a variante assíncrona "
+                       "(ex.: arun, get do AsyncHTTPRequestManager ou os métodos *_async do domínio).")
+
+
+class AsyncHTTPRequestManager:
+    def __init__(self, verify_ssl=True, max_concorrencia=None, dominio=None):
+        """
+        Inicializa o gerenciador assíncrono de requisições HTTP, com a mesma semântica de get/post/head,
+        tentativas (backoff exponencial, limite de taxa e disjuntor por host) e cabeçalhos do HTTPRequestManager.
+
+        As requisições são coordenadas por um único event loop e executadas pelo pool de threads compartilhado pelos
+        gerenciadores do processo, reaproveitando as sessões keep-alive compartilhadas por host. Enquanto uma requisição
+        aguarda a próxima tentativa, o event loop segue atendendo as demais.
+
+        Parâmetros:
+            verify_ssl (bool): Determina se a validação de SSL deve ser realizada. O padrão é True.
+            max_concorrencia (int): Número máximo de requisições simultâneas. O padrão é lido do app.conf
+                                    pela chave HTTP_CONCORRENCIA_ASYNC ou, na ausência dela, 10.
+            dominio (str): Domínio que utiliza o gerenciador, identifica as requisições nas métricas (HTTPMetrics). O padrão é None.
+        """
+        self.http_client = HTTPRequestManager(verify_ssl=verify_ssl, dominio=dominio)
+        self.max_concorrencia = max_concorrencia or int(get_configuration_value("HTTP_CONCORRENCIA_ASYNC", valor_padrao=CONCORRENCIA_PADRAO))
+        self._semaforos = weakref.WeakKeyDictionary()
+
+    def _semaforo(self):
+        # Um semáforo por event loop, pois primitivas do asyncio não podem ser compartilhadas entre loops
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaforos:
+            self._semaforos[loop] = asyncio.Semaphore(self.max_concorrencia)
+        return self._semaforos[loop]
+
+    async def _requisitar(self, metodo, url, max_attempts, expected_status_code, **parametros):
+        """
+        Realiza a solicitação HTTP sem bloquear o event loop, repetindo-a até max_attempts vezes.
+
+        Retorna:
+            response (Response): O objeto de resposta da última tentativa, ou None se nenhuma resposta foi obtida.
+        """
+        loop = asyncio.get_running_loop()
+        funcao = getattr(self.http_client, metodo)
+        response = None
+        attempt = 0
+        while attempt < max_attempts:
+            async with self._semaforo():
+                # run_in_executor não propaga o contexto, a requisição é executada no contexto da tarefa (ex.: gravação das fontes)
+                contexto = contextvars.copy_context()
+                response = await loop.run_in_executor(_obter_executor(), lambda: contexto.run(funcao, url, max_attempts=1, expected_status_code=expected_status_code, **parametros))
+            if response is not None and response.status_code == expected_status_code:
+                return response
+            attempt += 1
+            if attempt >= max_attempts:
+                return response
+            warnings.warn(f"{metodo.upper()} {url} Tentativa {attempt} de {max_attempts} sem sucesso. Tentando novamente...")
+            await asyncio.sleep(tempo_backoff(attempt, urlparse(url).hostname or ''))
+        return None
+
+    async def get(self, url, max_attempts=1, expected_status_code=200, headers=None, usar_cache=False, max_age=None):
+        """
+        Realiza uma solicitação HTTP GET assíncrona.
+
+        Parâmetros:
+            url (str): A URL para a qual a solicitação deve ser enviada.
+            max_attempts (int): O número máximo de tentativas em caso de falha. O padrão é 1.
+            expected_status_code (int): O código de status HTTP esperado como resposta. O padrão é 200.
+            headers (dict): Um dicionário de cabeçalhos personalizados a serem enviados com a solicitação. O padrão é None.
+            usar_cache (bool): Envia If-None-Match / If-Modified-Since e atende respostas 304 a partir do cache em disco. O padrão é False.
+            max_age (int): Validade, em segundos, da cópia em disco para portais que não enviam validadores. O padrão é None.
+
+        Retorna:
+            response (Response): O objeto de resposta da solicitação HTTP, ou None em caso de falha.
+        """
+        return await self._requisitar('get', url, max_attempts, expected_status_code, headers=headers, usar_cache=usar_cache, max_age=max_age)
+
+    async def post(self, url, data=None, max_attempts=1, expected_status_code=200, headers=None, usar_cache=False, max_age=None):
+        """
+        Realiza uma solicitação HTTP POST assíncrona.
+
+        Parâmetros:
+            url (str): A URL para a qual a solicitação deve ser enviada.
+            data (dict): Os dados a serem enviados na solicitação. O padrão é None.
+            max_attempts (int): O número máximo de tentativas em caso de falha. O padrão é 1.
+            expected_status_code (int): O código de status HTTP esperado como resposta. O padrão é 200.
+            headers (dict): Um dicionário de cabeçalhos personalizados a serem enviados com a solicitação. O padrão é None.
+            usar_cache (bool): Envia If-None-Match / If-Modified-Since e atende respostas 304 a partir do cache em disco. O padrão é False.
+            max_age (int): Validade, em segundos, da cópia em disco para portais que não enviam validadores. O padrão é None.
+
+        Retorna:
+            response (Response): O objeto de resposta da solicitação HTTP, ou None em caso de falha.
+        """
+        return await self._requisitar('post', url, max_attempts, expected_status_code, data=data, headers=headers, usar_cache=usar_cache, max_age=max_age)
+
+    async def head(self, url, max_attempts=1, expected_status_code=200, allow_redirects=True, headers=None):
+        """
+        Realiza uma solicitação HTTP HEAD assíncrona.
+
+        Parâmetros:
+            url (str): A URL para a qual a solicitação deve ser enviada.
+            max_attempts (int): O número máximo de tentativas em caso de falha. O padrão é 1.
+            expected_status_code (int): O código de status HTTP esperado como resposta. O padrão é 200.
+            allow_redirects (bool): Determina se as redireções devem ser seguidas automaticamente. O padrão é True.
+            headers (dict): Um dicionário de cabeçalhos personalizados a serem enviados com a solicitação. O padrão é None.
+
+        Retorna:
+            response (Response): O objeto de resposta da solicitação HTTP, ou None em caso de falha.
+        """
+        return await self._requisitar('head', url, max_attempts, expected_status_code, allow_redirects=allow_redirects, headers=headers)
@@ -0,0 +1,329 @@
+import io
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, urlencode, parse_qsl, quote
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from commons.utils import get_configuration_value, gravar_json_atomico
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+
+MODO_GRAVAR = 'gravar'
+MODO_REPRODUZIR = 'reproduzir'
+MODO_SERVIDOR = 'servidor'
+
+# Cabeçalhos que descrevem a transferência original e não o corpo gravado (já descomprimido)
+CABECALHOS_DESCARTADOS = ('content-encoding', 'transfer-encoding', 'content-length', 'connection', 'keep-alive', 'set-cookie')
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+class _CorpoGravado(io.BufferedReader):
+    # Arquivo do corpo gravado exposto como response.raw; aceita os atributos ajustados pelos leitores em blocos
+    # (decode_content, auto_close) e a leitura com decode_content, como o HTTPResponse do urllib3
+    def read(self, tamanho=-1, decode_content=None, **parametros):
+        return super().read(tamanho)
+
+    def stream(self, tamanho_bloco=TAMANHO_BLOCO, decode_content=None):
+        while True:
+            bloco = self.read(tamanho_bloco)
+            if not bloco:
+                break
+            yield bloco
+
+
+def _normalizar_dados(data):
+    if data is None:
+        return ''
+    if isinstance(data, dict):
+        return urlencode(sorted((str(chave), str(valor)) for chave, valor in data.items()))
+    if isinstance(data, bytes):
+        data = data.decode('utf-8', errors='replace')
+    return urlencode(sorted(parse_qsl(str(data), keep_blank_values=True))) if '=' in str(data) else str(data)
+
+
+class Cassette:
+    """
+    Gravação e reprodução das interações HTTP dos domínios, para medir e testar os ETLs sem acesso aos portais.
+
+    Cada interação (método, URL e dados enviados) é gravada em <diretorio>/interacoes/<chave>.json, com status e
+    cabeçalhos da resposta, e o corpo é gravado uma única vez por conteúdo em <diretorio>/corpos/<sha256>, inclusive
+    arquivos grandes (zip, CSV, ODS, XLSX), que são gravados em blocos sem passar pela memória.
+
+    Modos (chave HTTP_CASSETTE_MODO do app.conf, diretório em HTTP_CASSETTE_DIRETORIO):
+    - gravar: as requisições vão aos portais e as respostas são gravadas;
+    - reproduzir: as respostas são lidas da gravação, sem acesso à rede;
+    - servidor: as URLs são reescritas para um CassetteServer local (HTTP_CASSETTE_SERVIDOR), exercitando
+      toda a pilha HTTP (sessões, streaming, retomada de downloads) sem acesso aos portais.
+
+    Methods:
+    - gravar: Grava uma resposta e a retorna reconstituída a partir da gravação.
+    - reproduzir: Retorna a resposta gravada para a requisição, ou None se não houver gravação.
+    - gravar_arquivo / obter_arquivo: Equivalentes para downloads gravados diretamente em disco.
+    - reescrever_url: Reescreve a URL para o servidor local no modo servidor.
+    """
+
+    def __init__(self, modo=None, diretorio=None, servidor=None, diretorio_corpos=None):
+        self.configurar(modo, diretorio, servidor, diretorio_corpos)
+
+    def configurar(self, modo=None, diretorio=None, servidor=None, diretorio_corpos=None):
+        self.modo = (modo or '').lower() or None
+        self.diretorio = diretorio or os.path.join(CACHE_DIRECTORY, 'cassette')
+        self.servidor = (servidor or '').rstrip('/')
+        # Os corpos podem ser compartilhados por várias gravações, guardando uma única cópia de cada conteúdo
+        self.diretorio_corpos = diretorio_corpos or os.path.join(self.diretorio, 'corpos')
+        self._lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self.modo in (MODO_GRAVAR, MODO_REPRODUZIR, MODO_SERVIDOR)
+
+    def chave(self, metodo, url, data=None):
+        return hashlib.sha256(f'{metodo.upper()} {url} {_normalizar_dados(data)}'.encode()).hexdigest()
+
+    def _caminho_interacao(self, chave):
+        return os.path.join(self.diretorio, 'interacoes', f'{chave}.json')
+
+    def _caminho_corpo(self, sha):
+        return os.path.join(self.diretorio_corpos, sha)
+
+    def _armazenar_corpo(self, blocos):
+        # Grava o corpo em um arquivo temporário calculando o hash e o move para o endereço do conteúdo
+        os.makedirs(self.diretorio_corpos, exist_ok=True)
+        caminho_temporario = os.path.join(self.diretorio_corpos, f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        sha = hashlib.sha256()
+        with open(caminho_temporario, 'wb') as arquivo:
+            for bloco in blocos:
+                sha.update(bloco)
+                arquivo.write(bloco)
+        caminho_corpo = self._caminho_corpo(sha.hexdigest())
+        if os.path.exists(caminho_corpo):
+            os.remove(caminho_temporario)
+            os.utime(caminho_corpo)
+        else:
+            os.replace(caminho_temporario, caminho_corpo)
+        return sha.hexdigest()
+
+    def _registrar(self, metodo, url, data, status_code, cabecalhos, sha):
+        os.makedirs(os.path.join(self.diretorio, 'interacoes'), exist_ok=True)
+        gravar_json_atomico(self._caminho_interacao(self.chave(metodo, url, data)), {
+            "metodo": metodo.upper(),
+            "url": url,
+            "dados": _normalizar_dados(data),
+            "status": status_code,
+            "cabecalhos": {nome: valor for nome, valor in cabecalhos.items() if nome.lower() not in CABECALHOS_DESCARTADOS},
+            "corpo": sha,
+            "data": datetime.now().isoformat()
+        })
+
+    def interacao(self, metodo, url, data=None):
+        try:
+            with open(self._caminho_interacao(self.chave(metodo, url, data)), 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def gravar(self, metodo, url, data, response, stream=False):
+        with self._lock:
+            blocos = response.iter_content(chunk_size=TAMANHO_BLOCO) if stream else [response.content]
+            sha = self._armazenar_corpo(blocos)
+            self._registrar(metodo, url, data, response.status_code, response.headers, sha)
+        response.close()
+        resposta = self.reproduzir(metodo, url, data, stream)
+        resposta.elapsed = response.elapsed
+        return resposta
+
+    def gravar_arquivo(self, url, caminho_arquivo, cabecalhos):
+        def blocos():
+            with open(caminho_arquivo, 'rb') as arquivo:
+                while True:
+                    bloco = arquivo.read(TAMANHO_BLOCO)
+                    if not bloco:
+                        break
+                    yield bloco
+        with self._lock:
+            self._registrar('GET', url, None, 200, cabecalhos, self._armazenar_corpo(blocos()))
+
+    def obter_arquivo(self, url, caminho_destino):
+        '''
+        Disponibiliza o corpo gravado de um download no caminho de destino (link físico ou cópia).
+        '''
+        interacao = self.interacao('GET', url)
+        if interacao is None:
+            print(f"GET {url} Interação não encontrada na gravação ({self.diretorio}).")
+            return None
+        if os.path.exists(caminho_destino):
+            os.remove(caminho_destino)
+        try:
+            os.link(self._caminho_corpo(interacao["corpo"]), caminho_destino)
+        except OSError:
+            shutil.copyfile(self._caminho_corpo(interacao["corpo"]), caminho_destino)
+        return caminho_destino
+
+    def reproduzir(self, metodo, url, data=None, stream=False):
+        interacao = self.interacao(metodo, url, data)
+        if interacao is None:
+            print(f"{metodo.upper()} {url} Interação não encontrada na gravação ({self.diretorio}).")
+            return None
+
+        response = requests.Response()
+        response.status_code = interacao["status"]
+        response.headers = CaseInsensitiveDict(interacao["cabecalhos"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = url
+        caminho_corpo = self._caminho_corpo(interacao["corpo"])
+        if metodo.upper() == 'HEAD':
+            response._content = b''
+        elif stream:
+            response.raw = _CorpoGravado(io.FileIO(caminho_corpo, 'rb'))
+        else:
+            with open(caminho_corpo, 'rb') as arquivo:
+                response._content = arquivo.read()
+        return response
+
+    def reescrever_url(self, url):
+        if self.modo != MODO_SERVIDOR or not self.servidor:
+            return url
+        partes = urlparse(url)
+        return f"{self.servidor}/{partes.scheme}/{partes.netloc}{quote(partes.path or '/')}" + (f"?{partes.query}" if partes.query else '')
+
+
+class CassetteServer:
+    """
+    Servidor HTTP local que atende as interações gravadas, no lugar dos portais.
+
+    As URLs são recebidas no formato reescrito por Cassette.reescrever_url (/<esquema>/<host>/<caminho>?<consulta>).
+    Respostas com corpo suportam requisições parciais (Range), permitindo exercitar a retomada de downloads.
+
+    Methods:
+    - iniciar: Inicia o servidor em uma thread e retorna a URL base.
+    - parar: Encerra o servidor.
+    """
+
+    def __init__(self, diretorio, host='127.0.0.1', porta=0):
+        self.cassette = Cassette(MODO_REPRODUZIR, diretorio)
+        cassette = self.cassette
+
+        class Manipulador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _url_original(self):
+                caminho, _, consulta = self.path.partition('?')
+                partes = caminho.lstrip('/').split('/', 2)
+                if len(partes) < 2:
+                    return None
+                esquema, host, resto = partes[0], partes[1], (partes[2] if len(partes) > 2 else '')
+                return f"{esquema}://{host}/{resto}" + (f"?{consulta}" if consulta else '')
+
+            def _responder(self, metodo, data=None):
+                url = self._url_original()
+                interacao = cassette.interacao(metodo, url, data) if url else None
+                if interacao is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                caminho_corpo = cassette._caminho_corpo(interacao["corpo"])
+                tamanho = os.path.getsize(caminho_corpo)
+                inicio = 0
+                intervalo = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+                if intervalo and interacao["status"] == 200:
+                    inicio = int(intervalo.group(1))
+                    if inicio >= tamanho:
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{tamanho}')
+                        self.send_header('Content-Length', '0')
+                        self.end_headers()
+                        return
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {inicio}-{tamanho - 1}/{tamanho}')
+                else:
+                    self.send_response(interacao["status"])
+                for nome, valor in interacao["cabecalhos"].items():
+                    self.send_header(nome, valor)
+                self.send_header('Content-Length', str(tamanho - inicio))
+                self.end_headers()
+
+                if metodo != 'HEAD':
+                    with open(caminho_corpo, 'rb') as arquivo:
+                        arquivo.seek(inicio)
+                        shutil.copyfileobj(arquivo, self.wfile, TAMANHO_BLOCO)
+
+            def do_GET(self):
+                self._responder('GET')
+
+            def do_HEAD(self):
+                self._responder('HEAD')
+
+            def do_POST(self):
+                corpo = self.rfile.read(int(self.headers.get('Content-Length', 0) or 0))
+                self._responder('POST', corpo or None)
+
+            def log_message(self, formato, *argumentos):
+                pass
+
+        self.servidor = ThreadingHTTPServer((host, porta), Manipulador)
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._thread.start()
+        host, porta = self.servidor.server_address[:2]
+        return f'http://{host}:{porta}'
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+# Gravação compartilhada por todas as instâncias de HTTPRequestManager do processo
+cassette = Cassette(get_configuration_value("HTTP_CASSETTE_MODO", valor_padrao=''),
+                    get_configuration_value("HTTP_CASSETTE_DIRETORIO", valor_padrao='') or None,
+                    get_configuration_value("HTTP_CASSETTE_SERVIDOR", valor_padrao=''))
+
+# Gravação do contexto de execução corrente (ex.: arquivo das fontes durante a reconstrução de um domínio)
+_cassette_do_contexto = contextvars.ContextVar('cassette_do_contexto', default=None)
+
+
+@contextmanager
+def usar_cassette(gravacao):
+    '''
+    Direciona para a gravação informada as requisições feitas no contexto de execução corrente enquanto o bloco é executado,
+    com precedência sobre a gravação global do app.conf. Requisições de outras threads ou tarefas não são afetadas, exceto
+    as iniciadas a partir deste contexto (asyncio.to_thread, tarefas do asyncio e threads que copiam o contexto).
+
+    Parameters:
+        - gravacao (Cassette): Gravação a ser usada.
+    '''
+    token = _cassette_do_contexto.set(gravacao)
+    try:
+        yield gravacao
+    finally:
+        _cassette_do_contexto.reset(token)
+
+
+def cassette_ativo():
+    '''
+    Retorna a gravação do contexto de execução corrente ou, na ausência dela, a gravação global.
+    '''
+    return _cassette_do_contexto.get() or cassette
+
+
+# Servidor local das gravações: python -m commons.Cassette <diretorio> [porta]
+if __name__ == "__main__":
+    diretorio = sys.argv[1] if len(sys.argv) > 1 else cassette.diretorio
+    porta = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    servidor = CassetteServer(diretorio, porta=porta)
+    print(f"Servindo as gravações de {diretorio} em {servidor.iniciar()}")
+    servidor._thread.join()
@@ -0,0 +1,117 @@
+import os
+import threading
+from contextlib import contextmanager
+from commons.snapshot_formats import abrir_snapshot
+
+
+class DatabasePool:
+    """
+    Mantém, por domínio, uma conexão DuckDB somente leitura aberta durante toda a vida do processo.
+    O banco pode ter sido publicado como DuckDB (.db), Parquet (.parquet) ou Arrow IPC mapeado em memória (.arrow).
+
+    A conexão de cada domínio é aberta na primeira consulta e reaproveitada pelas consultas seguintes,
+    evitando reabrir o arquivo, recarregar o catálogo e aquecer o buffer pool a cada requisição.
+    Cada consulta recebe um cursor próprio (conexão derivada da mesma instância do banco), o que
+    permite consultas concorrentes a partir de threads distintas.
+
+    O pool também contabiliza os leitores de cada arquivo, de forma que gerações antigas do banco
+    só sejam fechadas e removidas do disco depois que as consultas em andamento as liberarem.
+
+    Methods:
+    - cursor: Context manager que fornece um cursor de leitura para o banco do domínio.
+        Parameters:
+            - dominio (str): Domínio dono do banco.
+            - caminho_arquivo (str): Caminho do banco de servidores corrente do domínio.
+
+    - invalidar: Deixa de reaproveitar a conexão do domínio, forçando a reabertura na próxima consulta.
+        Parameters:
+            - dominio (str): Domínio a ser invalidado.
+
+    - aposentar: Agenda a remoção de uma geração antiga do banco para quando não houver mais leitores.
+        Parameters:
+            - caminho_arquivo (str): Caminho da geração a ser removida.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conexoes = {}
+        self._leitores = {}
+        self._conexoes_aposentadas = {}
+        self._arquivos_aposentados = set()
+
+    def _descartar_conexao(self, caminho_arquivo, conexao):
+        # A conexão só é fechada quando o último cursor aberto sobre ela for liberado
+        if self._leitores.get(caminho_arquivo, 0) > 0:
+            self._conexoes_aposentadas.setdefault(caminho_arquivo, []).append(conexao)
+        else:
+            conexao.close()
+
+    def _obter_conexao(self, dominio, caminho_arquivo):
+        entrada = self._conexoes.get(dominio)
+
+        # Reaproveita a conexão se ela ainda aponta para o banco corrente do domínio
+        if entrada is not None and entrada[0] == caminho_arquivo:
+            return entrada[1], entrada[2]
+
+        if entrada is not None:
+            caminho_anterior, conexao_anterior, _ = entrada
+            self._descartar_conexao(caminho_anterior, conexao_anterior)
+
+        conexao, tabela_arrow = abrir_snapshot(caminho_arquivo)
+        self._conexoes[dominio] = (caminho_arquivo, conexao, tabela_arrow)
+        return conexao, tabela_arrow
+
+    def _liberar(self, caminho_arquivo):
+        if self._leitores.get(caminho_arquivo, 0) > 0:
+            return
+        self._leitores.pop(caminho_arquivo, None)
+
+        for conexao in self._conexoes_aposentadas.pop(caminho_arquivo, []):
+            conexao.close()
+
+        if caminho_arquivo in self._arquivos_aposentados:
+            try:
+                if os.path.exists(caminho_arquivo):
+                    os.remove(caminho_arquivo)
+                self._arquivos_aposentados.discard(caminho_arquivo)
+            except OSError:
+                # Arquivo ainda em uso por outro processo (Windows), nova tentativa na próxima liberação
+                pass
+
+    @contextmanager
+    def cursor(self, dominio, caminho_arquivo):
+        with self._lock:
+            conexao, tabela_arrow = self._obter_conexao(dominio, caminho_arquivo)
+            cursor = conexao.cursor()
+            # Tabelas Arrow registradas são locais a cada cursor
+            if tabela_arrow is not None:
+                cursor.register('servidores', tabela_arrow)
+            self._leitores[caminho_arquivo] = self._leitores.get(caminho_arquivo, 0) + 1
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            with self._lock:
+                self._leitores[caminho_arquivo] -= 1
+                self._liberar(caminho_arquivo)
+
+    def invalidar(self, dominio):
+        with self._lock:
+            entrada = self._conexoes.pop(dominio, None)
+            if entrada is not None:
+                caminho_corrente, conexao, _ = entrada
+                self._descartar_conexao(caminho_corrente, conexao)
+
+    def aposentar(self, caminho_arquivo):
+        with self._lock:
+            # Conexões ainda mantidas para a geração aposentada deixam de ser reaproveitadas
+            for dominio, (caminho_corrente, conexao, _) in list(self._conexoes.items()):
+                if caminho_corrente == caminho_arquivo:
+                    del self._conexoes[dominio]
+                    self._descartar_conexao(caminho_corrente, conexao)
+            self._arquivos_aposentados.add(caminho_arquivo)
+            self._liberar(caminho_arquivo)
+
+
+# Pool compartilhado por todas as instâncias de domínio do processo
+database_pool = DatabasePool()
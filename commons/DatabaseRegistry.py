@@ -0,0 +1,105 @@
+import os
+import json
+import threading
+from commons.utils import get_configuration_value, gravar_json_atomico, sincronizar_diretorio
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+
+
+class DatabaseRegistry:
+    """
+    Registro, compartilhado pelo processo, da geração corrente do banco de servidores de cada domínio.
+
+    O registro é carregado uma única vez, na primeira consulta, e atualizado por add_to_database ao publicar uma
+    nova geração. Publicações feitas por outros processos são detectadas comparando a identificação do manifesto
+    (<dominio>.manifest) com a última lida, o que custa um único os.stat por consulta, em vez de listar o
+    CACHE_DIRECTORY e ordenar os arquivos a cada busca.
+
+    Methods:
+    - obter: Retorna a geração corrente do banco do domínio.
+        Parameters:
+            - dominio (str): Domínio dono do banco.
+        Returns:
+            - dict: {"hash_arquivo": str, "lista_servidores": caminho do banco, "geracao": int} ou dicionário vazio se não houver banco.
+
+    - ler_manifesto: Lê o manifesto do domínio.
+        Parameters:
+            - dominio (str): Domínio dono do banco.
+        Returns:
+            - dict: Manifesto com hash_arquivo, lista_servidores (nome do arquivo), geracao e data, ou None se inexistente.
+
+    - publicar: Grava o manifesto de uma nova geração e atualiza o registro.
+        Parameters:
+            - dominio (str): Domínio dono do banco.
+            - manifesto (dict): Manifesto da nova geração.
+    """
+
+    def __init__(self, diretorio=CACHE_DIRECTORY):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        self._entradas = {}
+        self._bancos_sem_manifesto = None
+
+    def _caminho_manifesto(self, dominio):
+        return os.path.join(self.diretorio, f'{dominio}.manifest')
+
+    def _identificar_manifesto(self, dominio):
+        # A publicação substitui o arquivo (os.replace), alterando inode e data de modificação
+        try:
+            estado = os.stat(self._caminho_manifesto(dominio))
+        except FileNotFoundError:
+            return None
+        return (estado.st_ino, estado.st_mtime_ns, estado.st_size)
+
+    def _varrer_diretorio(self):
+        # Bancos gerados antes da existência do manifesto, lidos uma única vez por processo
+        databases = {}
+        if os.path.isdir(self.diretorio):
+            for arquivo in os.listdir(self.diretorio):
+                if arquivo.endswith(".db") and "-" in arquivo:
+                    dominio = arquivo.split('-')[0]
+                    id = arquivo.split('-', 1)[1].split('.')[0]
+                    databases[dominio] = {"hash_arquivo": id.replace('-', ''), "lista_servidores": os.path.join(self.diretorio, arquivo)}
+        return databases
+
+    def _entrada_do_manifesto(self, manifesto):
+        caminho_arquivo = os.path.join(self.diretorio, manifesto.get("lista_servidores", ''))
+        if not os.path.isfile(caminho_arquivo):
+            return {}
+        return {"hash_arquivo": manifesto.get("hash_arquivo", ''), "lista_servidores": caminho_arquivo, "geracao": manifesto.get("geracao")}
+
+    def ler_manifesto(self, dominio):
+        try:
+            with open(self._caminho_manifesto(dominio), 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def obter(self, dominio):
+        identificacao = self._identificar_manifesto(dominio)
+
+        with self._lock:
+            registrado = self._entradas.get(dominio)
+            if registrado is not None and registrado[0] == identificacao:
+                return registrado[1]
+
+            if identificacao is not None:
+                manifesto = self.ler_manifesto(dominio)
+                entrada = self._entrada_do_manifesto(manifesto) if manifesto is not None else {}
+            else:
+                if self._bancos_sem_manifesto is None:
+                    self._bancos_sem_manifesto = self._varrer_diretorio()
+                entrada = self._bancos_sem_manifesto.get(dominio, {})
+
+            self._entradas[dominio] = (identificacao, entrada)
+            return entrada
+
+    def publicar(self, dominio, manifesto):
+        with self._lock:
+            gravar_json_atomico(self._caminho_manifesto(dominio), manifesto)
+            sincronizar_diretorio(self.diretorio)
+            self._entradas[dominio] = (self._identificar_manifesto(dominio), self._entrada_do_manifesto(manifesto))
+
+
+# Registro compartilhado por todas as instâncias de domínio do processo
+database_registry = DatabaseRegistry()
@@ -0,0 +1,86 @@
+import os
+import json
+import threading
+from datetime import datetime
+from commons.utils import get_configuration_value, gravar_json_atomico
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+
+# Validade padrão, em segundos, dos identificadores de fonte obtidos dos portais
+FRESHNESS_TTL_PADRAO = 6 * 60 * 60
+
+
+def _codificar(valor):
+    # Preserva tuplas na serialização, pois elas compõem o hash do banco (ex.: gov.br)
+    if isinstance(valor, tuple):
+        return {"__tupla__": [_codificar(item) for item in valor]}
+    if isinstance(valor, list):
+        return [_codificar(item) for item in valor]
+    return valor
+
+
+def _decodificar(objeto):
+    if "__tupla__" in objeto:
+        return tuple(objeto["__tupla__"])
+    return objeto
+
+
+class FreshnessCache:
+    """
+    Cache com validade (TTL) dos identificadores de fonte de dados retornados por fn_obter_link_mais_recente.
+
+    O último identificador obtido é mantido em memória e persistido em CACHE_DIRECTORY (<dominio>.freshness),
+    de forma que reinícios do processo não obriguem uma nova consulta aos portais enquanto o TTL não expirar.
+    O TTL é lido do app.conf pela chave FRESHNESS_TTL_<dominio> ou, na ausência dela, FRESHNESS_TTL (segundos).
+
+    Methods:
+    - obter: Retorna os identificadores em cache ou None se ausentes ou expirados.
+    - obter_ultimo: Retorna os últimos identificadores obtidos, mesmo que expirados, ou None se ausentes.
+    - registrar: Armazena os identificadores obtidos do portal.
+        Parameters:
+            - links (list): Identificadores retornados por fn_obter_link_mais_recente.
+    - invalidar: Descarta o cache, forçando nova consulta ao portal na próxima requisição.
+    """
+
+    def __init__(self, dominio):
+        self.dominio = dominio
+        self.caminho_arquivo = os.path.join(CACHE_DIRECTORY, f'{dominio}.freshness')
+        self.ttl = int(get_configuration_value(f"FRESHNESS_TTL_{dominio}", valor_padrao=get_configuration_value("FRESHNESS_TTL", valor_padrao=FRESHNESS_TTL_PADRAO)))
+        self._lock = threading.Lock()
+        self._entrada = None
+
+    def _carregar(self):
+        # Arquivo removido por outro processo equivale a uma invalidação
+        if not os.path.isfile(self.caminho_arquivo):
+            self._entrada = None
+        elif self._entrada is None:
+            try:
+                with open(self.caminho_arquivo, 'r', encoding='utf-8') as arquivo:
+                    self._entrada = json.load(arquivo, object_hook=_decodificar)
+            except (json.JSONDecodeError, OSError):
+                self._entrada = None
+        return self._entrada
+
+    def obter(self):
+        with self._lock:
+            entrada = self._carregar()
+            if entrada is None:
+                return None
+            idade = datetime.now().timestamp() - entrada.get("timestamp", 0)
+            return entrada.get("links") if 0 <= idade < self.ttl else None
+
+    def obter_ultimo(self):
+        with self._lock:
+            entrada = self._carregar()
+            return entrada.get("links") if entrada is not None else None
+
+    def registrar(self, links):
+        with self._lock:
+            self._entrada = {"timestamp": datetime.now().timestamp(), "links": links}
+            gravar_json_atomico(self.caminho_arquivo, {"timestamp": self._entrada["timestamp"], "links": _codificar(links)})
+
+    def invalidar(self):
+        with self._lock:
+            self._entrada = None
+            if os.path.isfile(self.caminho_arquivo):
+                os.remove(self.caminho_arquivo)
@@ -0,0 +1,165 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from datetime import datetime
+import requests
+from requests.structures import CaseInsensitiveDict
+from commons.utils import get_configuration_value, gravar_json_atomico
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+DIRETORIO_HTTP_CACHE = os.path.join(CACHE_DIRECTORY, 'http')
+
+
+class HTTPCache:
+    """
+    Cache em disco de respostas HTTP para requisições condicionais (ETag / Last-Modified).
+
+    Para cada requisição são guardados o corpo da resposta (<chave>.body) e seus validadores (<chave>.json).
+    Nas requisições seguintes os validadores são enviados em If-None-Match / If-Modified-Since, e uma resposta
+    304 é atendida com o corpo em disco. Para portais que não enviam validadores, uma validade (max_age, em
+    segundos) pode ser informada por URL: enquanto a cópia em disco for mais nova que max_age, nenhuma
+    requisição é feita.
+
+    Methods:
+    - chave: Identifica a requisição (método, URL e dados enviados).
+    - possui / valido: Indicam se há cópia em disco e se ela está dentro da validade (max_age).
+    - cabecalhos_condicionais: Retorna os cabeçalhos If-None-Match / If-Modified-Since da requisição em cache.
+    - obter_resposta: Monta uma resposta (Response) a partir do corpo em disco.
+    - armazenar_resposta: Guarda o corpo e os validadores de uma resposta 200.
+    - obter_arquivo / armazenar_arquivo: Equivalentes para downloads gravados diretamente em disco.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_HTTP_CACHE):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+
+    def chave(self, metodo, url, data=None):
+        identificador = f'{metodo} {url} {json.dumps(data, sort_keys=True, default=str) if data is not None else ""}'
+        return hashlib.sha256(identificador.encode()).hexdigest()
+
+    def _caminhos(self, chave):
+        return os.path.join(self.diretorio, f'{chave}.json'), os.path.join(self.diretorio, f'{chave}.body')
+
+    def _ler_entrada(self, chave):
+        caminho_metadados, caminho_corpo = self._caminhos(chave)
+        if not os.path.isfile(caminho_corpo):
+            return None
+        try:
+            with open(caminho_metadados, 'r', encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _validadores(self, cabecalhos):
+        return {nome: cabecalhos[nome] for nome in ('etag', 'last-modified') if cabecalhos.get(nome)}
+
+    def possui(self, chave):
+        '''
+        Indica se existe uma cópia em disco para a requisição, independentemente da validade.
+        '''
+        return self._ler_entrada(chave) is not None
+
+    def valido(self, chave, max_age):
+        '''
+        Indica se a cópia em disco ainda está dentro da validade informada, dispensando a requisição.
+        '''
+        entrada = self._ler_entrada(chave)
+        if entrada is None or max_age is None:
+            return False
+        return 0 <= datetime.now().timestamp() - entrada.get("timestamp", 0) < max_age
+
+    def cabecalhos_condicionais(self, chave):
+        entrada = self._ler_entrada(chave)
+        if entrada is None:
+            return {}
+        cabecalhos = {}
+        if entrada["validadores"].get('etag'):
+            cabecalhos['If-None-Match'] = entrada["validadores"]['etag']
+        if entrada["validadores"].get('last-modified'):
+            cabecalhos['If-Modified-Since'] = entrada["validadores"]['last-modified']
+        return cabecalhos
+
+    def renovar(self, chave):
+        '''
+        Reinicia a validade da cópia em disco após uma resposta 304.
+        '''
+        entrada = self._ler_entrada(chave)
+        if entrada is not None:
+            entrada["timestamp"] = datetime.now().timestamp()
+            gravar_json_atomico(self._caminhos(chave)[0], entrada)
+
+    def obter_resposta(self, chave, url):
+        entrada = self._ler_entrada(chave)
+        if entrada is None:
+            return None
+        with open(self._caminhos(chave)[1], 'rb') as arquivo:
+            conteudo = arquivo.read()
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = conteudo
+        response.headers = CaseInsensitiveDict(entrada.get("cabecalhos", {}))
+        response.encoding = entrada.get("encoding")
+        response.url = url
+        return response
+
+    def armazenar_resposta(self, chave, response, max_age=None):
+        # Respostas sem validadores só são úteis se houver uma validade informada para a URL
+        validadores = self._validadores(response.headers)
+        if not validadores and max_age is None:
+            return
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            caminho_metadados, caminho_corpo = self._caminhos(chave)
+            with open(f'{caminho_corpo}.tmp', 'wb') as arquivo:
+                arquivo.write(response.content)
+            os.replace(f'{caminho_corpo}.tmp', caminho_corpo)
+            gravar_json_atomico(caminho_metadados, {
+                "url": response.url,
+                "timestamp": datetime.now().timestamp(),
+                "validadores": validadores,
+                "cabecalhos": {nome: valor for nome, valor in response.headers.items() if nome.lower() in ('content-type', 'etag', 'last-modified')},
+                "encoding": response.encoding
+            })
+
+    def obter_arquivo(self, chave, caminho_destino):
+        '''
+        Disponibiliza o corpo em disco no caminho de destino (link físico ou cópia), sem alterar a cópia do cache.
+        '''
+        caminho_corpo = self._caminhos(chave)[1]
+        if os.path.exists(caminho_destino):
+            os.remove(caminho_destino)
+        try:
+            os.link(caminho_corpo, caminho_destino)
+        except OSError:
+            shutil.copyfile(caminho_corpo, caminho_destino)
+        return caminho_destino
+
+    def armazenar_arquivo(self, chave, url, caminho_arquivo, cabecalhos, max_age=None):
+        cabecalhos = CaseInsensitiveDict(cabecalhos)
+        validadores = self._validadores(cabecalhos)
+        if not validadores and max_age is None:
+            return
+        with self._lock:
+            os.makedirs(self.diretorio, exist_ok=True)
+            caminho_metadados, caminho_corpo = self._caminhos(chave)
+            if os.path.exists(f'{caminho_corpo}.tmp'):
+                os.remove(f'{caminho_corpo}.tmp')
+            try:
+                os.link(caminho_arquivo, f'{caminho_corpo}.tmp')
+            except OSError:
+                shutil.copyfile(caminho_arquivo, f'{caminho_corpo}.tmp')
+            os.replace(f'{caminho_corpo}.tmp', caminho_corpo)
+            gravar_json_atomico(caminho_metadados, {
+                "url": url,
+                "timestamp": datetime.now().timestamp(),
+                "validadores": validadores,
+                "cabecalhos": {nome: valor for nome, valor in cabecalhos.items() if nome.lower() in ('content-type', 'etag', 'last-modified')},
+                "encoding": None
+            })
+
+
+# Cache compartilhado por todas as instâncias de HTTPRequestManager do processo
+http_cache = HTTPCache()
@@ -0,0 +1,172 @@
+import json
+import threading
+from urllib.parse import urlparse
+
+# Limites superiores (segundos) das faixas dos histogramas de tempo
+LIMITES_HISTOGRAMA = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PREFIXO_PROMETHEUS = 'monetometro_http'
+
+# Status registrado quando nenhuma resposta foi obtida (exceção em todas as tentativas)
+STATUS_ERRO = 'erro'
+
+
+class _Histograma:
+    def __init__(self, limites=LIMITES_HISTOGRAMA):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for indice, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[indice] += 1
+                break
+        else:
+            self.contagens[-1] += 1
+        self.soma += valor
+        self.total += 1
+
+    def acumulado(self):
+        # Contagens acumuladas por limite, no formato dos buckets do Prometheus (o último é +Inf)
+        acumulado, total = [], 0
+        for contagem in self.contagens:
+            total += contagem
+            acumulado.append(total)
+        return acumulado
+
+    def para_dict(self):
+        return {"faixas": {str(limite): contagem for limite, contagem in zip(list(self.limites) + ['+Inf'], self.acumulado())},
+                "soma": round(self.soma, 6), "total": self.total}
+
+
+class _Serie:
+    def __init__(self):
+        self.requisicoes = 0
+        self.bytes = 0
+        self.tentativas = 0
+        self.tempo_primeiro_byte = _Histograma()
+        self.tempo_total = _Histograma()
+
+
+def _escapar_rotulo(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class HTTPMetrics:
+    """
+    Métricas das transferências HTTP, mantidas em memória por domínio, host, método e status.
+
+    Para cada requisição (incluindo as novas tentativas) são contabilizados os bytes transferidos, as tentativas,
+    e os histogramas do tempo até o primeiro byte e do tempo total, permitindo distinguir lentidão de rede, do
+    portal (tempo até o primeiro byte) e do processamento dos dados.
+
+    Methods:
+    - registrar: Registra uma requisição concluída.
+    - totais: Retorna os totais acumulados por host, opcionalmente de um único domínio.
+    - resumo: Monta o resumo textual dos totais de um domínio, opcionalmente a partir de uma marca anterior (totais).
+    - exportar_prometheus / exportar_json: Exportam todas as séries no formato texto do Prometheus ou em JSON.
+    """
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metodo, url, dominio, status, bytes_transferidos, tempo_primeiro_byte, tempo_total, tentativas):
+        chave = (dominio or '', (urlparse(url).hostname or '').lower(), metodo.upper(), str(status))
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = _Serie()
+            serie.requisicoes += 1
+            serie.bytes += bytes_transferidos or 0
+            serie.tentativas += tentativas
+            if tempo_primeiro_byte is not None:
+                serie.tempo_primeiro_byte.observar(tempo_primeiro_byte)
+            serie.tempo_total.observar(tempo_total)
+
+    def reiniciar(self):
+        with self._lock:
+            self._series = {}
+
+    def totais(self, dominio=None):
+        '''
+        Retorna os totais por host: {host: {"requisicoes", "erros", "bytes", "tentativas", "tempo_primeiro_byte", "tempo_total"}},
+        com os tempos somados em segundos. Erros são as requisições sem resposta ou com status 4xx/5xx.
+        '''
+        totais = {}
+        with self._lock:
+            for (dominio_serie, host, _, status), serie in self._series.items():
+                if dominio is not None and dominio_serie != dominio:
+                    continue
+                total = totais.setdefault(host, {"requisicoes": 0, "erros": 0, "bytes": 0, "tentativas": 0, "tempo_primeiro_byte": 0.0, "tempo_total": 0.0})
+                total["requisicoes"] += serie.requisicoes
+                total["erros"] += serie.requisicoes if status == STATUS_ERRO or int(status) >= 400 else 0
+                total["bytes"] += serie.bytes
+                total["tentativas"] += serie.tentativas
+                total["tempo_primeiro_byte"] += serie.tempo_primeiro_byte.soma
+                total["tempo_total"] += serie.tempo_total.soma
+        return totais
+
+    def resumo(self, dominio, desde=None):
+        desde = desde or {}
+        linhas = []
+        for host, total in sorted(self.totais(dominio).items()):
+            anterior = desde.get(host, {})
+            delta = {nome: valor - anterior.get(nome, 0) for nome, valor in total.items()}
+            if delta["requisicoes"] <= 0:
+                continue
+            linhas.append(f"{host}: {delta['requisicoes']} requisições ({delta['erros']} com erro, "
+                          f"{delta['tentativas'] - delta['requisicoes']} novas tentativas), {delta['bytes'] / 1024 / 1024:.1f} MB, "
+                          f"primeiro byte {delta['tempo_primeiro_byte'] / delta['requisicoes']:.2f}s em média, "
+                          f"tempo total {delta['tempo_total']:.1f}s")
+        if not linhas:
+            return "Nenhuma requisição HTTP."
+        return "Requisições HTTP | " + " | ".join(linhas)
+
+    def _series_ordenadas(self):
+        with self._lock:
+            return sorted(self._series.items())
+
+    def exportar_prometheus(self):
+        series = self._series_ordenadas()
+        linhas = []
+
+        def rotulos(chave, extra=''):
+            dominio, host, metodo, status = chave
+            texto = f'dominio="{_escapar_rotulo(dominio)}",host="{_escapar_rotulo(host)}",metodo="{metodo}",status="{status}"'
+            return '{' + texto + extra + '}'
+
+        for nome, ajuda, atributo in ((f'{PREFIXO_PROMETHEUS}_requisicoes_total', 'Requisições HTTP concluídas.', 'requisicoes'),
+                                      (f'{PREFIXO_PROMETHEUS}_bytes_total', 'Bytes recebidos nos corpos das respostas.', 'bytes'),
+                                      (f'{PREFIXO_PROMETHEUS}_tentativas_total', 'Tentativas enviadas, incluindo as repetições.', 'tentativas')):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} counter')
+            for chave, serie in series:
+                linhas.append(f'{nome}{rotulos(chave)} {getattr(serie, atributo)}')
+
+        for nome, ajuda, atributo in ((f'{PREFIXO_PROMETHEUS}_tempo_primeiro_byte_segundos', 'Tempo até o recebimento dos cabeçalhos da resposta.', 'tempo_primeiro_byte'),
+                                      (f'{PREFIXO_PROMETHEUS}_tempo_total_segundos', 'Tempo total da requisição, incluindo tentativas e corpo.', 'tempo_total')):
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} histogram')
+            for chave, serie in series:
+                histograma = getattr(serie, atributo)
+                for limite, contagem in zip(list(histograma.limites) + ['+Inf'], histograma.acumulado()):
+                    faixa = f',le="{limite}"'
+                    linhas.append(f'{nome}_bucket{rotulos(chave, faixa)} {contagem}')
+                linhas.append(f'{nome}_sum{rotulos(chave)} {histograma.soma}')
+                linhas.append(f'{nome}_count{rotulos(chave)} {histograma.total}')
+        return '\n'.join(linhas) + '\n'
+
+    def exportar_json(self):
+        return json.dumps([{
+            "dominio": dominio, "host": host, "metodo": metodo, "status": status,
+            "requisicoes": serie.requisicoes, "bytes": serie.bytes, "tentativas": serie.tentativas,
+            "tempo_primeiro_byte": serie.tempo_primeiro_byte.para_dict(),
+            "tempo_total": serie.tempo_total.para_dict()
+        } for (dominio, host, metodo, status), serie in self._series_ordenadas()], ensure_ascii=False, indent=2)
+
+
+# Métricas compartilhadas por todas as instâncias de HTTPRequestManager do processo
+http_metrics = HTTPMetrics()
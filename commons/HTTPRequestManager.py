@@ -1,51 +1,255 @@
+import io
+import os
+import re
+import mmap
+import hashlib
+import tempfile
 import requests
-from time import sleep
+from requests.adapters import HTTPAdapter
+from time import sleep, perf_counter
+import threading
 import warnings
-from commons.utils import get_traceback_string
+from http.cookiejar import DefaultCookiePolicy
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from commons.utils import get_traceback_string, get_configuration_value
+from commons.HTTPCache import http_cache
+from commons.HostPolicy import obter_limitador, obter_disjuntor, estado_disjuntores, tempo_backoff
+from commons.Cassette import cassette_ativo, MODO_GRAVAR, MODO_REPRODUZIR
+from commons.HTTPMetrics import http_metrics, STATUS_ERRO
+
+# Número padrão de conexões mantidas abertas (keep-alive) por host
+TAMANHO_POOL_PADRAO = 10
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+
+# Tamanho dos blocos gravados em disco durante os downloads
+TAMANHO_BLOCO_DOWNLOAD = 1024 * 1024
+
+# Pools mantidos por sessão, um para cada combinação de parâmetros de conexão (ex.: verificação de SSL ligada ou desligada)
+POOLS_POR_SESSAO = 4
+
+_sessoes = {}
+_sessoes_lock = threading.Lock()
+_estatisticas_por_host = {}
+
+
+class _SemCookies(DefaultCookiePolicy):
+    """
+    Política que descarta os cookies recebidos, as sessões são compartilhadas entre domínios e não devem manter estado.
+    """
+    def set_ok(self, cookie, request):
+        return False
+
+
+def _chave_host(url):
+    partes = urlparse(url)
+    return f"{partes.scheme}://{partes.netloc}".lower()
+
+
+def obter_sessao(url):
+    """
+    Retorna a sessão HTTP compartilhada do host da URL, criando-a na primeira requisição.
+
+    Todas as instâncias de HTTPRequestManager (e portanto todos os domínios) que acessam o mesmo host
+    reaproveitam as mesmas conexões TCP/TLS. O tamanho do pool é lido do app.conf pela chave
+    HTTP_POOL_<host> (ex.: HTTP_POOL_dados.es.gov.br) ou, na ausência dela, HTTP_POOL.
+    A sessão não guarda cookies entre requisições, cada requisição se comporta como uma requisição avulsa
+    (os cookies recebidos valem apenas para os redirecionamentos da própria requisição).
+
+    Parâmetros:
+        url (str): URL a ser requisitada.
+
+    Retorna:
+        session (Session): Sessão do host.
+    """
+    chave = _chave_host(url)
+    with _sessoes_lock:
+        if chave not in _sessoes:
+            host = urlparse(url).hostname or ''
+            tamanho_pool = int(get_configuration_value(f"HTTP_POOL_{host}", valor_padrao=get_configuration_value("HTTP_POOL", valor_padrao=TAMANHO_POOL_PADRAO)))
+            sessao = requests.Session()
+            sessao.cookies.set_policy(_SemCookies())
+            sessao.mount(chave + '/', HTTPAdapter(pool_connections=POOLS_POR_SESSAO, pool_maxsize=tamanho_pool))
+            _sessoes[chave] = sessao
+            _estatisticas_por_host[chave] = {"requisicoes": 0, "em_andamento": 0, "pico_simultaneas": 0, "tamanho_pool": tamanho_pool}
+        return _sessoes[chave]
+
+
+@contextmanager
+def sessao_do_host(url):
+    """
+    Fornece a sessão compartilhada do host durante uma requisição, contabilizando-a nas estatísticas do pool.
+    Em requisições com stream, o bloco deve envolver também a leitura da resposta, que mantém a conexão ocupada.
+
+    Parâmetros:
+        url (str): URL a ser requisitada.
+
+    Retorna:
+        session (Session): Sessão do host.
+    """
+    sessao = obter_sessao(url)
+    with _sessoes_lock:
+        estatisticas = _estatisticas_por_host[_chave_host(url)]
+        estatisticas["requisicoes"] += 1
+        estatisticas["em_andamento"] += 1
+        estatisticas["pico_simultaneas"] = max(estatisticas["pico_simultaneas"], estatisticas["em_andamento"])
+    try:
+        yield sessao
+    finally:
+        with _sessoes_lock:
+            estatisticas["em_andamento"] -= 1
+
+
+def estatisticas_pool():
+    """
+    Retorna as estatísticas dos pools de conexão por host, contabilizadas pelo próprio gerenciador.
+
+    Retorna:
+        dict: {host: {"requisicoes": int, "em_andamento": int, "pico_simultaneas": int, "tamanho_pool": int}}
+              Enquanto pico_simultaneas não ultrapassar tamanho_pool, as requisições ao host reaproveitam as conexões abertas.
+    """
+    with _sessoes_lock:
+        return {chave: dict(estatisticas) for chave, estatisticas in _estatisticas_por_host.items()}
 
 
 class HTTPRequestManager:
-    def __init__(self, verify_ssl=True):    
+    def __init__(self, verify_ssl=True, dominio=None):
         """
         Inicializa o gerenciador de requisições HTTP.
 
         Parâmetros:
             verify_ssl (bool): Determina se a validação de SSL deve ser realizada. O padrão é True.
+            dominio (str): Domínio que utiliza o gerenciador, identifica as requisições nas métricas (HTTPMetrics). O padrão é None.
         """
         self.verify_ssl = verify_ssl
+        self.dominio = dominio
         self.default_headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:124.0) Gecko/20100101 Firefox/124.0"}
 
-    def get(self, url, max_attempts=1, expected_status_code=200, headers=None): 
+    def _requisitar(self, metodo, url, max_attempts, expected_status_code, headers, usar_cache=False, max_age=None, **parametros):
         """
-        Realiza uma solicitação HTTP GET.
-
-        Parâmetros:
-            url (str): A URL para a qual a solicitação deve ser enviada.
-            max_attempts (int): O número máximo de tentativas em caso de falha. O padrão é 1.
-            expected_status_code (int): O código de status HTTP esperado como resposta. O padrão é 200.
-            headers (dict): Um dicionário de cabeçalhos personalizados a serem enviados com a solicitação. O padrão é None.
+        Realiza a solicitação HTTP pela sessão compartilhada do host, repetindo-a até max_attempts vezes
+        com backoff exponencial, respeitando o limite de taxa e o disjuntor do host.
+        Com usar_cache a requisição é condicional e uma resposta 304 é atendida a partir do cache em disco.
+        Enquanto o host estiver indisponível (disjuntor aberto ou tentativas esgotadas) a última cópia em cache é servida.
+        Com a gravação (Cassette) ativa as respostas são gravadas, reproduzidas ou obtidas do servidor local, sem o cache condicional.
 
         Retorna:
-            response (Response): O objeto de resposta da solicitação HTTP, ou None em caso de falha.
+            response (Response): O objeto de resposta da última tentativa, ou None se nenhuma resposta foi obtida.
         """
         headers = headers or self.default_headers
+        gravacao = self._gravacao()
+        if gravacao.modo == MODO_REPRODUZIR:
+            return gravacao.reproduzir(metodo, url, parametros.get('data'), parametros.get('stream', False))
+        # As gravações guardam sempre a resposta completa, e não um 304 que dependeria do cache local
+        usar_cache = usar_cache and not gravacao.ativo
+        url_requisicao = gravacao.reescrever_url(url)
+
+        chave_cache = None
+        if usar_cache:
+            chave_cache = http_cache.chave(metodo, url, parametros.get('data'))
+            if http_cache.valido(chave_cache, max_age):
+                return http_cache.obter_resposta(chave_cache, url)
+            headers = {**headers, **http_cache.cabecalhos_condicionais(chave_cache)}
+
+        inicio = perf_counter()
+        resposta, response, tentativas = self._enviar(metodo, url, url_requisicao, max_attempts, expected_status_code, headers, chave_cache, max_age, **parametros)
+        if tentativas:
+            self._registrar_metricas(metodo, url, response, tentativas, perf_counter() - inicio, stream=parametros.get('stream', False))
+        return resposta
+
+    def _enviar(self, metodo, url, url_requisicao, max_attempts, expected_status_code, headers, chave_cache, max_age, **parametros):
+        """
+        Executa as tentativas da requisição.
+
+        Retorna:
+            tuple: (resposta entregue ao chamador, última resposta recebida da rede, número de tentativas enviadas)
+        """
+        disjuntor = obter_disjuntor(url_requisicao)
+        response = None
         attempt = 0
         while attempt < max_attempts:
+            if not disjuntor.permitir():
+                print(f"{metodo} {url} Host indisponível (disjuntor aberto), requisição não enviada.")
+                return self._resposta_de_contingencia(chave_cache, url, response), response, attempt
             try:
-                response = requests.get(url, verify=self.verify_ssl, headers=headers)
+                obter_limitador(url_requisicao).adquirir()
+                with sessao_do_host(url_requisicao) as sessao:
+                    response = sessao.request(metodo, url_requisicao, verify=self.verify_ssl, headers=headers, **parametros)
+                disjuntor.registrar(self._host_saudavel(response.status_code))
+                gravacao = self._gravacao()
+                if gravacao.modo == MODO_GRAVAR:
+                    response = gravacao.gravar(metodo, url, parametros.get('data'), response, parametros.get('stream', False))
+                if chave_cache is not None and response.status_code == 304:
+                    http_cache.renovar(chave_cache)
+                    resposta_cache = http_cache.obter_resposta(chave_cache, url)
+                    if resposta_cache is not None:
+                        return resposta_cache, response, attempt + 1
                 if response.status_code == expected_status_code:
-                    return response
+                    if chave_cache is not None and response.status_code == 200:
+                        http_cache.armazenar_resposta(chave_cache, response, max_age)
+                    return response, response, attempt + 1
                 else:
-                    warnings.warn(f"GET {url} Status de resposta inesperado ({response.status_code}). Tentando novamente...")
+                    warnings.warn(f"{metodo} {url} Status de resposta inesperado ({response.status_code}). Tentando novamente...")
             except Exception as e:
-                 print(f"GET {url} Erro ao fazer requisição: {e}" + get_traceback_string())
+                disjuntor.registrar(False)
+                print(f"{metodo} {url} Erro ao fazer requisição: {e}" + get_traceback_string())
             attempt += 1
             if attempt >= max_attempts:
-                return response
-            sleep(1)  # Aguardar 1 segundo antes da próxima tentativa
-        return None
+                return self._resposta_de_contingencia(chave_cache, url, response), response, attempt
+            sleep(tempo_backoff(attempt, urlparse(url).hostname or ''))
+        return None, response, attempt
+
+    def _registrar_metricas(self, metodo, url, response, tentativas, tempo_total, stream=False, bytes_transferidos=None):
+        # Em respostas consumidas sob demanda (stream) o corpo ainda não foi lido, e os bytes são os anunciados pelo servidor
+        if response is None:
+            http_metrics.registrar(metodo, url, self.dominio, STATUS_ERRO, 0, None, tempo_total, tentativas)
+            return
+        if bytes_transferidos is None:
+            if metodo == 'HEAD':
+                bytes_transferidos = 0
+            elif stream:
+                bytes_transferidos = int(response.headers.get('content-length') or 0)
+            else:
+                bytes_transferidos = len(response.content or b'')
+        http_metrics.registrar(metodo, url, self.dominio, response.status_code, bytes_transferidos,
+                               response.elapsed.total_seconds(), tempo_total, tentativas)
+
+    def _gravacao(self):
+        # A gravação do contexto (ex.: arquivo das fontes do domínio) tem precedência sobre a gravação global do app.conf
+        return cassette_ativo()
+
+    def _host_saudavel(self, status_code):
+        # Erros do servidor e limitação de taxa indicam problema no host, os demais status são respostas válidas
+        return status_code < 500 and status_code != 429
+
+    def _resposta_de_contingencia(self, chave_cache, url, response):
+        if chave_cache is not None:
+            resposta_cache = http_cache.obter_resposta(chave_cache, url)
+            if resposta_cache is not None:
+                print(f"{url} Servindo a última cópia em cache.")
+                return resposta_cache
+        return response
+
+    def get(self, url, max_attempts=1, expected_status_code=200, headers=None, stream=False, usar_cache=False, max_age=None):
+        """
+        Realiza uma solicitação HTTP GET.
+
+        Parâmetros:
+            url (str): A URL para a qual a solicitação deve ser enviada.
+            max_attempts (int): O número máximo de tentativas em caso de falha. O padrão é 1.
+            expected_status_code (int): O código de status HTTP esperado como resposta. O padrão é 200.
+            headers (dict): Um dicionário de cabeçalhos personalizados a serem enviados com a solicitação. O padrão é None.
+            stream (bool): Determina se o corpo da resposta deve ser consumido sob demanda (response.raw / iter_content). O padrão é False.
+            usar_cache (bool): Envia If-None-Match / If-Modified-Since e atende respostas 304 a partir do cache em disco. Ignorado com stream. O padrão é False.
+            max_age (int): Validade, em segundos, da cópia em disco para portais que não enviam validadores. O padrão é None.
+
+        Retorna:
+            response (Response): O objeto de resposta da solicitação HTTP, ou None em caso de falha.
+        """
+        return self._requisitar('GET', url, max_attempts, expected_status_code, headers, usar_cache=usar_cache and not stream, max_age=max_age, stream=stream)
 
-    def post(self, url, data=None, max_attempts=1, expected_status_code=200, headers=None):
+    def post(self, url, data=None, max_attempts=1, expected_status_code=200, headers=None, usar_cache=False, max_age=None):
         """
         Realiza uma solicitação HTTP POST.
 
@@ -55,26 +259,13 @@ class HTTPRequestManager:
             max_attempts (int): O número máximo de tentativas em caso de falha. O padrão é 1.
             expected_status_code (int): O código de status HTTP esperado como resposta. O padrão é 200.
             headers (dict): Um dicionário de cabeçalhos personalizados a serem enviados com a solicitação. O padrão é None.
+            usar_cache (bool): Envia If-None-Match / If-Modified-Since e atende respostas 304 a partir do cache em disco. O padrão é False.
+            max_age (int): Validade, em segundos, da cópia em disco para portais que não enviam validadores. O padrão é None.
 
         Retorna:
             response (Response): O objeto de resposta da solicitação HTTP, ou None em caso de falha.
         """
-        headers = headers or self.default_headers
-        attempt = 0
-        while attempt < max_attempts:
-            try:
-                response = requests.post(url, data=data, verify=self.verify_ssl, headers=headers)
-                if response.status_code == expected_status_code:
-                    return response
-                else:
-                    warnings.warn(f"POST {url} ({response.status_code}). Tentando novamente...")
-            except Exception as e:
-                print(f"POST {url} Erro ao fazer requisição: {e}" + get_traceback_string())
-            attempt += 1
-            if attempt >= max_attempts:
-                return response
-            sleep(1)  # Aguardar 1 segundo antes da próxima tentativa
-        return None
+        return self._requisitar('POST', url, max_attempts, expected_status_code, headers, usar_cache=usar_cache, max_age=max_age, data=data)
 
 
     def head(self, url, max_attempts=1, expected_status_code=200, allow_redirects=True, headers=None):
@@ -91,19 +282,194 @@ class HTTPRequestManager:
         Retorna:
             response (Response): O objeto de resposta da solicitação HTTP, ou None em caso de falha.
         """
-        headers = headers or self.default_headers
+        return self._requisitar('HEAD', url, max_attempts, expected_status_code, headers, allow_redirects=allow_redirects)
+
+    def estatisticas(self):
+        """
+        Retorna as estatísticas dos pools de conexão compartilhados por host (ver estatisticas_pool).
+        """
+        return estatisticas_pool()
+
+    def estado_disjuntores(self):
+        """
+        Retorna o estado dos disjuntores por host (ver HostPolicy.estado_disjuntores).
+        """
+        return estado_disjuntores()
+
+    def download(self, url, caminho_destino=None, max_attempts=3, headers=None, tamanho_bloco=TAMANHO_BLOCO_DOWNLOAD, mapear=False, usar_cache=False, max_age=None):
+        """
+        Baixa um arquivo grande diretamente para o disco, em blocos, sem mantê-lo em memória.
+
+        O conteúdo é gravado em um arquivo parcial (.part) exclusivo do download, no diretório do destino. Se a conexão cair,
+        as tentativas seguintes retomam o download do ponto em que pararam com os cabeçalhos Range e If-Range; sem um validador
+        (ETag ou Last-Modified) que garanta que o arquivo remoto não mudou, o download recomeça do início. Ao final o tamanho
+        do arquivo é conferido com o content-length informado pelo servidor e o arquivo parcial é renomeado para o destino.
+
+        Parâmetros:
+            url (str): A URL do arquivo.
+            caminho_destino (str): Caminho do arquivo baixado. O padrão é um arquivo exclusivo do download em CACHE_DIRECTORY/downloads.
+            max_attempts (int): O número máximo de tentativas (retomadas) em caso de falha. O padrão é 3.
+            headers (dict): Um dicionário de cabeçalhos personalizados a serem enviados com a solicitação. O padrão é None.
+            tamanho_bloco (int): Tamanho, em bytes, dos blocos gravados em disco. O padrão é 1 MB.
+            mapear (bool): Se True retorna o arquivo mapeado em memória (mmap) em vez do caminho; um arquivo vazio, que não pode
+                           ser mapeado, é retornado como um io.BytesIO vazio. O padrão é False.
+            usar_cache (bool): Faz o download condicional (If-None-Match / If-Modified-Since), reaproveitando a cópia do cache em disco se o arquivo não mudou. O padrão é False.
+            max_age (int): Validade, em segundos, da cópia em disco para portais que não enviam validadores. O padrão é None.
+
+        Com a gravação (Cassette) ativa o arquivo baixado é gravado, ou, no modo reproduzir, obtido da gravação sem acesso à rede.
+
+        Retorna:
+            str or mmap: Caminho do arquivo baixado (ou o mapeamento em memória), ou None em caso de falha.
+                         O arquivo é do chamador, que deve removê-lo após o uso. Mapeado, o arquivo temporário (sem
+                         caminho_destino) é removido logo após o mapeamento, bastando ao chamador fechar o mmap.
+        """
+        # Downloads simultâneos da mesma URL não compartilham arquivos, cada chamador remove o seu após o uso
+        destino_temporario = caminho_destino is None
+        if destino_temporario:
+            diretorio = os.path.join(CACHE_DIRECTORY, 'downloads')
+            os.makedirs(diretorio, exist_ok=True)
+            extensao = os.path.splitext(urlparse(url).path)[1]
+            descritor, caminho_destino = tempfile.mkstemp(dir=diretorio, prefix=hashlib.sha256(url.encode()).hexdigest()[:16] + '.', suffix=extensao)
+            os.close(descritor)
+
+        descritor, caminho_parcial = tempfile.mkstemp(dir=os.path.dirname(caminho_destino) or '.', prefix=f'{os.path.basename(caminho_destino)}.', suffix='.part')
+        os.close(descritor)
+
+        baixado = None
+        try:
+            baixado = self._baixar(url, caminho_destino, caminho_parcial, max_attempts, headers, tamanho_bloco, usar_cache, max_age)
+            if baixado is not None and mapear:
+                return self._mapear_download(baixado, destino_temporario)
+            return baixado
+        finally:
+            if os.path.exists(caminho_parcial):
+                os.remove(caminho_parcial)
+            if baixado is None and destino_temporario and os.path.exists(caminho_destino):
+                os.remove(caminho_destino)
+
+    def _baixar(self, url, caminho_destino, caminho_parcial, max_attempts, headers, tamanho_bloco, usar_cache, max_age):
+        gravacao = self._gravacao()
+        if gravacao.modo == MODO_REPRODUZIR:
+            caminho_gravado = gravacao.obter_arquivo(url, caminho_destino)
+            return caminho_gravado
+        url_requisicao = gravacao.reescrever_url(url)
+
+        chave_cache = http_cache.chave('GET', url) if usar_cache and not gravacao.ativo else None
+        if chave_cache is not None and http_cache.valido(chave_cache, max_age):
+            return http_cache.obter_arquivo(chave_cache, caminho_destino)
+
+        disjuntor = obter_disjuntor(url_requisicao)
+        tamanho_total = None
+        validador = None
+        cabecalhos_resposta = {}
+        concluido = False
+        inicio = perf_counter()
+        ultima_resposta = None
+        bytes_recebidos = 0
         attempt = 0
         while attempt < max_attempts:
+            baixados = os.path.getsize(caminho_parcial)
+            if baixados > 0 and not validador:
+                # Sem validador não há como garantir que o intervalo restante seja do mesmo arquivo, o download recomeça
+                open(caminho_parcial, 'wb').close()
+                baixados = 0
+            cabecalhos = dict(headers or self.default_headers)
+            if baixados == 0 and chave_cache is not None:
+                cabecalhos.update(http_cache.cabecalhos_condicionais(chave_cache))
+            if baixados > 0:
+                # Se o arquivo remoto mudou o servidor responde 200 com o conteúdo completo em vez do intervalo
+                cabecalhos['Range'] = f'bytes={baixados}-'
+                cabecalhos['If-Range'] = validador
+
+            if not disjuntor.permitir():
+                print(f"GET {url} Host indisponível (disjuntor aberto), download não iniciado.")
+                break
             try:
-                response = requests.head(url, verify=self.verify_ssl, allow_redirects=allow_redirects, headers=headers)
-                if response.status_code == expected_status_code:
-                    return response
-                else:
-                    warnings.warn(f"HEAD {url} Status de resposta inesperado ({response.status_code}). Tentando novamente...")
+                obter_limitador(url_requisicao).adquirir()
+                with sessao_do_host(url_requisicao) as sessao, sessao.get(url_requisicao, verify=self.verify_ssl, headers=cabecalhos, stream=True) as response:
+                    ultima_resposta = response
+                    if not self._host_saudavel(response.status_code):
+                        raise IOError(f"Status de resposta inesperado ({response.status_code})")
+                    if response.status_code == 304 and chave_cache is not None:
+                        # O arquivo não mudou desde o último download
+                        disjuntor.registrar(True)
+                        http_cache.renovar(chave_cache)
+                        self._registrar_metricas('GET', url, response, attempt + 1, perf_counter() - inicio, bytes_transferidos=0)
+                        return http_cache.obter_arquivo(chave_cache, caminho_destino)
+                    if response.status_code == 416 and tamanho_total == baixados:
+                        # O arquivo parcial já estava completo
+                        disjuntor.registrar(True)
+                        concluido = True
+                        break
+                    cabecalhos_resposta = dict(response.headers)
+                    validador = response.headers.get('etag') or response.headers.get('last-modified') or validador
+                    if response.status_code == 206:
+                        # Content-Range: bytes inicio-fim/total
+                        intervalo = re.match(r'bytes (\d+)-\d+/(\d+|\*)', response.headers.get('content-range', ''))
+                        if intervalo is None or int(intervalo.group(1)) != baixados:
+                            raise IOError(f"Intervalo inesperado na retomada: {response.headers.get('content-range')}")
+                        if intervalo.group(2) != '*':
+                            tamanho_total = int(intervalo.group(2))
+                        modo = 'ab'
+                    elif response.status_code == 200:
+                        # Servidor sem suporte a Range, o download recomeça do início
+                        tamanho_total = int(response.headers['content-length']) if 'content-length' in response.headers else None
+                        modo = 'wb'
+                    else:
+                        raise IOError(f"Status de resposta inesperado ({response.status_code})")
+
+                    with open(caminho_parcial, modo) as arquivo:
+                        for bloco in response.iter_content(chunk_size=tamanho_bloco):
+                            arquivo.write(bloco)
+                            bytes_recebidos += len(bloco)
+
+                baixados = os.path.getsize(caminho_parcial)
+                if tamanho_total is not None and baixados != tamanho_total:
+                    raise IOError(f"Download incompleto: {baixados} de {tamanho_total} bytes")
+                disjuntor.registrar(True)
+                concluido = True
+                break
             except Exception as e:
-                print(f"HEAD {url} Erro ao fazer requisição: {e}" + get_traceback_string())
+                disjuntor.registrar(False)
+                print(f"GET {url} Erro ao baixar o arquivo: {e}" + get_traceback_string())
             attempt += 1
             if attempt >= max_attempts:
-                return response 
-            sleep(1)  # Aguardar 1 segundo antes da próxima tentativa
-        return None
+                break
+            sleep(tempo_backoff(attempt, urlparse(url).hostname or ''))
+
+        # Nas saídas por sucesso a tentativa corrente ainda não foi contabilizada
+        tentativas = attempt + 1 if concluido else attempt
+        if tentativas:
+            self._registrar_metricas('GET', url, ultima_resposta, tentativas, perf_counter() - inicio, bytes_transferidos=bytes_recebidos)
+
+        if not concluido:
+            # Com o host indisponível a última cópia em cache é servida, se existir
+            if chave_cache is not None and http_cache.possui(chave_cache):
+                print(f"{url} Servindo a última cópia em cache.")
+                return http_cache.obter_arquivo(chave_cache, caminho_destino)
+            return None
+
+        os.replace(caminho_parcial, caminho_destino)
+        if gravacao.modo == MODO_GRAVAR:
+            gravacao.gravar_arquivo(url, caminho_destino, cabecalhos_resposta)
+        if chave_cache is not None:
+            http_cache.armazenar_arquivo(chave_cache, url, caminho_destino, cabecalhos_resposta, max_age)
+
+        return caminho_destino
+
+    def _mapear_download(self, caminho_arquivo, temporario):
+        # No Windows o arquivo temporário aberto com O_TEMPORARY é removido quando o mapeamento, que mantém o seu próprio
+        # descritor, for fechado; nos demais sistemas o mapeamento continua válido após a remoção do arquivo
+        remover_ao_fechar = temporario and hasattr(os, 'O_TEMPORARY')
+        descritor = os.open(caminho_arquivo, os.O_RDONLY | getattr(os, 'O_BINARY', 0) | (os.O_TEMPORARY if remover_ao_fechar else 0))
+        try:
+            if os.fstat(descritor).st_size > 0:
+                buffer = mmap.mmap(descritor, 0, access=mmap.ACCESS_READ)
+            else:
+                # Arquivos vazios não podem ser mapeados
+                buffer = io.BytesIO()
+        finally:
+            os.close(descritor)
+        if temporario and not remover_ao_fechar and os.path.exists(caminho_arquivo):
+            os.remove(caminho_arquivo)
+        return buffer
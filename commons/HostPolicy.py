@@ -0,0 +1,183 @@
+import random
+import threading
+from time import monotonic, sleep
+from urllib.parse import urlparse
+from commons.utils import get_configuration_value
+
+# Valores padrão, sobrescritos no app.conf (chave geral ou chave_<host>)
+BACKOFF_BASE_PADRAO = 1
+BACKOFF_MAXIMO_PADRAO = 30
+# Sem limite de taxa por padrão, exceto nos hosts abaixo (requisições por segundo), consultados em rajadas durante as coletas
+TAXA_PADRAO = 0
+TAXAS_PADRAO_POR_HOST = {
+    'www.al.es.gov.br': 5,
+    'portaldatransparencia.gov.br': 5,
+}
+FALHAS_PARA_ABRIR_PADRAO = 5
+ESPERA_DISJUNTOR_PADRAO = 60
+
+ESTADO_FECHADO = 'fechado'
+ESTADO_ABERTO = 'aberto'
+ESTADO_SEMIABERTO = 'semiaberto'
+
+
+def _configuracao_do_host(chave, host, valor_padrao, valor_padrao_do_host=None):
+    valor_geral = get_configuration_value(chave, valor_padrao=valor_padrao)
+    return float(get_configuration_value(f"{chave}_{host}", valor_padrao=valor_geral if valor_padrao_do_host is None else valor_padrao_do_host))
+
+
+def tempo_backoff(tentativa, host=''):
+    """
+    Calcula a espera antes da próxima tentativa: backoff exponencial com jitter completo.
+
+    Parâmetros:
+        tentativa (int): Número da tentativa que falhou (1 para a primeira).
+        host (str): Host da requisição, permite sobrescrever HTTP_BACKOFF_BASE e HTTP_BACKOFF_MAXIMO por host.
+
+    Retorna:
+        float: Segundos de espera, sorteados entre 0 e min(maximo, base * 2 ** (tentativa - 1)).
+    """
+    host = host.lower()
+    with _lock:
+        # A configuração é lida uma única vez por host
+        if host not in _backoffs:
+            _backoffs[host] = (_configuracao_do_host("HTTP_BACKOFF_BASE", host, BACKOFF_BASE_PADRAO),
+                               _configuracao_do_host("HTTP_BACKOFF_MAXIMO", host, BACKOFF_MAXIMO_PADRAO))
+        base, maximo = _backoffs[host]
+    return random.uniform(0, min(maximo, base * 2 ** (tentativa - 1)))
+
+
+class TokenBucket:
+    """
+    Limitador de taxa (token bucket) das requisições a um host.
+
+    O balde acumula até "capacidade" fichas, repostas a "taxa" fichas por segundo. Cada requisição consome
+    uma ficha e aguarda enquanto o balde estiver vazio. Uma taxa 0 desativa o limite.
+
+    Methods:
+    - adquirir: Aguarda uma ficha disponível.
+    """
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = taxa
+        self.capacidade = capacidade or max(taxa, 1)
+        self._fichas = self.capacidade
+        self._ultima_reposicao = monotonic()
+        self._lock = threading.Lock()
+
+    def adquirir(self):
+        if self.taxa <= 0:
+            return
+        while True:
+            with self._lock:
+                agora = monotonic()
+                self._fichas = min(self.capacidade, self._fichas + (agora - self._ultima_reposicao) * self.taxa)
+                self._ultima_reposicao = agora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                espera = (1 - self._fichas) / self.taxa
+            sleep(espera)
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de um host: após "falhas_para_abrir" falhas consecutivas (exceções, 5xx ou 429) o disjuntor abre
+    e as requisições ao host falham imediatamente. Depois de "espera" segundos uma única requisição de teste é
+    liberada (semiaberto): se tiver sucesso o disjuntor fecha, senão volta a abrir.
+
+    Methods:
+    - permitir: Indica se uma requisição pode ser enviada ao host.
+    - registrar: Registra o resultado de uma requisição.
+    - estado: Retorna o estado corrente do disjuntor.
+    """
+
+    def __init__(self, falhas_para_abrir, espera):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.espera = espera
+        self._estado = ESTADO_FECHADO
+        self._falhas = 0
+        self._aberto_em = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    def permitir(self):
+        with self._lock:
+            if self._estado == ESTADO_FECHADO:
+                return True
+            if self._estado == ESTADO_ABERTO and monotonic() - self._aberto_em >= self.espera:
+                self._estado = ESTADO_SEMIABERTO
+                self._teste_em_andamento = False
+            if self._estado == ESTADO_SEMIABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            return False
+
+    def registrar(self, sucesso):
+        with self._lock:
+            if sucesso:
+                self._estado = ESTADO_FECHADO
+                self._falhas = 0
+                self._aberto_em = None
+            else:
+                self._falhas += 1
+                if self._estado == ESTADO_SEMIABERTO or self._falhas >= self.falhas_para_abrir:
+                    self._estado = ESTADO_ABERTO
+                    self._aberto_em = monotonic()
+            self._teste_em_andamento = False
+
+    def estado(self):
+        with self._lock:
+            estado = {"estado": self._estado, "falhas_consecutivas": self._falhas}
+            if self._estado == ESTADO_ABERTO:
+                estado["segundos_para_nova_tentativa"] = round(max(0, self.espera - (monotonic() - self._aberto_em)), 1)
+            return estado
+
+
+_limitadores = {}
+_disjuntores = {}
+_backoffs = {}
+_lock = threading.Lock()
+
+
+def _host(url):
+    return (urlparse(url).hostname or '').lower()
+
+
+def obter_limitador(url):
+    """
+    Retorna o limitador de taxa do host da URL, compartilhado pelo processo.
+    A taxa (requisições por segundo) é lida de HTTP_TAXA_<host>, TAXAS_PADRAO_POR_HOST ou HTTP_TAXA, nesta ordem;
+    0, o padrão, desativa o limite.
+    """
+    host = _host(url)
+    with _lock:
+        if host not in _limitadores:
+            taxa = _configuracao_do_host("HTTP_TAXA", host, TAXA_PADRAO, TAXAS_PADRAO_POR_HOST.get(host))
+            _limitadores[host] = TokenBucket(taxa, _configuracao_do_host("HTTP_RAJADA", host, max(taxa, 1)))
+        return _limitadores[host]
+
+
+def obter_disjuntor(url):
+    """
+    Retorna o disjuntor do host da URL, compartilhado pelo processo.
+    Configurado por HTTP_DISJUNTOR_FALHAS e HTTP_DISJUNTOR_ESPERA (segundos), gerais ou por host.
+    """
+    host = _host(url)
+    with _lock:
+        if host not in _disjuntores:
+            _disjuntores[host] = CircuitBreaker(_configuracao_do_host("HTTP_DISJUNTOR_FALHAS", host, FALHAS_PARA_ABRIR_PADRAO),
+                                                _configuracao_do_host("HTTP_DISJUNTOR_ESPERA", host, ESPERA_DISJUNTOR_PADRAO))
+        return _disjuntores[host]
+
+
+def estado_disjuntores():
+    """
+    Retorna o estado dos disjuntores de todos os hosts já acessados.
+
+    Retorna:
+        dict: {host: {"estado": fechado|aberto|semiaberto, "falhas_consecutivas": int, "segundos_para_nova_tentativa": float}}
+    """
+    with _lock:
+        disjuntores = dict(_disjuntores)
+    return {host: disjuntor.estado() for host, disjuntor in disjuntores.items()}
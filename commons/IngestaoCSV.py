@@ -0,0 +1,144 @@
+import os
+import csv
+import codecs
+
+# Tamanho do início do arquivo examinado na detecção da codificação
+TAMANHO_AMOSTRA_DETECCAO = 1024 * 1024
+
+
+def _literal(valor):
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def _identificador(coluna):
+    return '"' + str(coluna).replace('"', '""') + '"'
+
+
+def detectar_encoding(caminho):
+    '''
+    Retorna 'utf-8' se o início do arquivo (TAMANHO_AMOSTRA_DETECCAO) é UTF-8 válido, ou 'latin-1' caso contrário.
+    Um caractere multibyte interrompido pelo fim da amostra não invalida o UTF-8.
+    '''
+    with open(caminho, 'rb') as arquivo:
+        amostra = arquivo.read(TAMANHO_AMOSTRA_DETECCAO)
+    try:
+        # Sem final=True, os bytes de um caractere incompleto no fim da amostra ficam pendentes no decodificador
+        codecs.getincrementaldecoder('utf-8')().decode(amostra)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+class IngestaoCSV:
+    """
+    Especificação da leitura de um CSV baixado pelo domínio, executada inteiramente no DuckDB (read_csv paralelo).
+
+    Em vez de um DataFrame, a função de leitura do domínio pode retornar uma IngestaoCSV. A carga (add_to_database) faz,
+    em uma única consulta SQL, a leitura do arquivo, a seleção e conversão das colunas, a junção com a tabela de órgãos e
+    a gravação direta na tabela de staging dos servidores, sem passar pelo pandas.
+
+    As colunas selecionadas ficam disponíveis para a consulta do domínio na tabela "fonte", com os nomes declarados, e a
+    associação dos órgãos aos domínios (get_cache_domains) na tabela "orgaos" (ORGAO, SIGLA, DOMINIO).
+
+    O arquivo é lido uma única vez: o cabeçalho é obtido da primeira linha e a codificação, quando não declarada, de uma
+    amostra do início do arquivo. Com a tabela de órgãos, as colunas selecionadas são carregadas em uma tabela temporária,
+    de onde são obtidos os órgãos presentes na fonte, e a tabela orgaos é registrada antes da consulta de carga.
+
+    Methods:
+    - preparar: Monta a consulta da carga, registrando a tabela de órgãos na conexão.
+    - liberar: Remove a tabela temporária, o registro da tabela de órgãos e o arquivo lido.
+    """
+
+    def __init__(self, caminho, colunas, consulta, delimitador=',', decimal='.', encoding=None, numericas=None,
+                 fn_obter_orgaos=None, parametros=None, remover_arquivo=True):
+        '''
+        Parameters:
+            - caminho (str): Caminho do CSV baixado (ex.: HTTPRequestManager.download).
+            - colunas (dict): Colunas selecionadas, {posição (int) ou nome no cabeçalho (str): nome na tabela fonte}.
+            - consulta (str): SELECT sobre as tabelas fonte e orgaos que retorna as colunas obrigatórias dos servidores.
+            - delimitador (str): Delimitador dos campos. O padrão é ','.
+            - decimal (str): Separador decimal das colunas numéricas. O padrão é '.'.
+            - encoding (str): Codificação do arquivo (utf-8, latin-1...). O padrão None detecta entre utf-8 e latin-1.
+            - numericas (list of str): Colunas da tabela fonte convertidas para DOUBLE; valores inválidos resultam em NULL. O padrão é None.
+            - fn_obter_orgaos (function): Recebe a lista de órgãos (coluna ORGAO da fonte) e retorna o DataFrame da tabela orgaos. O padrão é None.
+            - parametros (dict): Parâmetros ($nome) da consulta. O padrão é None.
+            - remover_arquivo (bool): Remove o arquivo após a carga. O padrão é True.
+        '''
+        self.caminho = caminho
+        self.colunas = colunas
+        self.consulta = consulta
+        self.delimitador = delimitador
+        self.decimal = decimal
+        self.encoding = encoding
+        self.numericas = numericas or []
+        self.fn_obter_orgaos = fn_obter_orgaos
+        self.parametros = parametros or {}
+        self.remover_arquivo = remover_arquivo
+
+    def _ler_cabecalho(self, encoding):
+        with open(self.caminho, 'r', encoding=encoding, newline='') as arquivo:
+            return next(csv.reader(arquivo, delimiter=self.delimitador), [])
+
+    def _leitura(self, encoding, quantidade_colunas):
+        # As colunas são nomeadas pela posição, sem depender dos nomes (repetidos ou vazios) do cabeçalho.
+        # Todas são lidas como texto, a conversão das numéricas é feita na seleção, tolerando valores inválidos
+        nomes = ', '.join(_literal(f'c{posicao}') for posicao in range(quantidade_colunas))
+        return (f"read_csv({_literal(self.caminho)}, delim={_literal(self.delimitador)}, header=true, names=[{nomes}], "
+                f"all_varchar=true, encoding={_literal(encoding)})")
+
+    def _selecao(self, encoding):
+        cabecalho = [coluna.strip() for coluna in self._ler_cabecalho(encoding)]
+        if cabecalho and cabecalho[0].startswith('\ufeff'):
+            cabecalho[0] = cabecalho[0][1:]
+        expressoes = []
+        for coluna, nome in self.colunas.items():
+            if isinstance(coluna, int):
+                if coluna >= len(cabecalho):
+                    raise ValueError(f'Coluna {coluna} ausente no CSV ({len(cabecalho)} colunas).')
+                posicao = coluna
+            elif coluna in cabecalho:
+                posicao = cabecalho.index(coluna)
+            else:
+                raise ValueError(f'Coluna {coluna} ausente no CSV.')
+            expressao = _identificador(f'c{posicao}')
+            if nome in self.numericas:
+                if self.decimal != '.':
+                    expressao = f"replace({expressao}, {_literal(self.decimal)}, '.')"
+                expressao = f'TRY_CAST(trim({expressao}) AS DOUBLE)'
+            expressoes.append(f'{expressao} AS {_identificador(nome)}')
+        return f"SELECT {', '.join(expressoes)} FROM {self._leitura(encoding, len(cabecalho))}"
+
+    def _tabela_temporaria(self):
+        return f'fonte_csv_{id(self)}'
+
+    def preparar(self, con):
+        '''
+        Monta a consulta da carga e registra a tabela de órgãos na conexão.
+
+        Parameters:
+            - con (DuckDBPyConnection): Conexão em que a carga será executada.
+
+        Returns:
+            - tuple: (consulta SQL completa, parâmetros)
+        '''
+        fonte = self._selecao(self.encoding or detectar_encoding(self.caminho))
+
+        if self.fn_obter_orgaos is not None:
+            # A única leitura do arquivo grava as colunas selecionadas, e os órgãos presentes são obtidos sem relê-lo
+            tabela = self._tabela_temporaria()
+            con.execute(f'CREATE TEMP TABLE {tabela} AS {fonte}')
+            orgaos = [linha[0] for linha in con.execute(f'SELECT DISTINCT ORGAO FROM {tabela} WHERE ORGAO IS NOT NULL').fetchall()]
+            con.register('orgaos', self.fn_obter_orgaos(orgaos))
+            fonte = f'SELECT * FROM {tabela}'
+
+        return f'WITH fonte AS ({fonte}) {self.consulta}', self.parametros
+
+    def liberar(self, con):
+        if self.fn_obter_orgaos is not None:
+            try:
+                con.unregister('orgaos')
+            except Exception:
+                pass
+            con.execute(f'DROP TABLE IF EXISTS temp.{self._tabela_temporaria()}')
+        if self.remover_arquivo and os.path.exists(self.caminho):
+            os.remove(self.caminho)
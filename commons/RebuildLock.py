@@ -0,0 +1,98 @@
+import os
+import threading
+from time import sleep
+from commons.utils import get_configuration_value
+
+try:
+    import fcntl
+except ImportError:
+    # Windows não possui fcntl, utiliza o bloqueio de arquivos do msvcrt
+    fcntl = None
+    import msvcrt
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+
+
+class RebuildLock:
+    """
+    Garante que apenas um chamador por domínio reconstrua o banco de servidores (single-flight).
+
+    O bloqueio combina um threading.Lock, que coordena as threads do processo, com um bloqueio exclusivo
+    sobre o arquivo <dominio>.lock em CACHE_DIRECTORY, que coordena os diversos processos (workers) do servidor.
+
+    Methods:
+    - acquire: Adquire o bloqueio do domínio.
+        Parameters:
+            - bloquear (bool): Se False retorna imediatamente caso outro chamador detenha o bloqueio. O padrão é True.
+        Returns:
+            - bool: True se o bloqueio foi adquirido.
+    - release: Libera o bloqueio do domínio.
+    """
+
+    def __init__(self, dominio):
+        self.dominio = dominio
+        self.caminho_arquivo = os.path.join(CACHE_DIRECTORY, f'{dominio}.lock')
+        self._lock = threading.Lock()
+        self._arquivo = None
+
+    def _bloquear_arquivo(self, bloquear):
+        arquivo = open(self.caminho_arquivo, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX if bloquear else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                while True:
+                    try:
+                        arquivo.seek(0)
+                        msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        if not bloquear:
+                            raise
+                        sleep(1)
+        except OSError:
+            arquivo.close()
+            return False
+        self._arquivo = arquivo
+        return True
+
+    def acquire(self, bloquear=True):
+        if not self._lock.acquire(blocking=bloquear):
+            return False
+        if not self._bloquear_arquivo(bloquear):
+            self._lock.release()
+            return False
+        return True
+
+    def release(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._arquivo.fileno(), fcntl.LOCK_UN)
+            else:
+                self._arquivo.seek(0)
+                msvcrt.locking(self._arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._arquivo.close()
+            self._arquivo = None
+            self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+_rebuild_locks = {}
+_rebuild_locks_lock = threading.Lock()
+
+
+def obter_rebuild_lock(dominio):
+    '''
+    Retorna o bloqueio de reconstrução do domínio, compartilhado por todas as instâncias do processo.
+    '''
+    with _rebuild_locks_lock:
+        if dominio not in _rebuild_locks:
+            _rebuild_locks[dominio] = RebuildLock(dominio)
+        return _rebuild_locks[dominio]
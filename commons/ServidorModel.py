@@ -24,6 +24,14 @@ class ServidorModel:
             }
         raise TypeError("Objeto ServidorModel não é serializável!")
     
+
+    @staticmethod
+    def from_registro(orgao, nome, valor, dominio, sigla):
+        """
+        Cria um ServidorModel a partir de um registro da tabela servidores, compondo o subdomínio do órgão.
+        """
+        return ServidorModel(orgao, nome, valor, sigla+'.'+dominio if sigla not in dominio else dominio)
+
    
     @staticmethod
     def to_json_list(servidores):
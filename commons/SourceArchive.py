@@ -0,0 +1,99 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from time import time
+from commons.utils import get_configuration_value
+from commons.Cassette import Cassette, MODO_GRAVAR, MODO_REPRODUZIR
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+DIRETORIO_ARQUIVO_FONTES = os.path.join(CACHE_DIRECTORY, 'arquivo_fontes')
+
+# Corpos gravados ou reaproveitados há menos tempo que isso (segundos) podem pertencer a uma gravação em andamento
+CARENCIA_REMOCAO_CORPOS = 60 * 60
+
+
+class SourceArchive:
+    """
+    Arquivo das fontes de dados brutas baixadas pelas funções de leitura dos domínios, para reprocessamento sem novo download.
+
+    Cada reconstrução grava as requisições da leitura (Cassette) em <diretorio>/<dominio>/<chave dos links>, onde a
+    chave identifica os links retornados por fn_obter_link_mais_recente. Os corpos (zip, CSV, ODS, XLSX...) são
+    endereçados pelo conteúdo em <diretorio>/corpos e compartilhados entre gerações e domínios.
+
+    A retenção (número de gerações mantidas por domínio) é lida do app.conf pela chave ARQUIVO_FONTES_RETENCAO_<dominio>
+    ou, na ausência dela, ARQUIVO_FONTES_RETENCAO. O padrão 0 desativa o arquivo.
+
+    Methods:
+    - habilitado: Indica se as fontes do domínio devem ser arquivadas.
+    - possui: Indica se há fontes arquivadas para os links.
+    - gravacao / reproducao: Retornam a gravação (Cassette) da geração, para gravar ou reproduzir a leitura.
+    - aplicar_retencao: Remove as gerações excedentes do domínio e os corpos que não são mais referenciados.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_ARQUIVO_FONTES):
+        self.diretorio = diretorio
+        self.diretorio_corpos = os.path.join(diretorio, 'corpos')
+        self._lock = threading.Lock()
+
+    def retencao(self, dominio):
+        return int(get_configuration_value(f"ARQUIVO_FONTES_RETENCAO_{dominio}", valor_padrao=get_configuration_value("ARQUIVO_FONTES_RETENCAO", valor_padrao=0)))
+
+    def habilitado(self, dominio):
+        return self.retencao(dominio) > 0
+
+    def chave(self, links):
+        return hashlib.sha256(json.dumps(links, default=str).encode()).hexdigest()
+
+    def _diretorio_geracao(self, dominio, links):
+        return os.path.join(self.diretorio, dominio, self.chave(links))
+
+    def possui(self, dominio, links):
+        diretorio_interacoes = os.path.join(self._diretorio_geracao(dominio, links), 'interacoes')
+        return os.path.isdir(diretorio_interacoes) and bool(os.listdir(diretorio_interacoes))
+
+    def gravacao(self, dominio, links):
+        # A data da geração é renovada a cada gravação, definindo a ordem da retenção
+        diretorio_geracao = self._diretorio_geracao(dominio, links)
+        os.makedirs(diretorio_geracao, exist_ok=True)
+        os.utime(diretorio_geracao)
+        return Cassette(MODO_GRAVAR, diretorio_geracao, diretorio_corpos=self.diretorio_corpos)
+
+    def reproducao(self, dominio, links):
+        return Cassette(MODO_REPRODUZIR, self._diretorio_geracao(dominio, links), diretorio_corpos=self.diretorio_corpos)
+
+    def aplicar_retencao(self, dominio):
+        diretorio_dominio = os.path.join(self.diretorio, dominio)
+        if not os.path.isdir(diretorio_dominio):
+            return
+        with self._lock:
+            geracoes = sorted((os.path.join(diretorio_dominio, nome) for nome in os.listdir(diretorio_dominio)),
+                              key=os.path.getmtime, reverse=True)
+            for geracao in geracoes[self.retencao(dominio):]:
+                shutil.rmtree(geracao, ignore_errors=True)
+            self._remover_corpos_sem_referencia()
+
+    def _remover_corpos_sem_referencia(self):
+        if not os.path.isdir(self.diretorio_corpos):
+            return
+        referenciados = set()
+        for raiz, _, arquivos in os.walk(self.diretorio):
+            if os.path.basename(raiz) != 'interacoes':
+                continue
+            for nome in arquivos:
+                try:
+                    with open(os.path.join(raiz, nome), 'r', encoding='utf-8') as arquivo:
+                        referenciados.add(json.load(arquivo)["corpo"])
+                except (OSError, ValueError, KeyError):
+                    continue
+        for nome in os.listdir(self.diretorio_corpos):
+            caminho_corpo = os.path.join(self.diretorio_corpos, nome)
+            # Arquivos temporários e corpos recentes pertencem a gravações em andamento
+            if nome in referenciados or nome.startswith('.') or time() - os.path.getmtime(caminho_corpo) < CARENCIA_REMOCAO_CORPOS:
+                continue
+            os.remove(caminho_corpo)
+
+
+# Arquivo compartilhado por todos os domínios do processo
+source_archive = SourceArchive()
@@ -0,0 +1,151 @@
+import os
+import json
+import tempfile
+import threading
+import duckdb
+from commons.utils import get_configuration_value, gravar_json_atomico, sincronizar_arquivo, sincronizar_diretorio
+from commons.ServidorModel import ServidorModel
+from commons.DatabaseRegistry import database_registry
+from commons.FreshnessCache import FreshnessCache
+from commons.name_keys import buscar_logins, montar_tabela_logins
+
+CACHE_DIRECTORY = get_configuration_value("CACHE_DIRECTORY")
+DIRETORIO_INDICE = os.path.join(CACHE_DIRECTORY, 'indice_unificado')
+ARQUIVO_PARTICAO = 'servidores.parquet'
+# Geração do banco do domínio da qual a partição foi gerada
+ARQUIVO_GERACAO = 'geracao.json'
+
+
+class UnifiedIndex:
+    """
+    Índice consolidado, opcional, dos servidores de todos os domínios em partições Parquet (indice_unificado/tld=<dominio>/).
+
+    Cada domínio reescreve apenas a sua partição ao publicar uma nova geração do banco, e uma única consulta
+    resolve emails de qualquer domínio, inclusive lotes com domínios misturados, sem abrir o banco de cada
+    domínio nem carregar o módulo correspondente. Habilitado pela chave INDICE_UNIFICADO: true do app.conf.
+
+    A partição só é usada enquanto corresponder à geração corrente do banco do domínio (manifesto do DatabaseRegistry)
+    e os identificadores da fonte de dados do domínio estiverem dentro da validade (FreshnessCache). Fora disso, os
+    emails do domínio ficam sem resolução e seguem pela consulta ao próprio domínio, que verifica a fonte de dados.
+
+    Methods:
+    - preparar: Exporta a tabela servidores do banco em construção para um arquivo temporário da partição do domínio.
+        Parameters:
+            - dominio (str): Domínio (tld) da partição.
+            - con (DuckDBPyConnection): Conexão do banco em construção, que contém a tabela servidores.
+        Returns:
+            - str: Caminho do arquivo temporário, a ser publicado depois do manifesto da geração.
+
+    - publicar: Substitui a partição do domínio pelo arquivo preparado, associando-a à geração publicada.
+        Parameters:
+            - dominio (str): Domínio (tld) da partição.
+            - caminho_temporario (str): Arquivo retornado por preparar.
+            - manifesto (dict): Manifesto da geração publicada (hash_arquivo e geracao).
+
+    - buscar: Resolve uma lista de emails de quaisquer domínios com partição atualizada.
+        Parameters:
+            - emails (list of str): Emails a serem resolvidos.
+        Returns:
+            - list: Para cada email, na ordem de entrada, a lista de ServidorModel encontrados ou None se o domínio do
+              email não tem partição atualizada.
+    """
+
+    def __init__(self, diretorio=DIRETORIO_INDICE):
+        self.diretorio = diretorio
+        self.habilitado = get_configuration_value("INDICE_UNIFICADO", valor_padrao='false').lower() == 'true'
+        self._lock = threading.Lock()
+        self._conexao = None
+
+    def _caminho_particao(self, dominio):
+        return os.path.join(self.diretorio, f'tld={dominio}')
+
+    def _dominios_publicados(self):
+        if not os.path.isdir(self.diretorio):
+            return []
+        return [nome.split('=', 1)[1] for nome in os.listdir(self.diretorio)
+                if nome.startswith('tld=') and os.path.isfile(os.path.join(self.diretorio, nome, ARQUIVO_PARTICAO))]
+
+    def preparar(self, dominio, con):
+        diretorio_particao = self._caminho_particao(dominio)
+        os.makedirs(diretorio_particao, exist_ok=True)
+        descritor, caminho_temporario = tempfile.mkstemp(dir=diretorio_particao, prefix=f'{ARQUIVO_PARTICAO}.', suffix='.tmp')
+        os.close(descritor)
+
+        try:
+            con.execute(f"""COPY (SELECT * FROM servidores ORDER BY NOME_SEM_ESPACOS)
+                            TO '{caminho_temporario}' (FORMAT PARQUET, COMPRESSION ZSTD)""")
+            sincronizar_arquivo(caminho_temporario)
+        except BaseException:
+            os.remove(caminho_temporario)
+            raise
+        return caminho_temporario
+
+    def publicar(self, dominio, caminho_temporario, manifesto):
+        diretorio_particao = self._caminho_particao(dominio)
+
+        # A partição é substituída atomicamente, consultas em andamento seguem lendo o arquivo anterior. Até a gravação da
+        # geração, a nova partição é considerada desatualizada e as buscas do domínio seguem pelo banco do domínio
+        os.replace(caminho_temporario, os.path.join(diretorio_particao, ARQUIVO_PARTICAO))
+        gravar_json_atomico(os.path.join(diretorio_particao, ARQUIVO_GERACAO), {
+            "hash_arquivo": manifesto.get("hash_arquivo"),
+            "geracao": manifesto.get("geracao")
+        })
+        sincronizar_diretorio(diretorio_particao)
+
+    def _atualizada(self, dominio):
+        try:
+            with open(os.path.join(self._caminho_particao(dominio), ARQUIVO_GERACAO), 'r', encoding='utf-8') as arquivo:
+                geracao = json.load(arquivo)
+        except (OSError, json.JSONDecodeError):
+            return False
+
+        entrada = database_registry.obter(dominio)
+        if not entrada or (geracao.get("hash_arquivo"), geracao.get("geracao")) != (entrada.get("hash_arquivo"), entrada.get("geracao")):
+            return False
+
+        # Fonte de dados com validade expirada precisa ser verificada pelo domínio, que reconstrói o banco se houver novidade
+        return FreshnessCache(dominio).obter() is not None
+
+    def _rotear(self, dominio_login, dominios):
+        # Mesmo critério do utils.identificar_dominio: o domínio publicado mais específico que seja sufixo do email
+        candidatos = [dominio for dominio in dominios if dominio_login == dominio or dominio_login.endswith('.' + dominio)]
+        return max(candidatos, key=len) if candidatos else None
+
+    def buscar(self, emails):
+        resultado = [None for _ in emails]
+
+        dominios = self._dominios_publicados()
+        logins = montar_tabela_logins(emails)
+        logins['TLD_LOGIN'] = [self._rotear(dominio, dominios) for dominio in logins['DOMINIO_LOGIN']]
+        logins = logins[logins['TLD_LOGIN'].notna()]
+
+        # Apenas os domínios cuja partição corresponde à geração corrente do banco são resolvidos pelo índice
+        atualizados = {dominio for dominio in set(logins['TLD_LOGIN']) if self._atualizada(dominio)}
+        logins = logins[logins['TLD_LOGIN'].isin(atualizados)]
+        if logins.empty:
+            return resultado
+        for posicao in logins['POSICAO']:
+            resultado[posicao] = []
+
+        with self._lock:
+            if self._conexao is None:
+                self._conexao = duckdb.connect()
+            cursor = self._conexao.cursor()
+
+        try:
+            caminho_particoes = os.path.join(self.diretorio, 'tld=*', ARQUIVO_PARTICAO)
+            cursor.execute(f"CREATE TEMP VIEW servidores AS SELECT * FROM read_parquet('{caminho_particoes}', hive_partitioning = true)")
+            rows = buscar_logins(cursor, logins, filtro_extra='AND TLD = TLD_LOGIN')
+        finally:
+            cursor.close()
+
+        for posicao, *registro in rows:
+            servidor = ServidorModel.from_registro(*registro)
+            servidor.email = emails[posicao]
+            resultado[posicao].append(servidor)
+
+        return resultado
+
+
+# Índice compartilhado por todas as instâncias de domínio do processo
+unified_index = UnifiedIndex()
@@ -0,0 +1,114 @@
+import re
+import pandas as pd
+from unidecode import unidecode
+
+# Versão do esquema da tabela servidores, compõe o hash dos bancos para forçar a reconstrução quando as colunas mudam
+VERSAO_ESQUEMA = 3
+
+# Colunas de busca pré-calculadas na construção do banco do domínio
+SQL_COLUNAS_CHAVE = """
+    replace(NOME_NORMALIZADO, ' ', '') AS NOME_SEM_ESPACOS,
+    lower(concat(SIGLA, '.', DOMINIO)) AS SUBDOMINIO
+"""
+
+# Índices criados sobre as colunas de busca
+SQL_INDICES = [
+    'CREATE INDEX idx_servidores_nome_sem_espacos ON servidores (NOME_SEM_ESPACOS)',
+]
+
+
+def normalizar_nome(nome):
+    '''
+    Normaliza um nome para comparação com o login do email: sem acentos, minúsculo e com espaços simples.
+
+    Parameters:
+        - nome (str): Nome a ser normalizado.
+
+    Returns:
+        - str: Nome normalizado ou None se o nome for nulo.
+    '''
+    if nome is None:
+        return None
+    return re.sub(r'\s+', ' ', unidecode(str(nome)).lower()).strip()
+
+
+def limite_prefixo(prefixo):
+    '''
+    Retorna o menor texto maior que todos os textos iniciados por prefixo, permitindo buscas por faixa (>= prefixo AND < limite).
+    '''
+    if not prefixo:
+        return '\uffff'
+    return prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+
+
+def extrair_login(email):
+    '''
+    Separa o email em nome, sobrenome e domínio normalizados.
+
+    Parameters:
+        - email (str): Email no formato nome.sobrenome@dominio.
+
+    Returns:
+        - tuple: (nome, sobrenome, dominio)
+    '''
+    login, dominio = email.split("@")
+    nome, sobrenome = login.split(".")
+    return normalizar_nome(nome), normalizar_nome(sobrenome), dominio.lower()
+
+
+# Busca em lote: resolve todos os logins da tabela "logins" contra a tabela "servidores" em uma única consulta, com os
+# mesmos critérios da busca individual: nome e sobrenome em sequência em qualquer posição do nome normalizado, ou o login
+# como prefixo do nome sem espaços (busca por faixa, que descarta blocos inteiros da tabela ordenada por NOME_SEM_ESPACOS)
+SQL_BUSCA_LOTE = """
+    SELECT DISTINCT POSICAO, ORGAO, NOME, REMUNERACAO_MENSAL_MEDIA, DOMINIO, SIGLA FROM (
+        SELECT l.*, s.* FROM logins l JOIN servidores s ON s.NOME_NORMALIZADO LIKE '%' || l.NOME_LOGIN || '%' || l.SOBRENOME_LOGIN || '%'
+        UNION ALL
+        SELECT l.*, s.* FROM logins l JOIN servidores s ON s.NOME_SEM_ESPACOS >= l.NOME_LOGIN AND s.NOME_SEM_ESPACOS < l.LIMITE_NOME
+            WHERE s.NOME_SEM_ESPACOS LIKE l.NOME_LOGIN || '%' || l.SOBRENOME_LOGIN || '%'
+    ) WHERE (SUBDOMINIO LIKE '%' || DOMINIO_LOGIN OR LOWER(DOMINIO) LIKE '%' || DOMINIO_LOGIN) {filtro_extra}
+    ORDER BY POSICAO
+"""
+
+
+def buscar_logins(cursor, logins, filtro_extra=''):
+    '''
+    Resolve os logins contra a tabela servidores da conexão (SQL_BUSCA_LOTE).
+
+    Parameters:
+        - cursor (DuckDBPyConnection): Conexão com a tabela servidores.
+        - logins (DataFrame): Tabela de logins (montar_tabela_logins).
+        - filtro_extra (str): Condição adicional aplicada à busca. O padrão é ''.
+
+    Returns:
+        - list of tuple: Registros (POSICAO, ORGAO, NOME, REMUNERACAO_MENSAL_MEDIA, DOMINIO, SIGLA).
+    '''
+    cursor.register('logins', logins)
+    return cursor.execute(SQL_BUSCA_LOTE.format(filtro_extra=filtro_extra)).fetchall()
+
+
+def montar_tabela_logins(emails):
+    '''
+    Monta a tabela de logins usada na busca em lote.
+
+    Parameters:
+        - emails (list of str): Emails no formato nome.sobrenome@dominio.
+
+    Returns:
+        - DataFrame: Colunas POSICAO, EMAIL, NOME_LOGIN, SOBRENOME_LOGIN, LIMITE_NOME e DOMINIO_LOGIN.
+          Emails fora do formato esperado são ignorados.
+    '''
+    registros = []
+    for posicao, email in enumerate(emails):
+        try:
+            nome, sobrenome, dominio = extrair_login(email)
+        except ValueError:
+            continue
+        registros.append({
+            "POSICAO": posicao,
+            "EMAIL": email,
+            "NOME_LOGIN": nome,
+            "SOBRENOME_LOGIN": sobrenome,
+            "LIMITE_NOME": limite_prefixo(nome),
+            "DOMINIO_LOGIN": dominio
+        })
+    return pd.DataFrame(registros, columns=["POSICAO", "EMAIL", "NOME_LOGIN", "SOBRENOME_LOGIN", "LIMITE_NOME", "DOMINIO_LOGIN"])
@@ -0,0 +1,333 @@
+import zipfile
+import pandas as pd
+from lxml import etree
+
+NS_TABLE = 'urn:oasis:names:tc:opendocument:xmlns:table:1.0'
+NS_OFFICE = 'urn:oasis:names:tc:opendocument:xmlns:office:1.0'
+NS_TEXT = 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'
+
+TAG_TABELA = f'{{{NS_TABLE}}}table'
+TAG_LINHA = f'{{{NS_TABLE}}}table-row'
+TAGS_CELULA = (f'{{{NS_TABLE}}}table-cell', f'{{{NS_TABLE}}}covered-table-cell')
+TAG_PARAGRAFO = f'{{{NS_TEXT}}}p'
+
+ATRIBUTO_NOME_TABELA = f'{{{NS_TABLE}}}name'
+ATRIBUTO_LINHAS_REPETIDAS = f'{{{NS_TABLE}}}number-rows-repeated'
+ATRIBUTO_COLUNAS_REPETIDAS = f'{{{NS_TABLE}}}number-columns-repeated'
+ATRIBUTO_TIPO_VALOR = f'{{{NS_OFFICE}}}value-type'
+
+# Tipos numéricos do ODF, lidos do atributo office:value
+TIPOS_NUMERICOS = ('float', 'currency', 'percentage')
+# Demais tipos com valor em atributo próprio (o texto exibido pode estar formatado)
+ATRIBUTOS_VALOR = {
+    'date': f'{{{NS_OFFICE}}}date-value',
+    'time': f'{{{NS_OFFICE}}}time-value',
+    'boolean': f'{{{NS_OFFICE}}}boolean-value',
+    'string': f'{{{NS_OFFICE}}}string-value',
+}
+
+
+def _texto(elemento):
+    # Texto de um parágrafo, expandindo os espaços (text:s), tabulações e quebras de linha do ODF
+    partes = [elemento.text or '']
+    for filho in elemento:
+        nome = etree.QName(filho).localname
+        if nome == 's':
+            partes.append(' ' * int(filho.get(f'{{{NS_TEXT}}}c', 1)))
+        elif nome == 'tab':
+            partes.append('\t')
+        elif nome == 'line-break':
+            partes.append('\n')
+        else:
+            partes.append(_texto(filho))
+        partes.append(filho.tail or '')
+    return ''.join(partes)
+
+
+def _valor_celula(celula):
+    tipo = celula.get(ATRIBUTO_TIPO_VALOR)
+    if tipo is None and len(celula) == 0:
+        return None
+    if tipo in TIPOS_NUMERICOS:
+        return float(celula.get(f'{{{NS_OFFICE}}}value'))
+    if tipo in ATRIBUTOS_VALOR and celula.get(ATRIBUTOS_VALOR[tipo]) is not None:
+        valor = celula.get(ATRIBUTOS_VALOR[tipo])
+        return valor == 'true' if tipo == 'boolean' else valor
+    paragrafos = [_texto(paragrafo) for paragrafo in celula.iter(TAG_PARAGRAFO)]
+    if tipo is None and not paragrafos:
+        return None
+    return '\n'.join(paragrafos)
+
+
+def _linha(elemento, limite_colunas):
+    valores = []
+    # Células vazias só são incluídas quando seguidas de uma célula com valor, descartando as repetições do final da linha
+    vazias_pendentes = 0
+    for celula in elemento:
+        if celula.tag not in TAGS_CELULA:
+            continue
+        valor = _valor_celula(celula)
+        repeticoes = int(celula.get(ATRIBUTO_COLUNAS_REPETIDAS, 1))
+        if valor is None:
+            vazias_pendentes += repeticoes
+            continue
+        valores.extend([None] * vazias_pendentes)
+        vazias_pendentes = 0
+        valores.extend([valor] * repeticoes)
+        if limite_colunas is not None and len(valores) >= limite_colunas:
+            return valores[:limite_colunas]
+    return valores
+
+
+def iterar_linhas_ods(arquivo, planilha=0, limite_colunas=None):
+    '''
+    Lê as linhas de uma planilha de um arquivo ODS com um parser XML incremental sobre o content.xml, sem carregar o documento.
+    A memória usada é proporcional a uma linha; as linhas já lidas são descartadas da árvore.
+
+    Parameters:
+        - arquivo (str or file): Caminho ou arquivo (binário) do ODS.
+        - planilha (int or str): Índice ou nome da planilha. O padrão é 0.
+        - limite_colunas (int): Quantidade máxima de colunas lidas de cada linha. O padrão é None (todas).
+
+    Returns:
+        - generator of list: Valores de cada linha não vazia (float, str, bool ou None), com as linhas repetidas expandidas.
+    '''
+    with zipfile.ZipFile(arquivo) as zip_file, zip_file.open('content.xml') as conteudo:
+        indice_tabela = -1
+        na_planilha = False
+        profundidade_linha = 0
+        for evento, elemento in etree.iterparse(conteudo, events=('start', 'end'), tag=(TAG_TABELA, TAG_LINHA)):
+            if elemento.tag == TAG_TABELA:
+                if evento == 'start':
+                    indice_tabela += 1
+                    na_planilha = planilha in (indice_tabela, elemento.get(ATRIBUTO_NOME_TABELA))
+                    continue
+                if na_planilha:
+                    return
+                elemento.clear()
+                continue
+
+            # Linhas aninhadas (sub-tabelas) são tratadas como parte da linha externa
+            if evento == 'start':
+                profundidade_linha += 1
+                continue
+            profundidade_linha -= 1
+            if profundidade_linha > 0:
+                continue
+            if na_planilha:
+                valores = _linha(elemento, limite_colunas)
+                if valores:
+                    for _ in range(int(elemento.get(ATRIBUTO_LINHAS_REPETIDAS, 1))):
+                        yield list(valores)
+            # Descarta a linha processada e as anteriores, mantendo apenas a linha corrente em memória
+            elemento.clear()
+            while elemento.getprevious() is not None:
+                del elemento.getparent()[0]
+    raise ValueError(f'Planilha {planilha} não encontrada no arquivo ODS.')
+
+
+def ler_ods(arquivo, planilha=0, colunas=None):
+    '''
+    Lê uma planilha de um arquivo ODS como DataFrame, usando a primeira linha como cabeçalho (ver iterar_linhas_ods).
+
+    Parameters:
+        - arquivo (str or file): Caminho ou arquivo (binário) do ODS.
+        - planilha (int or str): Índice ou nome da planilha. O padrão é 0.
+        - colunas (list of int or str): Colunas lidas, por posição ou nome no cabeçalho. O padrão é None (todas).
+
+    Returns:
+        - DataFrame: Valores da planilha, com colunas numéricas em float64 e células vazias como None/NaN.
+    '''
+    linhas = iterar_linhas_ods(arquivo, planilha)
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return pd.DataFrame()
+
+    posicoes = range(len(cabecalho)) if colunas is None else [coluna if isinstance(coluna, int) else cabecalho.index(coluna) for coluna in colunas]
+    valores = {posicao: [] for posicao in posicoes}
+    for linha in linhas:
+        for posicao, lista in valores.items():
+            lista.append(linha[posicao] if posicao < len(linha) else None)
+
+    return pd.DataFrame({cabecalho[posicao] if posicao < len(cabecalho) else posicao: lista for posicao, lista in valores.items()})
+
+
+NS_RELACIONAMENTOS_PACOTE = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+
+def _indice_coluna(referencia):
+    # Converte a referência da célula (ex.: "AB12") no índice da coluna, a partir de 0
+    indice = 0
+    for caractere in referencia:
+        if not caractere.isalpha():
+            break
+        indice = indice * 26 + ord(caractere.upper()) - ord('A') + 1
+    return indice - 1
+
+
+def converter_decimal(valor, decimal=','):
+    '''
+    Converte um valor da planilha em float, interpretando textos no formato brasileiro ("1.234,56") quando decimal=','.
+    Valores vazios ou inválidos resultam em None.
+    '''
+    if valor is None or isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).strip()
+    if decimal != '.' and decimal in texto:
+        texto = texto.replace('.' if decimal == ',' else ',', '').replace(decimal, '.')
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def _caminho_planilha_xlsx(zip_file, planilha):
+    # Localiza o XML da planilha (por índice ou nome) pelo workbook.xml e seus relacionamentos
+    workbook = etree.fromstring(zip_file.read('xl/workbook.xml'))
+    ns = etree.QName(workbook).namespace
+    planilhas = workbook.findall(f'{{{ns}}}sheets/{{{ns}}}sheet')
+    for indice, elemento in enumerate(planilhas):
+        if planilha in (indice, elemento.get('name')):
+            id_relacionamento = next(valor for chave, valor in elemento.attrib.items() if etree.QName(chave).localname == 'id')
+            break
+    else:
+        raise ValueError(f'Planilha {planilha} não encontrada no arquivo XLSX.')
+
+    relacionamentos = etree.fromstring(zip_file.read('xl/_rels/workbook.xml.rels'))
+    for relacionamento in relacionamentos.iter(f'{{{NS_RELACIONAMENTOS_PACOTE}}}Relationship'):
+        if relacionamento.get('Id') == id_relacionamento:
+            destino = relacionamento.get('Target')
+            return ns, destino.lstrip('/') if destino.startswith('/') else 'xl/' + destino
+    raise ValueError(f'Planilha {planilha} sem relacionamento no arquivo XLSX.')
+
+
+def _textos_compartilhados(zip_file, ns):
+    # Tabela de textos compartilhados (sharedStrings.xml), ignorando as anotações fonéticas (rPh)
+    if 'xl/sharedStrings.xml' not in zip_file.namelist():
+        return []
+    tag_t, tag_r = f'{{{ns}}}t', f'{{{ns}}}r'
+    textos = []
+    with zip_file.open('xl/sharedStrings.xml') as conteudo:
+        for _, elemento in etree.iterparse(conteudo, tag=f'{{{ns}}}si'):
+            partes = []
+            for filho in elemento:
+                if filho.tag == tag_t:
+                    partes.append(filho.text or '')
+                elif filho.tag == tag_r:
+                    partes.extend(t.text or '' for t in filho.iter(tag_t))
+            textos.append(''.join(partes))
+            elemento.clear()
+            while elemento.getprevious() is not None:
+                del elemento.getparent()[0]
+    return textos
+
+
+def iterar_linhas_xlsx(arquivo, planilha=0, colunas=None):
+    '''
+    Lê as linhas de uma planilha de um arquivo XLSX com um parser XML incremental sobre o XML da planilha, sem carregar a pasta
+    de trabalho. Além da tabela de textos compartilhados, a memória usada é proporcional a uma linha.
+
+    Parameters:
+        - arquivo (str or file): Caminho ou arquivo (binário) do XLSX.
+        - planilha (int or str): Índice ou nome da planilha. O padrão é 0.
+        - colunas (list of int): Posições das colunas lidas, na ordem desejada. O padrão é None (todas).
+
+    Returns:
+        - generator of list: Valores de cada linha não vazia (float, str, bool ou None). Datas são retornadas como o número serial do Excel.
+    '''
+    with zipfile.ZipFile(arquivo) as zip_file:
+        ns, caminho_planilha = _caminho_planilha_xlsx(zip_file, planilha)
+        textos = _textos_compartilhados(zip_file, ns)
+        tag_linha, tag_celula, tag_v, tag_is, tag_t = (f'{{{ns}}}{nome}' for nome in ('row', 'c', 'v', 'is', 't'))
+        selecionadas = None if colunas is None else set(colunas)
+
+        with zip_file.open(caminho_planilha) as conteudo:
+            for _, elemento in etree.iterparse(conteudo, tag=tag_linha):
+                valores = {}
+                proxima = 0
+                for celula in elemento.iter(tag_celula):
+                    referencia = celula.get('r')
+                    indice = _indice_coluna(referencia) if referencia else proxima
+                    proxima = indice + 1
+                    if selecionadas is not None and indice not in selecionadas:
+                        continue
+                    tipo = celula.get('t', 'n')
+                    if tipo == 'inlineStr':
+                        texto = celula.find(tag_is)
+                        valores[indice] = ''.join(t.text or '' for t in texto.iter(tag_t)) if texto is not None else None
+                        continue
+                    v = celula.find(tag_v)
+                    if v is None or v.text is None:
+                        continue
+                    if tipo == 's':
+                        valores[indice] = textos[int(v.text)]
+                    elif tipo == 'n':
+                        valores[indice] = float(v.text)
+                    elif tipo == 'b':
+                        valores[indice] = v.text == '1'
+                    elif tipo != 'e':
+                        valores[indice] = v.text
+                elemento.clear()
+                while elemento.getprevious() is not None:
+                    del elemento.getparent()[0]
+
+                if any(valor not in (None, '') for valor in valores.values()):
+                    posicoes = colunas if colunas is not None else range(max(valores) + 1)
+                    yield [valores.get(posicao) for posicao in posicoes]
+
+
+def _linhas_read_excel(arquivo, planilha, colunas):
+    # Alternativa para arquivos que não são XLSX (ex.: XLS), lidos inteiros pelo pandas
+    df = pd.read_excel(arquivo, sheet_name=planilha, header=None, dtype=object)
+    if colunas is not None:
+        df = df.iloc[:, colunas]
+    for linha in df.itertuples(index=False, name=None):
+        valores = [None if pd.isna(valor) else valor for valor in linha]
+        if any(valor not in (None, '') for valor in valores):
+            yield valores
+
+
+def ler_xlsx_em_blocos(arquivo, tamanho_bloco, planilha=0, colunas=None, fn_filtro=None, numericas=None, decimal=','):
+    '''
+    Lê uma planilha de um arquivo XLSX em blocos de DataFrames, usando a primeira linha como cabeçalho (ver iterar_linhas_xlsx).
+    Arquivos que não são XLSX são lidos com pandas.read_excel.
+
+    Parameters:
+        - arquivo (str): Caminho do arquivo.
+        - tamanho_bloco (int): Quantidade de linhas por bloco.
+        - planilha (int or str): Índice ou nome da planilha. O padrão é 0.
+        - colunas (list of int): Posições das colunas lidas. O padrão é None (todas).
+        - fn_filtro (function): Recebe os valores da linha (na ordem de colunas) e retorna se ela é mantida, aplicado durante a leitura. O padrão é None.
+        - numericas (list of int): Posições (na planilha) das colunas convertidas com converter_decimal. O padrão é None.
+        - decimal (str): Separador decimal dos valores numéricos em texto. O padrão é ','.
+
+    Returns:
+        - generator of DataFrame: Blocos da planilha.
+    '''
+    if zipfile.is_zipfile(arquivo):
+        linhas = iterar_linhas_xlsx(arquivo, planilha, colunas)
+    else:
+        linhas = _linhas_read_excel(arquivo, planilha, colunas)
+
+    cabecalho = next(linhas, None)
+    if cabecalho is None:
+        return
+    posicoes = colunas if colunas is not None else range(len(cabecalho))
+    nomes = [cabecalho[indice] if indice < len(cabecalho) and cabecalho[indice] is not None else posicao for indice, posicao in enumerate(posicoes)]
+    indices_numericos = [indice for indice, posicao in enumerate(posicoes) if posicao in (numericas or [])]
+
+    bloco = []
+    for linha in linhas:
+        linha = linha[:len(nomes)] + [None] * (len(nomes) - len(linha))
+        if fn_filtro is not None and not fn_filtro(linha):
+            continue
+        for indice in indices_numericos:
+            linha[indice] = converter_decimal(linha[indice], decimal)
+        bloco.append(linha)
+        if len(bloco) >= tamanho_bloco:
+            yield pd.DataFrame(bloco, columns=nomes)
+            bloco = []
+    if bloco:
+        yield pd.DataFrame(bloco, columns=nomes)
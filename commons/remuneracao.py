@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+
+def _somar_colunas(df, colunas, ausentes_como_zero):
+    '''
+    Soma as colunas informadas (nome ou posição) como um vetor float64, convertendo textos numéricos e descartando valores inválidos.
+    '''
+    if colunas is None:
+        return np.zeros(len(df))
+    if isinstance(colunas, (str, int)):
+        colunas = [colunas]
+
+    total = np.zeros(len(df))
+    for coluna in colunas:
+        serie = df.iloc[:, coluna] if isinstance(coluna, int) else df[coluna]
+        valores = pd.to_numeric(serie, errors='coerce').to_numpy(dtype='float64')
+        if ausentes_como_zero:
+            valores = np.nan_to_num(valores, nan=0.0)
+        total = total + valores
+    return total
+
+
+def calcular_remuneracao_mensal_media(df, salario, beneficios=None, descontos=None, condicao=None, ausentes_como_zero=False):
+    '''
+    Calcula a remuneração mensal média de cada linha com operações sobre as colunas inteiras:
+    salário + 1/3 de férias (salário/3/12) + 13º salário (salário/12) + benefícios - descontos.
+
+    Parameters:
+        - df (DataFrame): Dados de remuneração.
+        - salario (str, int or list): Coluna(s), por nome ou posição, que compõem o salário, base das férias e do 13º.
+        - beneficios (str, int or list): Coluna(s) somadas sem reflexo nas férias e no 13º (ex.: auxílios). O padrão é None.
+        - descontos (str, int or list): Coluna(s) subtraídas do total. O padrão é None.
+        - condicao (Series or array of bool): Linhas que compõem a remuneração; as demais resultam em 0 (ex.: rubricas de 13º e férias). O padrão é None.
+        - ausentes_como_zero (bool): Trata valores ausentes como 0. Se False, linhas sem salário resultam em NaN. O padrão é False.
+
+    Returns:
+        - Series: Remuneração mensal média, com o mesmo índice do DataFrame.
+    '''
+    valor_salario = _somar_colunas(df, salario, ausentes_como_zero)
+    remuneracao = valor_salario + valor_salario/3/12 + valor_salario/12
+    if beneficios is not None:
+        remuneracao = remuneracao + _somar_colunas(df, beneficios, ausentes_como_zero)
+    if descontos is not None:
+        remuneracao = remuneracao - _somar_colunas(df, descontos, ausentes_como_zero)
+    if condicao is not None:
+        remuneracao = np.where(np.asarray(condicao, dtype=bool), remuneracao, 0.0)
+    return pd.Series(remuneracao, index=df.index)
+
+
+def sql_remuneracao_mensal_media(salario, beneficios=None, descontos=None, ausentes_como_zero=False):
+    '''
+    Monta a expressão SQL equivalente a calcular_remuneracao_mensal_media, para as transformações executadas no DuckDB.
+
+    Parameters:
+        - salario (str or list of str): Expressão(ões) SQL que compõem o salário, base das férias e do 13º.
+        - beneficios (str or list of str): Expressão(ões) somadas sem reflexo nas férias e no 13º. O padrão é None.
+        - descontos (str or list of str): Expressão(ões) subtraídas do total. O padrão é None.
+        - ausentes_como_zero (bool): Trata valores nulos como 0. Se False, linhas sem salário resultam em NULL. O padrão é False.
+
+    Returns:
+        - str: Expressão SQL da remuneração mensal média.
+    '''
+    def somar(expressoes):
+        if isinstance(expressoes, str):
+            expressoes = [expressoes]
+        if ausentes_como_zero:
+            expressoes = [f'coalesce({expressao}, 0)' for expressao in expressoes]
+        return '(' + ' + '.join(f'({expressao})' for expressao in expressoes) + ')'
+
+    valor_salario = somar(salario)
+    remuneracao = f'{valor_salario} + {valor_salario}/3/12 + {valor_salario}/12'
+    if beneficios is not None:
+        remuneracao += f' + {somar(beneficios)}'
+    if descontos is not None:
+        remuneracao += f' - {somar(descontos)}'
+    return f'({remuneracao})'
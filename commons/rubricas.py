@@ -0,0 +1,106 @@
+import re
+import duckdb
+
+# Termos das rubricas de 13º salário e férias, que já compõem a média mensal pelo cálculo de calcular_remuneracao_mensal_media
+TERMOS_RUBRICAS_SAZONAIS = ["DECIMO TERCEIRO", "13", " FER"]
+
+
+def compilar_regex(termos):
+    '''
+    Compila os termos excluídos de uma regra em uma única expressão regular (alternância de termos literais),
+    compatível com o re do Python e com regexp_matches do DuckDB.
+    '''
+    return '|'.join(re.escape(termo) for termo in termos)
+
+
+def _identificador(coluna):
+    return '"' + str(coluna).replace('"', '""') + '"'
+
+
+def sql_condicao(regras):
+    '''
+    Monta a condição SQL que identifica as linhas consideradas pelas regras de rubricas do domínio.
+
+    Parameters:
+        - regras (dict): Regras de rubricas do domínio:
+            - coluna_rubrica (str): Coluna com a descrição da rubrica.
+            - termos_excluidos (list of str): Termos que excluem a rubrica do somatório (ex.: TERMOS_RUBRICAS_SAZONAIS).
+            - coluna_tipo (str): Coluna com o tipo do lançamento (ex.: vantagem/desconto, crédito/débito). Opcional.
+            - tipos_considerados (list of str): Tipos somados, sem distinção de maiúsculas. Opcional.
+
+    Returns:
+        - tuple: (condição SQL ou None se todas as linhas são consideradas, dicionário de parâmetros $regex e $tipos)
+    '''
+    condicoes = []
+    parametros = {}
+    if regras.get("termos_excluidos"):
+        condicoes.append(f"NOT coalesce(regexp_matches(CAST({_identificador(regras['coluna_rubrica'])} AS VARCHAR), $regex), false)")
+        parametros["regex"] = compilar_regex(regras["termos_excluidos"])
+    if regras.get("tipos_considerados"):
+        condicoes.append(f"coalesce(list_contains($tipos, lower(CAST({_identificador(regras['coluna_tipo'])} AS VARCHAR))), false)")
+        parametros["tipos"] = [tipo.lower() for tipo in regras["tipos_considerados"]]
+    return (' AND '.join(condicoes) or None), parametros
+
+
+def sql_case(regras, coluna_valor):
+    '''
+    Monta a expressão SQL CASE que retorna o valor das linhas consideradas pelas regras (ver sql_condicao) e 0 para as demais.
+
+    Returns:
+        - tuple: (expressão SQL, dicionário de parâmetros)
+    '''
+    condicao, parametros = sql_condicao(regras)
+    valor = f"TRY_CAST({_identificador(coluna_valor)} AS DOUBLE)"
+    if condicao is None:
+        return valor, parametros
+    return f"CASE WHEN {condicao} THEN {valor} ELSE 0 END", parametros
+
+
+def sql_soma_por_rubricas(regras, agrupar_por, tabela, coluna_valor='VALOR', coluna_resultado='VALOR', somente_grupos_considerados=False):
+    '''
+    Monta o SELECT que soma, por grupo, os valores considerados pelas regras de rubricas, para compor consultas maiores
+    (ex.: a consulta de uma IngestaoCSV). Os parâmetros são os de somar_por_rubricas.
+
+    Returns:
+        - tuple: (SELECT sobre a tabela informada, dicionário de parâmetros)
+    '''
+    if isinstance(agrupar_por, str):
+        agrupar_por = [agrupar_por]
+    expressao, parametros = sql_case(regras, coluna_valor)
+    condicao = sql_condicao(regras)[0]
+    colunas_grupo = ', '.join(_identificador(coluna) for coluna in agrupar_por)
+    filtro_grupo = ' AND '.join(f'{_identificador(coluna)} IS NOT NULL' for coluna in agrupar_por)
+    filtro_considerados = f'HAVING bool_or({condicao})' if somente_grupos_considerados and condicao is not None else ''
+    return f'''SELECT {colunas_grupo}, coalesce(SUM({expressao}), 0) AS {_identificador(coluna_resultado)}
+              FROM {tabela}
+              WHERE {filtro_grupo}
+              GROUP BY {colunas_grupo}
+              {filtro_considerados}''', parametros
+
+
+def somar_por_rubricas(df, regras, agrupar_por, coluna_valor='VALOR', coluna_resultado='VALOR', somente_grupos_considerados=False):
+    '''
+    Classifica as rubricas com as regras do domínio e soma os valores considerados por grupo, em uma única consulta no DuckDB.
+
+    Parameters:
+        - df (DataFrame): Lançamentos de remuneração.
+        - regras (dict): Regras de rubricas do domínio (ver sql_condicao).
+        - agrupar_por (str or list of str): Coluna(s) do agrupamento (ex.: NOME).
+        - coluna_valor (str): Coluna com o valor do lançamento. O padrão é VALOR.
+        - coluna_resultado (str): Nome da coluna com a soma. O padrão é VALOR.
+        - somente_grupos_considerados (bool): Descarta os grupos sem nenhuma linha considerada pelas regras, em vez de somá-los como 0. O padrão é False.
+
+    Returns:
+        - DataFrame: Uma linha por grupo, com as colunas do agrupamento e a soma dos valores considerados.
+                     Assim como no groupby do pandas, linhas com chave de agrupamento nula são descartadas.
+    '''
+    if isinstance(agrupar_por, str):
+        agrupar_por = [agrupar_por]
+    consulta, parametros = sql_soma_por_rubricas(regras, agrupar_por, 'lancamentos', coluna_valor, coluna_resultado, somente_grupos_considerados)
+
+    con = duckdb.connect()
+    try:
+        con.register('lancamentos', df)
+        return con.execute(f"{consulta} ORDER BY {', '.join(_identificador(coluna) for coluna in agrupar_por)}", parametros).df()
+    finally:
+        con.close()
@@ -0,0 +1,103 @@
+import os
+import duckdb
+from commons.utils import get_configuration_value
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    # pyarrow é opcional, necessário apenas para o formato arrow
+    pa = None
+
+# Formatos de publicação do banco de servidores de um domínio e a extensão de cada arquivo
+FORMATO_DUCKDB = 'duckdb'
+FORMATO_PARQUET = 'parquet'
+FORMATO_ARROW = 'arrow'
+EXTENSOES = {
+    FORMATO_DUCKDB: '.db',
+    FORMATO_PARQUET: '.parquet',
+    FORMATO_ARROW: '.arrow',
+}
+
+
+def formato_do_dominio(dominio):
+    '''
+    Retorna o formato de publicação do banco do domínio, lido do app.conf pela chave FORMATO_BASE_<dominio>
+    ou, na ausência dela, FORMATO_BASE. O padrão é duckdb.
+
+    Parameters:
+        - dominio (str): Domínio dono do banco.
+
+    Returns:
+        - str: duckdb, parquet ou arrow.
+    '''
+    formato = get_configuration_value(f"FORMATO_BASE_{dominio}", valor_padrao=get_configuration_value("FORMATO_BASE", valor_padrao=FORMATO_DUCKDB)).lower()
+    if formato not in EXTENSOES:
+        print(f'[{dominio}] Formato de base "{formato}" desconhecido, utilizando {FORMATO_DUCKDB}.')
+        return FORMATO_DUCKDB
+    if formato == FORMATO_ARROW and pa is None:
+        print(f'[{dominio}] pyarrow não está instalado, utilizando {FORMATO_PARQUET} no lugar de {FORMATO_ARROW}.')
+        return FORMATO_PARQUET
+    return formato
+
+
+def formato_do_arquivo(caminho_arquivo):
+    '''
+    Identifica o formato de um banco publicado pela extensão do arquivo.
+    '''
+    extensao = os.path.splitext(caminho_arquivo)[1].lower()
+    for formato, extensao_formato in EXTENSOES.items():
+        if extensao == extensao_formato:
+            return formato
+    return FORMATO_DUCKDB
+
+
+def exportar_snapshot(con, formato, caminho_arquivo):
+    '''
+    Grava a tabela servidores da conexão como um arquivo colunar, ordenado pela chave de busca por prefixo.
+
+    O Parquet é comprimido (ZSTD) e suas estatísticas por grupo de linhas permitem descartar blocos nas buscas por faixa.
+    O Arrow IPC é gravado sem compressão para que possa ser mapeado em memória e lido sem cópias.
+
+    Parameters:
+        - con (DuckDBPyConnection): Conexão que contém a tabela servidores.
+        - formato (str): parquet ou arrow.
+        - caminho_arquivo (str): Caminho do arquivo a ser gravado.
+    '''
+    consulta = 'SELECT * FROM servidores ORDER BY NOME_SEM_ESPACOS'
+    if formato == FORMATO_PARQUET:
+        con.execute(f"COPY ({consulta}) TO '{caminho_arquivo}' (FORMAT PARQUET, COMPRESSION ZSTD)")
+    elif formato == FORMATO_ARROW:
+        tabela = con.execute(consulta).fetch_arrow_table()
+        with pa.OSFile(caminho_arquivo, 'wb') as arquivo:
+            with pa.ipc.new_file(arquivo, tabela.schema) as escritor:
+                escritor.write_table(tabela)
+    else:
+        raise ValueError(f'Formato de snapshot não suportado: {formato}')
+
+
+def abrir_snapshot(caminho_arquivo):
+    '''
+    Abre um banco publicado para leitura, expondo os servidores como a tabela (ou visão) servidores.
+
+    Parameters:
+        - caminho_arquivo (str): Caminho do banco (.db, .parquet ou .arrow).
+
+    Returns:
+        - tuple: (conexão DuckDB, tabela Arrow mapeada em memória ou None). A tabela Arrow precisa ser registrada
+          como servidores em cada cursor, pois registros do DuckDB são locais à conexão.
+    '''
+    formato = formato_do_arquivo(caminho_arquivo)
+    if formato == FORMATO_DUCKDB:
+        return duckdb.connect(caminho_arquivo, read_only=True), None
+
+    conexao = duckdb.connect()
+    if formato == FORMATO_PARQUET:
+        # As páginas do arquivo ficam no cache do sistema operacional, compartilhado entre os processos
+        conexao.execute("SET enable_object_cache = true")
+        conexao.execute(f"CREATE VIEW servidores AS SELECT * FROM read_parquet('{caminho_arquivo}')")
+        return conexao, None
+
+    # Os buffers da tabela referenciam diretamente as páginas mapeadas do arquivo, sem cópia
+    tabela = pa.ipc.open_file(pa.memory_map(caminho_arquivo, 'r')).read_all()
+    return conexao, tabela
@@ -5,19 +5,24 @@ import os
 import importlib.util
 from datetime import datetime
 import base64
+import json
+import tempfile
 
-def get_configuration_value(chave, conf_file_path=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),"app.conf")):
+def get_configuration_value(chave, conf_file_path=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),"app.conf"), valor_padrao=None):
     try:
         with open(conf_file_path, 'r') as arquivo:
             for linha in arquivo:
                 partes = linha.strip().split(':', 1)
                 if len(partes) == 2 and partes[0].strip() == chave:
                     return partes[1].strip()
+        # Chaves opcionais retornam o valor padrão sem alertar
+        if valor_padrao is not None:
+            return valor_padrao
         print(f'Chave "{chave}" não encontrada no arquivo.')
         return None
     except FileNotFoundError:
         print(f'Arquivo "{conf_file_path}" não encontrado.')
-        return None
+        return valor_padrao
     except Exception as e:
         print(f'Ocorreu um erro: {e}')
         return None
@@ -81,6 +86,65 @@ def carregar_script_do_dominio(dominio, pasta_raiz):
         return None
 
 
+# Instâncias de domínio já carregadas, reaproveitadas entre chamadas em lote
+_apis_carregadas = {}
+
+def get_remuneracao_em_lote(emails, pasta_raiz):
+    '''
+    Obtém a remuneração de uma lista de emails de quaisquer domínios, agrupando-os por domínio.
+
+    Cada domínio verifica a fonte de dados, abre o banco e executa a consulta uma única vez para todo o grupo.
+    Com o índice unificado habilitado (INDICE_UNIFICADO), os emails dos domínios com partição atualizada são resolvidos
+    antes, em uma única consulta, e apenas os demais seguem pela consulta ao domínio.
+
+    Parameters:
+        - emails (list of str): Emails a serem resolvidos (ex.: participantes de um EventoICS).
+        - pasta_raiz (str): Pasta com os scripts dos domínios.
+
+    Returns:
+        - list of list of ServidorModel: Servidores encontrados para cada email, na ordem de entrada.
+    '''
+    # Importado aqui, pois o índice unificado depende deste módulo
+    from commons.UnifiedIndex import unified_index
+
+    resultado = [[] for _ in emails]
+
+    resolvidos = set()
+    if unified_index.habilitado:
+        try:
+            for posicao, encontrados in enumerate(unified_index.buscar(emails)):
+                if encontrados is not None:
+                    resultado[posicao] = encontrados
+                    resolvidos.add(posicao)
+        except Exception as e:
+            log(f"Erro ao consultar o índice unificado, consultando os domínios: {e}")
+            resultado = [[] for _ in emails]
+            resolvidos = set()
+
+    grupos = {}
+    for posicao, email in enumerate(emails):
+        if posicao in resolvidos:
+            continue
+        dominio = identificar_dominio(email, pasta_raiz)
+        if dominio is not None:
+            grupos.setdefault(dominio, []).append(posicao)
+
+    for dominio, posicoes in grupos.items():
+        if dominio not in _apis_carregadas:
+            modulo = carregar_script_do_dominio(dominio, pasta_raiz)
+            if modulo is None:
+                continue
+            _apis_carregadas[dominio] = modulo.Api()
+
+        servidores = _apis_carregadas[dominio].get_remuneracao_batch([emails[posicao] for posicao in posicoes])
+        if servidores is None:
+            continue
+        for posicao, encontrados in zip(posicoes, servidores):
+            resultado[posicao] = encontrados
+
+    return resultado
+
+
 def decode_base64(encoded_string):
     try:
         # Decodificando a string em Base64
@@ -134,3 +198,50 @@ def get_traceback_string():
         
         # Retornar a string do traceback filtrada
         return '\n  CUSTOM TRACEBACK:\n'+'\n'.join(filtered_lines)
+
+
+def sincronizar_arquivo(caminho):
+    '''
+    Força a gravação em disco (fsync) do conteúdo de um arquivo.
+    '''
+    with open(caminho, 'rb+') as arquivo:
+        os.fsync(arquivo.fileno())
+
+
+def sincronizar_diretorio(diretorio):
+    '''
+    Força a gravação em disco das entradas de um diretório (renomeações), sem efeito em sistemas que não suportam.
+    '''
+    if os.name != 'posix':
+        return
+    descritor = os.open(diretorio, os.O_RDONLY)
+    try:
+        os.fsync(descritor)
+    finally:
+        os.close(descritor)
+
+
+def gravar_json_atomico(caminho, dados):
+    '''
+    Grava um JSON em um arquivo temporário e o renomeia atomicamente para o destino, 
+    de forma que leitores nunca encontrem o arquivo parcialmente escrito.
+
+    Parameters:
+        - caminho (str): Caminho do arquivo de destino.
+        - dados (dict or list): Conteúdo serializável em JSON.
+    '''
+    # Cada gravação usa um temporário próprio, gravações simultâneas do mesmo destino não removem o arquivo uma da outra
+    descritor, caminho_temporario = tempfile.mkstemp(dir=os.path.dirname(caminho) or '.', prefix=f'{os.path.basename(caminho)}.', suffix='.tmp')
+    try:
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            if os.name == 'posix':
+                # mkstemp cria o arquivo legível apenas pelo dono, mantém a permissão usual dos arquivos do cache
+                os.fchmod(arquivo.fileno(), 0o644)
+            json.dump(dados, arquivo)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(caminho_temporario, caminho)
+    except BaseException:
+        if os.path.exists(caminho_temporario):
+            os.remove(caminho_temporario)
+        raise
@@ -18,7 +18,8 @@ import os
 import json
 import pandas as pd
 from commons.AbstractETL import AbstractETL 
-from concurrent.futures import ThreadPoolExecutor
+from commons.AsyncHTTPRequestManager import executar_corrotina
+import asyncio
 
 # Constantes
 URL_PORTAL_TRANSPARENCIA = "https://www.al.es.gov.br/Transparencia/ListagemServidoresTable"
@@ -38,7 +39,9 @@ class Api(AbstractETL):
                          unidade_federativa="Espírito Santo",
                     portal_remuneracoes_url=URL_PORTAL_TRANSPARENCIA,
                     fn_obter_link_mais_recente=self.obter_links_competencia_mais_recentes,
-                    fn_ler_fonte_de_dados_e_transformar_em_dataframe=self.ler_dados_e_transformar_em_servidores
+                    fn_ler_fonte_de_dados_e_transformar_em_dataframe=self.ler_dados_e_transformar_em_servidores,
+                    fn_obter_link_mais_recente_async=self.obter_links_competencia_mais_recentes_async,
+                    fn_ler_fonte_de_dados_async=self.ler_dados_e_transformar_em_servidores_async
                     )
 
 
@@ -46,8 +49,11 @@ class Api(AbstractETL):
         return self.run(email)  
     
     def obter_links_competencia_mais_recentes(self):
+        return executar_corrotina(self.obter_links_competencia_mais_recentes_async())
+
+    async def obter_links_competencia_mais_recentes_async(self):
         # 1) Descobrir a matricula do servidor e vínculo mais recente
-        lista_matriculas = self.extrair_json_pagina(self.portal_remuneracoes_url)
+        lista_matriculas = await self.extrair_json_pagina_async(self.portal_remuneracoes_url)
         
         ### Como não existe arquivo único para definir a competencia (mês) dos dados divulgados é feito uma consulta amostral para identificar o mês mais recente com dados disponibilizados
         ### Inicio Cálculo amostral de Competencia
@@ -55,46 +61,48 @@ class Api(AbstractETL):
         contagem_competencias = {}
 
         # Função para contar as ocorrências da competência
-        def contar_competencia(matricula):
-            competencia = self.get_competencia_mais_recente(self.extrair_json_pagina(URL_CONSULTA_SALARIOS.format(matricula=self.obter_vinculo_mais_recente(matricula)), False))
+        async def contar_competencia(matricula):
+            vinculo = await self.obter_vinculo_mais_recente_async(matricula)
+            competencia = self.get_competencia_mais_recente(await self.extrair_json_pagina_async(URL_CONSULTA_SALARIOS.format(matricula=vinculo), False))
             contagem_competencias[competencia] = contagem_competencias.get(competencia, 0) + 1
 
-        # Usar ThreadPoolExecutor para executar as iterações em paralelo
-        with ThreadPoolExecutor() as executor:
-            # Mapear as iterações para threads
-            executor.map(contar_competencia, [matricula["Matricula"] for matricula in lista_matriculas[:5]])
+        # As consultas da amostra são feitas concorrentemente no event loop
+        await asyncio.gather(*(contar_competencia(matricula["Matricula"]) for matricula in lista_matriculas[:5]), return_exceptions=True)
 
         # Encontrar a competência mais frequente
         resultado = [max(contagem_competencias, key=contagem_competencias.get)]
-        self.lista_matriculas = self.extrair_json_pagina(self.portal_remuneracoes_url)
+        self.lista_matriculas = lista_matriculas
         return resultado
         ### Fim Cálculo amostral de Competencia
 
 
     def ler_dados_e_transformar_em_servidores(self, lista_fontes_de_dados):
+        return executar_corrotina(self.ler_dados_e_transformar_em_servidores_async(lista_fontes_de_dados))
+
+    async def ler_dados_e_transformar_em_servidores_async(self, lista_fontes_de_dados):
         try:
             competencia_mais_recente = lista_fontes_de_dados[0]
-            lista_matriculas = self.lista_matriculas
+            # Com o identificador vindo do cache de validade, a lista de matrículas ainda não foi carregada
+            lista_matriculas = getattr(self, 'lista_matriculas', None) or await self.extrair_json_pagina_async(self.portal_remuneracoes_url)
             database_path = self.get_database_by_link(competencia_mais_recente)
-            servidores = pd.DataFrame()
-
-            if not os.path.exists(database_path):                
-                for servidor_ales in lista_matriculas:
-                    matricula_vinculo = self.obter_vinculo_mais_recente(servidor_ales.get('Matricula'))
-                    # 3) extrair json do HTML que contem os dados de salário. 
-                    json = self.extrair_json_pagina(URL_CONSULTA_SALARIOS.format(matricula=matricula_vinculo),False)
-                    if json != None:
-                        # 4) extrair último salário. extrair_salario_base(json_data)
-                        salario = self.extrair_remuneracao_media_mensal(json,competencia_mais_recente)
-
-                        data = {"ORGAO":"Assembleia Legislativa do Estado do Espírito Santo", "NOME":servidor_ales.get("Nome"), "REMUNERACAO_MENSAL_MEDIA":salario, "SIGLA":"ALES", "DOMINIO":self.dominio}
-
-                        if servidores.empty:
-                            servidores = pd.DataFrame([data])
-                        else:
-                            servidores = pd.concat([servidores, pd.DataFrame([data])], ignore_index=True)
 
-            return servidores
+            if os.path.exists(database_path):
+                return pd.DataFrame()
+
+            async def ler_servidor(servidor_ales):
+                matricula_vinculo = await self.obter_vinculo_mais_recente_async(servidor_ales.get('Matricula'))
+                # 3) extrair json do HTML que contem os dados de salário. 
+                json = await self.extrair_json_pagina_async(URL_CONSULTA_SALARIOS.format(matricula=matricula_vinculo),False)
+                if json == None:
+                    return None
+                # 4) extrair último salário. extrair_salario_base(json_data)
+                salario = self.extrair_remuneracao_media_mensal(json,competencia_mais_recente)
+                return {"ORGAO":"Assembleia Legislativa do Estado do Espírito Santo", "NOME":servidor_ales.get("Nome"), "REMUNERACAO_MENSAL_MEDIA":salario, "SIGLA":"ALES", "DOMINIO":self.dominio}
+
+            # As consultas de cada servidor são sequenciais, pois a de salários depende do vínculo retornado pela primeira;
+            # os servidores são lidos concorrentemente, limitados pelo async_http_client
+            registros = await asyncio.gather(*(ler_servidor(servidor_ales) for servidor_ales in lista_matriculas))
+            return pd.DataFrame([registro for registro in registros if registro is not None])
         except Exception as e:
             self.print_api(f"Erro ao ler dados", e)
             return None
@@ -182,28 +190,29 @@ class Api(AbstractETL):
         return None
 
 
-    def extrair_json_pagina(self, url, foundByArray=True):
-        try:
-            # Fazer a requisição para obter o conteúdo da página
-            response = self.http_client.get(url)
-            response.raise_for_status()
+    def _extrair_json_da_resposta(self, response, foundByArray=True):
+        response.raise_for_status()
 
-            # Usar uma expressão regular para encontrar padrões JSON
-            pattern = re.compile(r'"data":\s*\[({.*?})\]', re.DOTALL)
+        # Usar uma expressão regular para encontrar padrões JSON
+        pattern = re.compile(r'"data":\s*\[({.*?})\]', re.DOTALL)
 
-            # Encontrar todas as correspondências na string
-            matches = pattern.findall(response.text)
+        # Encontrar todas as correspondências na string
+        matches = pattern.findall(response.text)
 
-            # Processar cada correspondência encontrada
-            for match in matches:
-                try:
-                    # Carregar a string JSON da correspondência
-                    json_data_list = json.loads(f'[{match}]') if foundByArray else self.organizar_json_string(match)
-                    return json_data_list
+        # Processar cada correspondência encontrada
+        for match in matches:
+            try:
+                # Carregar a string JSON da correspondência
+                json_data_list = json.loads(f'[{match}]') if foundByArray else self.organizar_json_string(match)
+                return json_data_list
 
-                except json.JSONDecodeError as e:
-                    print(f"Erro ao decodificar JSON: {e}")
+            except json.JSONDecodeError as e:
+                print(f"Erro ao decodificar JSON: {e}")
 
+    def extrair_json_pagina(self, url, foundByArray=True):
+        try:
+            # Fazer a requisição para obter o conteúdo da página
+            return self._extrair_json_da_resposta(self.http_client.get(url), foundByArray)
         except requests.exceptions.RequestException as e:
             print(f"Erro ao fazer a requisição: {e}")
             return None
@@ -211,23 +220,44 @@ class Api(AbstractETL):
             print(f"Erro ao decodificar JSON: {e}")
             return None
 
-    def obter_vinculo_mais_recente(self, matricula):
+    async def extrair_json_pagina_async(self, url, foundByArray=True):
         try:
-            # Fazer a requisição para obter o conteúdo JSON da URL
-            response = self.http_client.get(URL_CONSULTA_VINCULOS.format(matricula=matricula))
-            response.raise_for_status()
+            return self._extrair_json_da_resposta(await self.async_http_client.get(url), foundByArray)
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao fazer a requisição: {e}")
+            return None
+        except json.JSONDecodeError as e:
+            print(f"Erro ao decodificar JSON: {e}")
+            return None
 
-            # Converter o conteúdo JSON para uma lista de dicionários
-            dados = response.json()
+    def _vinculo_ativo(self, response):
+        response.raise_for_status()
+
+        # Converter o conteúdo JSON para uma lista de dicionários
+        dados = response.json()
 
-            # Procurar o registro com "DataDemissao" igual a null
-            for registro in dados:
-                if registro.get("DataDemissao") is None:
-                    return registro.get("CodigoCadfu")
+        # Procurar o registro com "DataDemissao" igual a null
+        for registro in dados:
+            if registro.get("DataDemissao") is None:
+                return registro.get("CodigoCadfu")
+
+        # Se nenhum registro corresponder, retornar None
+        return None
 
-            # Se nenhum registro corresponder, retornar None
+    def obter_vinculo_mais_recente(self, matricula):
+        try:
+            # Fazer a requisição para obter o conteúdo JSON da URL
+            return self._vinculo_ativo(self.http_client.get(URL_CONSULTA_VINCULOS.format(matricula=matricula)))
+        except requests.exceptions.RequestException as e:
+            print(f"Erro ao fazer a requisição: {e}")
+            return None
+        except ValueError as e:
+            print(f"Erro ao decodificar JSON: {e}")
             return None
 
+    async def obter_vinculo_mais_recente_async(self, matricula):
+        try:
+            return self._vinculo_ativo(await self.async_http_client.get(URL_CONSULTA_VINCULOS.format(matricula=matricula)))
         except requests.exceptions.RequestException as e:
             print(f"Erro ao fazer a requisição: {e}")
             return None
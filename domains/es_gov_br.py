@@ -18,9 +18,10 @@ from bs4 import BeautifulSoup
 import re
 import os
 from urllib import request
-from io import StringIO
-import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.IngestaoCSV import IngestaoCSV
+from commons.remuneracao import sql_remuneracao_mensal_media
+from commons.rubricas import sql_soma_por_rubricas, TERMOS_RUBRICAS_SAZONAIS
 
 # Constantes
 URL_PORTAL_TRANSPARENCIA = "https://dados.es.gov.br"
@@ -28,6 +29,16 @@ PATH_PORTAL_REMUNERACOES = "/dataset/portal-da-transparencia-pessoal"
 PATH_PORTAL_CSV = "/datastore/dump/{}?bom=True"
 PATH_PORTAL_SQL = '/api/3/action/datastore_search?q={nome}%{sobrenome}%{orgao}&resource_id={guid}'
 
+# Rubricas somadas na remuneração: vantagens (TIPO 'V'), exceto as de 13º salário e férias
+REGRAS_RUBRICAS = {"coluna_rubrica": "RUBRICA", "termos_excluidos": TERMOS_RUBRICAS_SAZONAIS, "coluna_tipo": "TIPO", "tipos_considerados": ["V"]}
+
+# Colunas do CSV (posição: nome) e transformação executada pelo DuckDB na carga
+COLUNAS_CSV = {1: 'ORGAO', 4: 'NOME', 16: 'RUBRICA', 17: 'TIPO', 19: 'VALOR'}
+SQL_RUBRICAS, PARAMETROS_SERVIDORES = sql_soma_por_rubricas(REGRAS_RUBRICAS, ['ORGAO', 'NOME'], 'fonte')
+SQL_SERVIDORES = f'''SELECT agrupado.NOME, {sql_remuneracao_mensal_media('agrupado.VALOR')} AS REMUNERACAO_MENSAL_MEDIA,
+                            orgaos.ORGAO, orgaos.SIGLA, orgaos.DOMINIO
+                     FROM ({SQL_RUBRICAS}) AS agrupado JOIN orgaos ON agrupado.ORGAO = orgaos.ORGAO'''
+
 class Api(AbstractETL):
     """
     Classe para retorno de remuneração de servidores do Estado do Espírito Santo.
@@ -61,7 +72,7 @@ class Api(AbstractETL):
         - list: Lista de hrefs ou mensagem de erro.
         """
         url_portal = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_REMUNERACOES
-        response = self.http_client.get(url_portal)
+        response = self.http_client.get(url_portal, usar_cache=True)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -107,40 +118,18 @@ class Api(AbstractETL):
         - url (str): URL do CSV.
 
         Returns:
-        - list or None: Lista de servidores ou None em caso de erro.
+        - IngestaoCSV or None: Leitura do CSV a ser carregada pelo DuckDB ou None em caso de erro.
         """
         try:
+            url = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_CSV.format(lista_fontes_de_dados[0])
 
-            # Faz a requisição e obtém o conteúdo do CSV
-            response = self.http_client.get(URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_CSV.format(lista_fontes_de_dados[0]))
-                
-            # Usa o módulo StringIO para transformar a string em um objeto "file-like"
-            arquivo_csv = StringIO(response.text)
-
-            # criar um dataframe das remunerações
-            df_remuneracoes = pd.read_csv(arquivo_csv, delimiter=',', usecols=[1, 4, 17, 19, 16], decimal=',')
-
-            # Criar uma nova coluna com base na condição VantagemDesvantageme e na condição para "Rubrica"
-            df_remuneracoes['REMUNERACAO_MENSAL_MEDIA'] = df_remuneracoes.apply(lambda row: 0 if any(substring in row["Rubrica"] for substring in ["DECIMO TERCEIRO", "13", " FER"]) else (row.iloc[4] + row.iloc[4]/3/12 + row.iloc[4]/12 ) if row.iloc[3].lower() == 'v' else 0 if pd.notna(row.iloc[3]) else 0, axis=1)
-
-            df_remuneracoes = df_remuneracoes.drop(columns=["Rubrica"])
-
-            # Criar um DataFrame agrupado
-            df_agrupado = df_remuneracoes.groupby([df_remuneracoes.iloc[:, 0], df_remuneracoes.iloc[:, 1]]).agg({
-                'REMUNERACAO_MENSAL_MEDIA': 'sum',
-            }).reset_index()
-            df_agrupado = df_agrupado.rename(columns={df_agrupado.columns[0]:'ORGAO',df_agrupado.columns[1]:'NOME'})
-
-            #df_agrupado['SIGLA'] = df_agrupado.iloc[:, 0].fillna(0).str.lower()
-            #df_agrupado['DOMINIO'] = df_agrupado.iloc[:, 0].fillna(0).str.lower() + ".es.gov.br"
-
-            domains = self.get_cache_domains(df_agrupado.iloc[:, 0].unique().astype(str).tolist())
-            df_domains = pd.DataFrame([vars(domain) for domain in domains])
-            df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
-
-            df_agrupado = pd.merge(df_agrupado, df_domains, left_on= df_agrupado.iloc[:, 0], right_on="ORGAO")
+            # Baixa o CSV para o disco, a leitura e a transformação são feitas pelo DuckDB durante a carga
+            caminho_csv = self.http_client.download(url)
+            if caminho_csv is None:
+                raise IOError(f"Falha no download de {url}")
 
-            return df_agrupado[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]                                
+            return IngestaoCSV(caminho_csv, COLUNAS_CSV, SQL_SERVIDORES, delimitador=',', decimal=',', encoding='utf-8',
+                               numericas=['VALOR'], fn_obter_orgaos=self.obter_tabela_orgaos, parametros=PARAMETROS_SERVIDORES)
 
         except Exception as e:
             self.print_api(f"Erro ao ler o CSV", e)
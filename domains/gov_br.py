@@ -13,11 +13,13 @@ Data: 2024-02-18
 """
 
 import re
-import io
+import os
+import asyncio
 import zipfile
-from io import StringIO 
 import json
 from commons.AbstractETL import AbstractETL 
+from commons.AsyncHTTPRequestManager import executar_corrotina
+from commons.remuneracao import calcular_remuneracao_mensal_media
 import pandas as pd
 
 
@@ -25,6 +27,11 @@ import pandas as pd
 URL_PORTAL_TRANSPARENCIA =  "https://portaldatransparencia.gov.br"
 PATH_PORTAL_REMUNERACOES =  "/download-de-dados/servidores"
 URL_PORTAL_CSV = "https://dadosabertos-download.cgu.gov.br/PortalDaTransparencia/saida/servidores/{}_Servidores_{}.zip"
+LISTA_SISTEMAS_ORIGEM = ["SIAPE", "BACEN"]
+# Tamanho mínimo para considerar publicado o arquivo do mês (o portal mantém arquivos vazios para meses ainda não divulgados)
+TAMANHO_MINIMO_ARQUIVO = {"SIAPE": 50000*1024, "BACEN": 100*1024}
+# Número máximo de sondagens (HEAD) simultâneas por sistema de origem
+SONDAGENS_SIMULTANEAS = 4
 
 class Api(AbstractETL):
     """
@@ -39,7 +46,8 @@ class Api(AbstractETL):
                         unidade_federativa="Governo Federal",
                         portal_remuneracoes_url=URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_REMUNERACOES,
                         fn_obter_link_mais_recente=self.obter_links_csv_mais_recentes,
-                        fn_ler_fonte_de_dados_e_transformar_em_dataframe=self.ler_csv_e_transformar_em_servidores
+                        fn_ler_fonte_de_dados_e_transformar_em_dataframe=self.ler_csv_e_transformar_em_servidores,
+                        fn_obter_link_mais_recente_async=self.obter_links_csv_mais_recentes_async
                         )
 
         
@@ -48,61 +56,96 @@ class Api(AbstractETL):
 
 
     def obter_links_csv_mais_recentes(self, check_siape=True):
+        return executar_corrotina(self.obter_links_csv_mais_recentes_async(check_siape))
+
+
+    async def obter_links_csv_mais_recentes_async(self, check_siape=True):
         """
         Obtém os links dos CSVs mais recentes do portal da transparência.
 
+        Os meses listados pelo portal são sondados (HEAD) concorrentemente, do mais recente para o mais antigo,
+        e as sondagens restantes são canceladas assim que o mês mais recente de cada sistema de origem é confirmado.
+
         Parameters:
-        - url_portal (str): URL do portal da transparência.
         - check_siape (bool): Flag para indicar qual a origem de dados vai consultar por padrão é SIAPE.
 
         Returns:
-        - str: Ano e mês mais recente no formato AAAAMM ou None se não encontrado.
+        - list: Lista com os pares (AAAAMM, sistema de origem) mais recentes ou None se não encontrado.
         """
         url_portal = self.portal_remuneracoes_url
-        response = self.http_client.get(url_portal)
-
-        if response.status_code == 200:
-            # Encontrar o script que contém as informações de ano, mês e origem
-            script_pattern = re.compile(r'arquivos\.push\(({.*?})\);', re.DOTALL)
-            script_match = script_pattern.findall(response.text)
-            anos_meses_validos = []
-
-            if script_match:
-                # Converter cada item para JSON e filtrar apenas os itens com "origem" igual a "Servidores_SIAPE"
-                servidores = [json.loads(item) for item in script_match if json.loads(item).get('origem') == ("Servidores_SIAPE" if check_siape else "Servidores_BACEN")]
-
-                lista_sistema_origem = ["SIAPE", "BACEN"]
-
-                if servidores:
-                    # Extrair o ano e mês de cada item
-                    anos_meses = [(item.get('ano'), item.get('mes')) for item in servidores]
-
-                    # Ordenar por ano e mês de forma decrescente
-                    anos_meses.sort(reverse=True)
-
-                    for ano, mes in anos_meses:
-                        ano_mes_atual = f"{ano}{mes}"
-                        if len(lista_sistema_origem) == 0:
-                            break
-                        for sistema_origem in lista_sistema_origem:
-                            url = URL_PORTAL_CSV.format(ano_mes_atual, sistema_origem)
-                            
-                            # Fazer a solicitação HTTP HEAD
-                            response = self.http_client.head(url)
-
-                            # Verificar o código de status da resposta
-                            if response.status_code == 200 and ((sistema_origem == "BACEN" and 
-                                                                 int(response.headers.get('content-length', 0))>100*1024) or (sistema_origem == "SIAPE" and 
-                                                                                                                              int(response.headers.get('content-length', 0))>50000*1024)):
-                                lista_sistema_origem.remove(sistema_origem)
-                                anos_meses_validos.append((ano_mes_atual, sistema_origem))
-                                break  # Parar o loop assim que encontrar um ano_mes_atual válido
-            return [anos_meses_validos] if anos_meses_validos != [] else None
-
-        else:
-            self.print_api(f"Erro ao acessar a página. Status code: {response.status_code}")
+        response = await self.async_http_client.get(url_portal)
+
+        if response is None or response.status_code != 200:
+            self.print_api(f"Erro ao acessar a página. Status code: {response.status_code if response is not None else None}")
+            return None
+
+        # Encontrar o script que contém as informações de ano, mês e origem
+        script_pattern = re.compile(r'arquivos\.push\(({.*?})\);', re.DOTALL)
+        script_match = script_pattern.findall(response.text)
+        if not script_match:
+            return None
+
+        # Converter cada item para JSON e filtrar apenas os itens com "origem" igual a "Servidores_SIAPE"
+        servidores = [json.loads(item) for item in script_match if json.loads(item).get('origem') == ("Servidores_SIAPE" if check_siape else "Servidores_BACEN")]
+        if not servidores:
             return None
 
+        # Extrair o ano e mês de cada item, ordenados de forma decrescente
+        anos_meses = [f"{ano}{mes}" for ano, mes in sorted({(item.get('ano'), item.get('mes')) for item in servidores}, reverse=True)]
+
+        # Os últimos meses confirmados limitam as sondagens enquanto houver meses mais recentes a verificar
+        ultimos_confirmados = {sistema_origem: ano_mes for ano_mes, sistema_origem in (self.freshness_cache.obter_ultimo() or [[]])[0]}
+
+        meses_confirmados = await asyncio.gather(*(self._sondar_sistema_origem(sistema_origem, anos_meses, ultimos_confirmados.get(sistema_origem))
+                                                   for sistema_origem in LISTA_SISTEMAS_ORIGEM))
+        anos_meses_validos = [(ano_mes, sistema_origem) for sistema_origem, ano_mes in zip(LISTA_SISTEMAS_ORIGEM, meses_confirmados) if ano_mes is not None]
+        return [anos_meses_validos] if anos_meses_validos != [] else None
+
+
+    async def _sondar_sistema_origem(self, sistema_origem, anos_meses, ultimo_confirmado=None):
+        """
+        Retorna o mês mais recente com o arquivo do sistema de origem publicado. Os meses anteriores ao último
+        confirmado só são sondados se nenhum dos meses a partir dele estiver publicado.
+        """
+        if ultimo_confirmado in anos_meses:
+            limite = anos_meses.index(ultimo_confirmado) + 1
+            return (await self._primeiro_mes_publicado(sistema_origem, anos_meses[:limite])
+                    or await self._primeiro_mes_publicado(sistema_origem, anos_meses[limite:]))
+        return await self._primeiro_mes_publicado(sistema_origem, anos_meses)
+
+
+    async def _primeiro_mes_publicado(self, sistema_origem, anos_meses):
+        publicados = {}
+        sondagens = {}
+        proximo = 0
+        try:
+            while True:
+                # O resultado é o primeiro mês publicado cujos meses mais recentes já foram todos descartados
+                for ano_mes in anos_meses:
+                    if ano_mes not in publicados:
+                        break
+                    if publicados[ano_mes]:
+                        return ano_mes
+                else:
+                    return None
+
+                while proximo < len(anos_meses) and len(sondagens) < SONDAGENS_SIMULTANEAS:
+                    sondagem = asyncio.create_task(self.async_http_client.head(URL_PORTAL_CSV.format(anos_meses[proximo], sistema_origem)))
+                    sondagens[sondagem] = anos_meses[proximo]
+                    proximo += 1
+
+                concluidas, _ = await asyncio.wait(sondagens, return_when=asyncio.FIRST_COMPLETED)
+                for sondagem in concluidas:
+                    publicados[sondagens.pop(sondagem)] = sondagem.exception() is None and self._arquivo_publicado(sondagem.result(), sistema_origem)
+        finally:
+            # Sondagens de meses mais antigos que o resultado são canceladas
+            for sondagem in sondagens:
+                sondagem.cancel()
+
+
+    def _arquivo_publicado(self, response, sistema_origem):
+        return response is not None and response.status_code == 200 and int(response.headers.get('content-length', 0)) > TAMANHO_MINIMO_ARQUIVO[sistema_origem]
+
         
     def ler_csv_e_transformar_em_servidores(self, lista_fontes_dados):
         """
@@ -114,37 +157,43 @@ class Api(AbstractETL):
         Returns:
         - list or None: Lista de servidores ou None em caso de erro.
         """
+        arquivos_baixados = []
         try:
             lista_sistema_origem = ["SIAPE","BACEN"]
             servidores = pd.DataFrame()
             for sistema in lista_sistema_origem:
                 valor_sistema = next((ano_mes for ano_mes, sistema_origem in lista_fontes_dados[0] if sistema_origem == sistema), None)
                 url = URL_PORTAL_CSV.format(valor_sistema,sistema)
-                # Faz a requisição e obtém o conteúdo do ZIP
-                response = self.http_client.get(url)
-                conteudo_zip = response.content
-
-                # Abre o arquivo ZIP a partir do conteúdo
-                with zipfile.ZipFile(io.BytesIO(conteudo_zip)) as zip_file:
+                # Baixa o ZIP para o disco, com retomada em caso de queda da conexão
+                caminho_zip = self.http_client.download(url)
+                if caminho_zip is None:
+                    self.print_api(f"Não foi possível baixar o arquivo {url}")
+                    return None
+                arquivos_baixados.append(caminho_zip)
+
+                # Abre o arquivo ZIP a partir do disco
+                with zipfile.ZipFile(caminho_zip) as zip_file:
                     # Procura por um arquivo que contenha a palavra "Remuneracao" e "Cadastro" no nome
-                    conteudo_csv_remuneracao = None
-                    conteudo_csv_cadastro = None
+                    nome_csv_remuneracao = None
+                    nome_csv_cadastro = None
 
                     for nome_arquivo in zip_file.namelist():
                         if "Remuneracao" in nome_arquivo:
-                            conteudo_csv_remuneracao = zip_file.read(nome_arquivo).decode('latin-1')                        
+                            nome_csv_remuneracao = nome_arquivo
                         elif "Cadastro" in nome_arquivo:
-                            conteudo_csv_cadastro = zip_file.read(nome_arquivo).decode('latin-1')
+                            nome_csv_cadastro = nome_arquivo
 
-                    if conteudo_csv_remuneracao is None:
+                    if nome_csv_remuneracao is None:
                         self.print_api("Nenhum arquivo 'Remuneracao' encontrado.")
                         return None
 
-                    if conteudo_csv_cadastro is None:
+                    if nome_csv_cadastro is None:
                         self.print_api("Nenhum arquivo 'Cadastro' encontrado.")
                         return None
 
-                    df_remuneracoes = pd.read_csv(StringIO(conteudo_csv_remuneracao), delimiter=';', usecols=[2, 4, 5, 15], decimal=',')
+                    # Os CSVs são lidos diretamente dos membros do ZIP, descompactados e decodificados à medida que são lidos
+                    with zip_file.open(nome_csv_remuneracao) as csv_remuneracao:
+                        df_remuneracoes = pd.read_csv(csv_remuneracao, encoding='latin-1', delimiter=';', usecols=[2, 4, 5, 15], decimal=',')
 
                     # Converter as colunas 5 e 15 para o tipo numérico
                     df_remuneracoes.iloc[:, 2] = pd.to_numeric(df_remuneracoes.iloc[:, 2], errors='coerce')
@@ -153,7 +202,8 @@ class Api(AbstractETL):
                     # Adiciona uma nova coluna contendo a soma das colunas 5 e 15
                     df_remuneracoes['SALARIO_TOTAL'] = df_remuneracoes.iloc[:, 2].fillna(0) + df_remuneracoes.iloc[:, 3].fillna(0)
                     
-                    df_cadastros = pd.read_csv(StringIO(conteudo_csv_cadastro), delimiter=';', usecols=[0, 24])
+                    with zip_file.open(nome_csv_cadastro) as csv_cadastro:
+                        df_cadastros = pd.read_csv(csv_cadastro, encoding='latin-1', delimiter=';', usecols=[0, 24])
 
                     # Join dos DataFrames usando a condição df_remuneracoes[2] == df_cadastros[0]
                     df_resultado = pd.merge(df_remuneracoes, df_cadastros, left_on=df_remuneracoes.columns[0], right_on=df_cadastros.columns[0])
@@ -164,7 +214,7 @@ class Api(AbstractETL):
                     df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
 
                     df_resultado = pd.merge(df_resultado, df_domains, left_on="ORGAO", right_on="ORGAO")
-                    df_resultado['REMUNERACAO_MENSAL_MEDIA'] = df_resultado.apply(lambda row: row['SALARIO_TOTAL'] + row['SALARIO_TOTAL']/3/12 + row['SALARIO_TOTAL']/12, axis=1)
+                    df_resultado['REMUNERACAO_MENSAL_MEDIA'] = calcular_remuneracao_mensal_media(df_resultado, 'SALARIO_TOTAL')
 
                     resultado = df_resultado[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]                                
                     if not servidores.empty:
@@ -177,6 +227,10 @@ class Api(AbstractETL):
         except Exception as e:
             self.log(f"Erro ao ler o ZIP: {e}")
             return None
+        finally:
+            for caminho_zip in arquivos_baixados:
+                if os.path.exists(caminho_zip):
+                    os.remove(caminho_zip)
     
        
 # Exemplo de utilização
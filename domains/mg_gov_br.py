@@ -15,9 +15,9 @@ Data: 2024-03-10
 """
 
 import re
-from io import StringIO
-import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.IngestaoCSV import IngestaoCSV
+from commons.remuneracao import sql_remuneracao_mensal_media
 import unicodedata
 
 # Constantes
@@ -25,6 +25,13 @@ URL_PORTAL_TRANSPARENCIA = "https://www.transparencia.mg.gov.br"
 PATH_PORTAL_REMUNERACOES = "/estado-pessoal/remuneracao-dos-servidores"
 PATH_PORTAL_CSV = "/estado-pessoal/index.php?option=com_transparenciamg&task=estado_remuneracao.downloadRemuneracao&periodo={}"
 
+# Colunas do CSV (posição: nome) e transformação executada pelo DuckDB na carga
+COLUNAS_CSV = {1: 'NOME', 6: 'ORGAO', 9: 'SALARIO', 16: 'BENEFICIOS'}
+SQL_SERVIDORES = f'''SELECT fonte.NOME,
+                            {sql_remuneracao_mensal_media('fonte.SALARIO', beneficios='fonte.BENEFICIOS', ausentes_como_zero=True)} AS REMUNERACAO_MENSAL_MEDIA,
+                            orgaos.ORGAO, orgaos.SIGLA, orgaos.DOMINIO
+                     FROM fonte JOIN orgaos ON fonte.ORGAO = orgaos.ORGAO'''
+
 class Api(AbstractETL):
     """
     Classe para retorno de remuneração de servidores do Estado de Minas Gerais.
@@ -61,7 +68,7 @@ class Api(AbstractETL):
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3',
                 'Referer': f'{url_portal}',
             }
-        response = self.http_client.get(url_portal, headers= headers)
+        response = self.http_client.get(url_portal, headers= headers, usar_cache=True)
         
         if response.status_code == 200:
             padrao = r'<strong>Período:</strong>\s*(\w+)/(\d{4})'
@@ -90,7 +97,7 @@ class Api(AbstractETL):
         - url (str): URL do CSV.
 
         Returns:
-        - list or None: Lista de servidores ou None em caso de erro.
+        - IngestaoCSV: Leitura do CSV a ser carregada pelo DuckDB.
         """
         try:
             url = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_CSV.format(lista_fontes_de_dados[0])
@@ -99,31 +106,17 @@ class Api(AbstractETL):
                 'Referer': f'{url}',
             }
             #req = request.Request(url, headers=headers)
-            # Faz a requisição e obtém o conteúdo do CSV
-            response = self.http_client.get(url)
-            response.raise_for_status()  # Verifica se houve algum erro na solicitação
-            conteudo_csv = response.text
-
-            # Usa o módulo StringIO para transformar a string em um objeto "file-like"
-            arquivo_csv = StringIO(conteudo_csv)
-
-            # criar um dataframe das remunerações
-            df_remuneracoes = pd.read_csv(arquivo_csv, delimiter=';', usecols=[1, 6, 9, 16], decimal=',')
-            df_remuneracoes = df_remuneracoes.rename(columns={df_remuneracoes.columns[0]: 'NOME'})
-            domains = self.get_cache_domains(df_remuneracoes.iloc[:, 1].unique().astype(str).tolist())
-            df_domains = pd.DataFrame([vars(domain) for domain in domains])
-            df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
-
-            df_remuneracoes = pd.merge(df_remuneracoes, df_domains, left_on= df_remuneracoes.iloc[:, 1], right_on="ORGAO")
-
-            df_remuneracoes['SALARIO_TOTAL'] = df_remuneracoes.iloc[:, 2].fillna(0) 
-            df_remuneracoes['REMUNERACAO_MENSAL_MEDIA'] = df_remuneracoes.iloc[:, 3].fillna(0) + df_remuneracoes['SALARIO_TOTAL'].fillna(0) + df_remuneracoes['SALARIO_TOTAL'].fillna(0)/3/12 + df_remuneracoes['SALARIO_TOTAL'].fillna(0)/12 
+            # Baixa o CSV para o disco, a leitura e a transformação são feitas pelo DuckDB durante a carga
+            caminho_csv = self.http_client.download(url, headers=headers)
+            if caminho_csv is None:
+                raise IOError(f"Falha no download de {url}")
 
-            return df_remuneracoes[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]                                
+            return IngestaoCSV(caminho_csv, COLUNAS_CSV, SQL_SERVIDORES, delimitador=';', decimal=',',
+                               numericas=['SALARIO', 'BENEFICIOS'], fn_obter_orgaos=self.obter_tabela_orgaos)
 
         except Exception as e:
             self.print_api(f"Erro ao ler o CSV", e)
-            return None
+            raise
         
     
 # Exemplo de utilização
@@ -16,6 +16,7 @@ Data: 2023-03-21
 
 import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.remuneracao import calcular_remuneracao_mensal_media
 from datetime import datetime
 
 
@@ -103,7 +104,7 @@ class Api(AbstractETL):
                     df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
 
                     df_resultado = pd.merge(df, df_domains, left_on="ORGAO", right_on="ORGAO")
-                    df_resultado['REMUNERACAO_MENSAL_MEDIA'] = df_resultado.apply(lambda row: row['SALARIO_TOTAL'] + row['SALARIO_TOTAL']/3/12 + row['SALARIO_TOTAL']/12, axis=1)
+                    df_resultado['REMUNERACAO_MENSAL_MEDIA'] = calcular_remuneracao_mensal_media(df_resultado, 'SALARIO_TOTAL')
 
                     resultado = df_resultado[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]                                
                     if not servidores.empty:
@@ -17,15 +17,22 @@ Data: 2024-03-10
 from bs4 import BeautifulSoup
 import re
 import os
-from io import StringIO
-import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.IngestaoCSV import IngestaoCSV
+from commons.remuneracao import sql_remuneracao_mensal_media
 
 # Constantes
 URL_PORTAL_TRANSPARENCIA = "https://dados.pe.gov.br"
 PATH_PORTAL_REMUNERACOES = "/dataset/remuneracao-de-servidores"
 PATH_PORTAL_CSV = "/dataset/remuneracao-de-servidores/resource/{}"
 
+# Colunas do CSV (posição: nome) e transformação executada pelo DuckDB na carga
+COLUNAS_CSV = {0: 'ORGAO', 3: 'NOME', 9: 'SALARIO', 12: 'OUTROS'}
+SQL_SERVIDORES = f'''SELECT fonte.NOME,
+                            {sql_remuneracao_mensal_media(['fonte.SALARIO', 'fonte.OUTROS'], ausentes_como_zero=True)} AS REMUNERACAO_MENSAL_MEDIA,
+                            orgaos.ORGAO, orgaos.SIGLA, orgaos.DOMINIO
+                     FROM fonte JOIN orgaos ON fonte.ORGAO = orgaos.ORGAO'''
+
 class Api(AbstractETL):
     """
     Classe para retorno de remuneração de servidores do Estado de Pernambuco.
@@ -59,7 +66,7 @@ class Api(AbstractETL):
         - list or str: Lista de hrefs ou mensagem de erro.
         """
         url_portal = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_REMUNERACOES
-        response = self.http_client.get(url_portal)
+        response = self.http_client.get(url_portal, usar_cache=True)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -94,7 +101,7 @@ class Api(AbstractETL):
         - url (str): URL do CSV.
 
         Returns:
-        - list or None: Lista de servidores ou None em caso de erro.
+        - IngestaoCSV: Leitura do CSV a ser carregada pelo DuckDB.
         """
         try:
             
@@ -109,32 +116,17 @@ class Api(AbstractETL):
                 url_portal = links[0]
 
 
-            # Faz a requisição e obtém o conteúdo do CSV
-            response = self.http_client.get(url_portal)
-            conteudo_csv = response.text
-
-            # Usa o módulo StringIO para transformar a string em um objeto "file-like"
-            arquivo_csv = StringIO(conteudo_csv)
-
-            # criar um dataframe das remunerações
-            df_remuneracoes = pd.read_csv(arquivo_csv, delimiter=';', usecols=[0, 3, 9, 12], decimal='.')
-
-            df_remuneracoes = df_remuneracoes.rename(columns={df_remuneracoes.columns[0]: 'ORGAO',df_remuneracoes.columns[1]: 'NOME', df_remuneracoes.columns[2]: 'SALARIO', df_remuneracoes.columns[3]: 'OUTROS'})
-            domains = self.get_cache_domains(df_remuneracoes.iloc[:, 0].unique().astype(str).tolist())
-            df_domains = pd.DataFrame([vars(domain) for domain in domains])
-            df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
-
-            df_remuneracoes = pd.merge(df_remuneracoes, df_domains, left_on= df_remuneracoes.iloc[:, 0], right_on="ORGAO")
-
-            df_remuneracoes['SALARIO_TOTAL'] = df_remuneracoes.iloc[:, 3].fillna(0) + df_remuneracoes.iloc[:, 4].fillna(0) 
-            df_remuneracoes['REMUNERACAO_MENSAL_MEDIA'] = df_remuneracoes['SALARIO_TOTAL'].fillna(0) + df_remuneracoes['SALARIO_TOTAL'].fillna(0)/3/12 + df_remuneracoes['SALARIO_TOTAL'].fillna(0)/12 
-
-            return df_remuneracoes[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]                                
+            # Baixa o CSV para o disco, a leitura e a transformação são feitas pelo DuckDB durante a carga
+            caminho_csv = self.http_client.download(url_portal)
+            if caminho_csv is None:
+                raise IOError(f"Falha no download de {url_portal}")
 
+            return IngestaoCSV(caminho_csv, COLUNAS_CSV, SQL_SERVIDORES, delimitador=';', decimal='.',
+                               numericas=['SALARIO', 'OUTROS'], fn_obter_orgaos=self.obter_tabela_orgaos)
 
         except Exception as e:
             self.print_api(f"Erro ao ler o CSV", e)
-            return None
+            raise
             
    
 # Exemplo de utilização
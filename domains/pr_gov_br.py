@@ -14,11 +14,11 @@ Data: 2024-03-17
 
 """
 
-import io
+import os
 import zipfile
-from io import StringIO
 import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.remuneracao import calcular_remuneracao_mensal_media
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
@@ -115,36 +115,27 @@ class Api(AbstractETL):
         Returns:
         - list or None: Lista de servidores ou None em caso de erro.
         """
+        arquivos_baixados = []
         try:
             servidores = pd.DataFrame()
                 
-            # Faz a requisição e obtém o conteúdo do ZIP
-            response = self.http_client.get(PATH_PORTAL_RH)
-            conteudo_zip_rh = response.content
-            response = self.http_client.get(lista_fontes_dados[0])
-            conteudo_zip_remuneracao = response.content
-
-            conteudo_csv_remuneracao = None
-            conteudo_csv_cadastro = None    
-
-            # Abre o arquivo ZIP a partir do conteúdo
-            with zipfile.ZipFile(io.BytesIO(conteudo_zip_remuneracao)) as zip_file:
-                for nome_arquivo in zip_file.namelist():
-                    conteudo_csv_remuneracao = zip_file.read(nome_arquivo).decode('latin-1')                        
-            
-            with zipfile.ZipFile(io.BytesIO(conteudo_zip_rh)) as zip_file:
-                for nome_arquivo in zip_file.namelist():
-                    conteudo_csv_cadastro = zip_file.read(nome_arquivo).decode('latin-1')                        
-
-            if conteudo_csv_remuneracao is None:
-                self.print_api("Nenhum arquivo 'Remuneracao' encontrado.")
-                return None
-
-            if conteudo_csv_cadastro is None:
-                self.print_api("Nenhum arquivo 'Cadastro' encontrado.")
-                return None
-
-            df_remuneracoes = pd.read_csv(StringIO(conteudo_csv_remuneracao), delimiter=';', usecols=[0, 7, 8], decimal='.')
+            # Baixa os ZIPs para o disco, com retomada em caso de queda da conexão
+            # O cadastro tem URL fixa, só é baixado novamente quando o servidor indica que o arquivo mudou
+            for url in (PATH_PORTAL_RH, lista_fontes_dados[0]):
+                caminho_zip = self.http_client.download(url, usar_cache=url == PATH_PORTAL_RH)
+                if caminho_zip is None:
+                    self.print_api(f"Não foi possível baixar o arquivo {url}")
+                    return None
+                arquivos_baixados.append(caminho_zip)
+            caminho_zip_rh, caminho_zip_remuneracao = arquivos_baixados
+
+            # Os CSVs são lidos diretamente do último membro de cada ZIP em disco, descompactados e decodificados à medida que são lidos
+            with zipfile.ZipFile(caminho_zip_remuneracao) as zip_file:
+                if not zip_file.namelist():
+                    self.print_api("Nenhum arquivo 'Remuneracao' encontrado.")
+                    return None
+                with zip_file.open(zip_file.namelist()[-1]) as csv_remuneracao:
+                    df_remuneracoes = pd.read_csv(csv_remuneracao, encoding='latin-1', delimiter=';', usecols=[0, 7, 8], decimal='.')
 
             # Converter as colunas 5 e 15 para o tipo numérico
             df_remuneracoes.iloc[:, 1] = pd.to_numeric(df_remuneracoes.iloc[:, 1], errors='coerce')
@@ -153,7 +144,12 @@ class Api(AbstractETL):
             # Adiciona uma nova coluna contendo a soma das colunas 5 e 15
             df_remuneracoes['SALARIO_TOTAL'] = df_remuneracoes.iloc[:, 2].fillna(0) - df_remuneracoes.iloc[:, 1].fillna(0)
             
-            df_cadastros = pd.read_csv(StringIO(conteudo_csv_cadastro), delimiter=';', usecols=[0, 1, 2, 3])
+            with zipfile.ZipFile(caminho_zip_rh) as zip_file:
+                if not zip_file.namelist():
+                    self.print_api("Nenhum arquivo 'Cadastro' encontrado.")
+                    return None
+                with zip_file.open(zip_file.namelist()[-1]) as csv_cadastro:
+                    df_cadastros = pd.read_csv(csv_cadastro, encoding='latin-1', delimiter=';', usecols=[0, 1, 2, 3])
 
             # Join dos DataFrames usando a condição df_remuneracoes[2] == df_cadastros[0]
             df_resultado = pd.merge(df_remuneracoes, df_cadastros, left_on=df_remuneracoes.columns[0], right_on=df_cadastros.columns[0])
@@ -164,7 +160,7 @@ class Api(AbstractETL):
             df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
 
             df_resultado = pd.merge(df_resultado, df_domains, left_on="ORGAO", right_on="ORGAO")
-            df_resultado['REMUNERACAO_MENSAL_MEDIA'] = df_resultado.apply(lambda row: row['SALARIO_TOTAL'] + row['SALARIO_TOTAL']/3/12 + row['SALARIO_TOTAL']/12, axis=1)
+            df_resultado['REMUNERACAO_MENSAL_MEDIA'] = calcular_remuneracao_mensal_media(df_resultado, 'SALARIO_TOTAL')
 
             resultado = df_resultado[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]                                
             if not servidores.empty:
@@ -177,6 +173,10 @@ class Api(AbstractETL):
         except Exception as e:
             self.log(f"Erro ao ler o ZIP: {e}")
             return None
+        finally:
+            for caminho_zip in arquivos_baixados:
+                if os.path.exists(caminho_zip):
+                    os.remove(caminho_zip)
             
    
 # Exemplo de utilização
@@ -15,9 +15,9 @@ Data: 2023-11-22
 """
 
 from bs4 import BeautifulSoup
-from io import BytesIO
 import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.remuneracao import calcular_remuneracao_mensal_media
 
 # Constantes
 URL_PORTAL_TRANSPARENCIA = "https://transparencia.ro.gov.br"
@@ -56,7 +56,7 @@ class Api(AbstractETL):
         - list: Lista de hrefs ou mensagem de erro.
         """
         url_portal = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_REMUNERACOES
-        response = self.http_client.get(url_portal)
+        response = self.http_client.get(url_portal, usar_cache=True)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -77,36 +77,25 @@ class Api(AbstractETL):
         - url (str): URL do CSV.
 
         Returns:
-        - list or None: Lista de servidores ou None em caso de erro.
+        - generator of DataFrame: Blocos de servidores lidos da planilha.
         """
         try:
-            response = self.http_client.get(URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_CSV.format(ano=lista_fontes_de_dados[0][0],mes=lista_fontes_de_dados[0][1]))
+            url = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_CSV.format(ano=lista_fontes_de_dados[0][0],mes=lista_fontes_de_dados[0][1])
 
-            # Verifica se a requisição foi bem-sucedida
-            if response.status_code == 200:
-                # Lê o conteúdo do arquivo Excel baixado
-                df_remuneracoes = pd.read_excel(BytesIO(response.content), decimal=',')
-            else:
-                return None 
+            # Lê apenas as colunas usadas dos servidores ativos, em blocos, à medida que a planilha é percorrida
+            for df_remuneracoes in self.ler_xlsx_em_blocos(url, colunas=[0, 1, 3, 7], fn_filtro=lambda linha: str(linha[2]).lower() == "ativo", numericas=[7]):
+                df_remuneracoes = df_remuneracoes.rename(columns={df_remuneracoes.columns[0]: 'NOME',df_remuneracoes.columns[1]: 'ORGAO',df_remuneracoes.columns[3]: 'SALARIO_TOTAL'})
 
-            df_remuneracoes = df_remuneracoes.iloc[:, [0, 1, 3, 7]]
-            df_remuneracoes = df_remuneracoes[df_remuneracoes.iloc[:, 2].str.lower() == "ativo"]
-            df_remuneracoes.iloc[:, 3] = pd.to_numeric(df_remuneracoes.iloc[:, 3], errors="coerce")
-            df_remuneracoes = df_remuneracoes.rename(columns={df_remuneracoes.columns[0]: 'NOME',df_remuneracoes.columns[1]: 'ORGAO',df_remuneracoes.columns[3]: 'SALARIO_TOTAL'})
+                df_domains = self.obter_tabela_orgaos(df_remuneracoes.iloc[:, 1].unique().astype(str).tolist())
 
+                df_resultado = pd.merge(df_remuneracoes, df_domains, left_on="ORGAO", right_on="ORGAO")
+                df_resultado['REMUNERACAO_MENSAL_MEDIA'] = calcular_remuneracao_mensal_media(df_resultado, 'SALARIO_TOTAL')
 
-            domains = self.get_cache_domains(df_remuneracoes.iloc[:, 1].unique().astype(str).tolist())
-            df_domains = pd.DataFrame([vars(domain) for domain in domains])
-            df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
-
-            df_resultado = pd.merge(df_remuneracoes, df_domains, left_on="ORGAO", right_on="ORGAO")
-            df_resultado['REMUNERACAO_MENSAL_MEDIA'] = df_resultado.apply(lambda row: row['SALARIO_TOTAL'] + row['SALARIO_TOTAL']/3/12 + row['SALARIO_TOTAL']/12, axis=1)
-
-            return df_resultado[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]      
+                yield df_resultado[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]
 
         except Exception as e:
             self.print_api(f"Erro ao ler o CSV", e)
-            return None
+            raise
             
    
 # Exemplo de utilização
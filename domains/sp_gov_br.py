@@ -16,9 +16,9 @@ Data: 2024-03-09
 
 from bs4 import BeautifulSoup
 import re
-from io import StringIO
-import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.IngestaoCSV import IngestaoCSV
+from commons.remuneracao import sql_remuneracao_mensal_media
 from datetime import datetime
 from unidecode import unidecode
 
@@ -27,6 +27,13 @@ URL_PORTAL_TRANSPARENCIA = "https://www.transparencia.sp.gov.br"
 PATH_PORTAL_REMUNERACOES = "/PortalTransparencia-Report/Remuneracao.aspx"
 PATH_PORTAL_CSV = "/PortalTransparencia-Report/txt/RemuneracaoAtivos.csv"
 
+# Colunas do CSV (posição ou cabeçalho: nome) e transformação executada pelo DuckDB na carga
+COLUNAS_CSV = {'NOME': 'NOME', 2: 'ORGAO', 3: 'REMUNERACAO', 5: 'EVENTUAIS'}
+SQL_SERVIDORES = f'''SELECT fonte.NOME,
+                            {sql_remuneracao_mensal_media(['fonte.REMUNERACAO', 'fonte.EVENTUAIS'], ausentes_como_zero=True)} AS REMUNERACAO_MENSAL_MEDIA,
+                            orgaos.ORGAO, orgaos.SIGLA, orgaos.DOMINIO
+                     FROM fonte JOIN orgaos ON fonte.ORGAO = orgaos.ORGAO'''
+
 class Api(AbstractETL):
     """
     Classe para retorno de remuneração de servidores do Estado de São Paulo.
@@ -58,7 +65,7 @@ class Api(AbstractETL):
         - list or str: Lista de hrefs ou mensagem de erro.
         """
         url_portal = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_REMUNERACOES
-        response = self.http_client.post(url_portal)
+        response = self.http_client.post(url_portal, usar_cache=True)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -116,35 +123,22 @@ class Api(AbstractETL):
         - url (str): URL do CSV.
 
         Returns:
-        - list or None: Lista de servidores ou None em caso de erro.
+        - IngestaoCSV: Leitura do CSV a ser carregada pelo DuckDB.
         """
         try:
             url = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_CSV.format(lista_fontes_de_dados[0])
-            # Faz a requisição e obtém o conteúdo do CSV
-            response = self.http_client.get(url)
-            conteudo_csv = response.text
-
-            # Usa o módulo StringIO para transformar a string em um objeto "file-like"
-            arquivo_csv = StringIO(conteudo_csv)
-
-            # criar um dataframe das remunerações
-            df_remuneracoes = pd.read_csv(arquivo_csv, delimiter=';', usecols=[0, 1, 2, 3, 5], decimal=',')
 
-            domains = self.get_cache_domains(df_remuneracoes.iloc[:, 2].unique().astype(str).tolist())
-            df_domains = pd.DataFrame([vars(domain) for domain in domains])
-            df_domains = df_domains.rename(columns={df_domains.columns[0]: 'ORGAO', df_domains.columns[1]: 'SIGLA', df_domains.columns[2]: 'DOMINIO'})
+            # Baixa o CSV para o disco, a leitura e a transformação são feitas pelo DuckDB durante a carga
+            caminho_csv = self.http_client.download(url)
+            if caminho_csv is None:
+                raise IOError(f"Falha no download de {url}")
 
-            df_remuneracoes = pd.merge(df_remuneracoes, df_domains, left_on= df_remuneracoes.iloc[:, 2], right_on="ORGAO")
-
-            # Criar uma nova coluna com base na condição VantagemDesvantageme e na condição para "Rubrica"
-            df_remuneracoes['SALARIO_TOTAL'] = df_remuneracoes.iloc[:, 3].fillna(0) + df_remuneracoes.iloc[:, 4].fillna(0)
-            df_remuneracoes['REMUNERACAO_MENSAL_MEDIA'] = df_remuneracoes['SALARIO_TOTAL'].fillna(0) + df_remuneracoes['SALARIO_TOTAL'].fillna(0)/3/12 + df_remuneracoes['SALARIO_TOTAL'].fillna(0)/12 
-
-            return df_remuneracoes[['NOME', 'REMUNERACAO_MENSAL_MEDIA', 'ORGAO', 'SIGLA', 'DOMINIO']]                                
+            return IngestaoCSV(caminho_csv, COLUNAS_CSV, SQL_SERVIDORES, delimitador=';', decimal=',',
+                               numericas=['REMUNERACAO', 'EVENTUAIS'], fn_obter_orgaos=self.obter_tabela_orgaos)
 
         except Exception as e:
             self.print_api(f"Erro ao ler o CSV", e)
-            return None
+            raise
         
     
 # Exemplo de utilização
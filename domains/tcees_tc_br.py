@@ -13,9 +13,10 @@ Data: 2023-01-01
 
 """
 
-from io import StringIO
-import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.IngestaoCSV import IngestaoCSV
+from commons.remuneracao import sql_remuneracao_mensal_media
+from commons.rubricas import sql_soma_por_rubricas, TERMOS_RUBRICAS_SAZONAIS
 
 # Constantes
 URL_PORTAL_TRANSPARENCIA = "https://dados.es.gov.br"
@@ -23,6 +24,16 @@ PATH_PORTAL_SQL = '/api/3/action/datastore_search?q={nome}{sobrenome}&resource_i
 PATH_PORTAL_CSV = '/datastore/dump/{guid}?bom=True'
 GUID_DATASOURCE = 'f07af7e6-80f1-4726-b938-632123dfe30e'
 
+# Eventos somados na remuneração: créditos (TIPO 'C'), exceto os de 13º salário e férias
+REGRAS_RUBRICAS = {"coluna_rubrica": "RUBRICA", "termos_excluidos": TERMOS_RUBRICAS_SAZONAIS, "coluna_tipo": "TIPO", "tipos_considerados": ["C"]}
+
+# Colunas do CSV (posição ou cabeçalho: nome) e transformação executada pelo DuckDB na carga, restrita à competência mais recente
+COLUNAS_CSV = {1: 'NOME', 'Competencia': 'COMPETENCIA', 7: 'TIPO', 'DescricaoEvento': 'RUBRICA', 11: 'VALOR'}
+SQL_RUBRICAS, PARAMETROS_RUBRICAS = sql_soma_por_rubricas(REGRAS_RUBRICAS, 'NOME', '(SELECT * FROM fonte WHERE COMPETENCIA = CAST($competencia AS VARCHAR))')
+SQL_SERVIDORES = f'''SELECT agrupado.NOME, {sql_remuneracao_mensal_media('agrupado.VALOR')} AS REMUNERACAO_MENSAL_MEDIA,
+                            $orgao AS ORGAO, $sigla AS SIGLA, $dominio AS DOMINIO
+                     FROM ({SQL_RUBRICAS}) AS agrupado'''
+
 class Api(AbstractETL):
     """
     Classe para retorno de remuneração de servidores Tribunal de Contas do Estado do Espírito Santo.
@@ -67,36 +78,21 @@ class Api(AbstractETL):
         - url (str): URL do CSV.
 
         Returns:
-        - list or None: Lista de servidores ou None em caso de erro.
+        - IngestaoCSV or None: Leitura do CSV a ser carregada pelo DuckDB ou None em caso de erro.
         """
         try:
             url = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_CSV.format(guid=GUID_DATASOURCE)
             max_competencia = lista_fontes_de_dados[0]
-            # Faz a requisição e obtém o conteúdo do CSV
-            response = self.http_client.get(url)
-            conteudo_csv = response.text
-
-            # Usa o módulo StringIO para transformar a string em um objeto "file-like"
-            arquivo_csv = StringIO(conteudo_csv)
-
-            # criar um dataframe das remunerações
-            df_remuneracoes = pd.read_csv(arquivo_csv, delimiter=',', usecols=[1, 6, 7, 9, 11], decimal=',')
-            df_remuneracoes = df_remuneracoes[df_remuneracoes['Competencia'] == max_competencia]
-            # Criar uma nova coluna com base na condição TipoEventro e na condição para "DescricaoEvento"
-            df_remuneracoes['REMUNERACAO_MENSAL_MEDIA'] = df_remuneracoes.apply(lambda row: 0 if any(substring in row["DescricaoEvento"] for substring in ["DECIMO TERCEIRO", "13", " FER"]) else (row.iloc[4] + row.iloc[4]/3/12 + row.iloc[4]/12 ) if row.iloc[2].lower() == 'c' else 0 if pd.notna(row.iloc[2]) else 0, axis=1)
-
-            df_remuneracoes = df_remuneracoes.drop(columns=["DescricaoEvento"])
-
-            # Criar um DataFrame agrupado
-            df_agrupado = df_remuneracoes.groupby([df_remuneracoes.iloc[:, 0]]).agg({
-                'REMUNERACAO_MENSAL_MEDIA': 'sum',
-            }).reset_index()
 
-            df_agrupado['ORGAO'] = 'Tribunal de Contas do Estado do Espírito Santo'
-            df_agrupado['SIGLA'] = 'TCEES'
-            df_agrupado['DOMINIO'] = self.dominio
+            # Baixa o CSV para o disco, a leitura e a transformação são feitas pelo DuckDB durante a carga
+            caminho_csv = self.http_client.download(url, usar_cache=True)
+            if caminho_csv is None:
+                raise IOError(f"Falha no download de {url}")
 
-            return df_agrupado
+            parametros = dict(PARAMETROS_RUBRICAS, competencia=str(max_competencia), orgao='Tribunal de Contas do Estado do Espírito Santo',
+                              sigla='TCEES', dominio=self.dominio)
+            return IngestaoCSV(caminho_csv, COLUNAS_CSV, SQL_SERVIDORES, delimitador=',', decimal=',', encoding='utf-8',
+                               numericas=['VALOR'], parametros=parametros)
 
         except Exception as e:
             self.print_api("Erro ao ler o CSV", e)
@@ -14,16 +14,20 @@ Data: 2023-12-10
 from bs4 import BeautifulSoup
 import re
 import os
-import ezodf
-import io
 import pandas as pd
 from commons.AbstractETL import AbstractETL 
+from commons.remuneracao import calcular_remuneracao_mensal_media
+from commons.rubricas import somar_por_rubricas, TERMOS_RUBRICAS_SAZONAIS
+from commons.planilhas import ler_ods
 
 # Constantes
 URL_PORTAL_TRANSPARENCIA = "http://www.tjes.jus.br"
 PATH_PORTAL_REMUNERACOES = "/portal-transparencia/pessoal/folha-de-pagamento"
 PATH_PORTAL_ODS = "/wp-content/uploads/{}"
 
+# Rubricas somadas na remuneração: créditos (TIPO 'C'), exceto as de 13º salário e férias
+REGRAS_RUBRICAS = {"coluna_rubrica": "RUBRICA", "termos_excluidos": TERMOS_RUBRICAS_SAZONAIS, "coluna_tipo": "TIPO", "tipos_considerados": ["C"]}
+
 class Api(AbstractETL):
     """
     Classe para retorno de remuneração de servidores do Pode Judiciário do Espírito Santo.
@@ -37,7 +41,9 @@ class Api(AbstractETL):
                          unidade_federativa="Espírito Santo",
                     portal_remuneracoes_url=URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_REMUNERACOES,
                     fn_obter_link_mais_recente=self.obter_links_arquivo_mais_recentes,
-                    fn_ler_fonte_de_dados_e_transformar_em_dataframe=self.ler_arquivo_e_transformar_em_servidores
+                    fn_ler_fonte_de_dados_e_transformar_em_dataframe=self.ler_arquivo_e_transformar_em_servidores,
+                    # Os dois arquivos mensais são baixados e lidos ao mesmo tempo
+                    leituras_simultaneas=2
                     )
 
     def get_remuneracao(self, email):
@@ -57,7 +63,7 @@ class Api(AbstractETL):
         """
 
         url_portal = self.portal_remuneracoes_url
-        response = self.http_client.get(url_portal)
+        response = self.http_client.get(url_portal, usar_cache=True)
         
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -100,24 +106,21 @@ class Api(AbstractETL):
             for arquivo in lista_fontes_de_dados:
                 url_ods = URL_PORTAL_TRANSPARENCIA + PATH_PORTAL_ODS.format(arquivo)
 
-                # Faz a requisição e obtém o conteúdo do arquivo ODS
-                response = self.http_client.get(url_ods)
-                conteudo_ods = response.content
-
-                # Carrega o conteúdo ODS usando ezodf
-                doc = ezodf.opendoc(io.BytesIO(conteudo_ods))
-
-                # Itera sobre as folhas do ODS (assumindo apenas uma folha)
-                sheet =  doc.sheets[0]
-
-                dados_linhas = [col[:] for col in doc.sheets[2].columns()]
-                df = pd.DataFrame({col[0].value: [c.value for c in col[1:]] for col in dados_linhas})
-                df.replace({None: ''}, inplace=True)
-                palavras_excluir = ["DECIMO TERCEIRO", "13", " FER"]
-                df_filtrado = df[~df.iloc[:, 8].str.contains('|'.join(palavras_excluir))]
-                resultado = df_filtrado[df_filtrado['TIPO'] == 'C'].groupby('NOME')['VALOR'].sum()
-                resultado = resultado.reset_index()
-                resultado['REMUNERACAO_MENSAL_MEDIA'] = resultado.apply(lambda row: row['VALOR'] + row['VALOR']/3/12 + row['VALOR']/12, axis=1)
+                # Baixa o arquivo ODS para o disco
+                caminho_ods = self.http_client.download(url_ods)
+                if caminho_ods is None:
+                    raise IOError(f"Falha no download de {url_ods}")
+
+                try:
+                    # Lê apenas as colunas usadas da terceira planilha, em streaming sobre o content.xml
+                    df = ler_ods(caminho_ods, planilha=2, colunas=['NOME', 'TIPO', 'VALOR', 8])
+                finally:
+                    os.remove(caminho_ods)
+                df = df.rename(columns={df.columns[3]: 'RUBRICA'})
+
+                # Soma as rubricas consideradas de cada servidor (créditos, exceto 13º e férias) em uma única consulta no DuckDB
+                resultado = somar_por_rubricas(df, REGRAS_RUBRICAS, 'NOME', somente_grupos_considerados=True)
+                resultado['REMUNERACAO_MENSAL_MEDIA'] = calcular_remuneracao_mensal_media(resultado, 'VALOR')
                 resultado['DOMINIO'] = self.dominio
                 resultado['SIGLA'] = "TJES"
                 resultado['ORGAO'] = "Tribunal de Justiça do Estado do Espírito Santo"
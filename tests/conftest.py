@@ -0,0 +1,36 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import commons.AbstractETL as modulo_etl
+import commons.FreshnessCache as modulo_freshness
+from commons.AbstractETL import AbstractETL
+from commons.DatabaseRegistry import database_registry
+
+
+@pytest.fixture
+def cache_directory(tmp_path, monkeypatch):
+    '''
+    Direciona o CACHE_DIRECTORY do AbstractETL e do registro de bancos para um diretório temporário.
+    '''
+    monkeypatch.setattr(modulo_etl, 'CACHE_DIRECTORY', str(tmp_path))
+    monkeypatch.setattr(modulo_etl, 'CACHE_ORGAOS', str(tmp_path / 'orgaos_db.json'))
+    monkeypatch.setattr(modulo_freshness, 'CACHE_DIRECTORY', str(tmp_path))
+    monkeypatch.setattr(database_registry, 'diretorio', str(tmp_path))
+    monkeypatch.setattr(database_registry, '_entradas', {})
+    monkeypatch.setattr(database_registry, '_bancos_sem_manifesto', {})
+    return tmp_path
+
+
+@pytest.fixture
+def criar_etl(cache_directory):
+    '''
+    Cria um domínio de teste cujo banco é construído a partir do DataFrame informado.
+    '''
+    def criar(servidores, dominio='teste.gov.br'):
+        etl = AbstractETL('ES', dominio, 'https://portal.teste.gov.br', lambda: ['fonte'], lambda guid: servidores)
+        etl.add_to_database(['fonte'], servidores)
+        return etl
+    return criar
@@ -0,0 +1,35 @@
+import pandas as pd
+
+
+def _servidores(*nomes):
+    return pd.DataFrame([{"ORGAO": "SECRETARIA DA FAZENDA", "NOME": nome, "REMUNERACAO_MENSAL_MEDIA": 1000.0 + i,
+                          "SIGLA": "SEFAZ", "DOMINIO": "teste.gov.br"} for i, nome in enumerate(nomes)])
+
+
+def test_login_com_nomes_do_meio(criar_etl):
+    etl = criar_etl(_servidores("JOÃO SILVA SANTOS OLIVEIRA", "MARIA SOUZA"))
+
+    servidores = etl.filter_by_email_login("silva.santos@sefaz.teste.gov.br")
+
+    assert [servidor.nome for servidor in servidores] == ["JOÃO SILVA SANTOS OLIVEIRA"]
+
+
+def test_login_com_nomes_do_meio_em_lote(criar_etl):
+    etl = criar_etl(_servidores("JOÃO SILVA SANTOS OLIVEIRA", "MARIA SOUZA", "MARIA CLARA SOUZA"))
+
+    resultado = etl.filter_by_email_login_batch(["silva.santos@sefaz.teste.gov.br", "maria.souza@sefaz.teste.gov.br",
+                                                 "invalido", "pedro.alves@sefaz.teste.gov.br"])
+
+    assert [sorted(servidor.nome for servidor in servidores) for servidores in resultado] == [
+        ["JOÃO SILVA SANTOS OLIVEIRA"], ["MARIA CLARA SOUZA", "MARIA SOUZA"], [], []]
+
+
+def test_resultado_nao_depende_de_outros_servidores(criar_etl):
+    # A sequência no meio do nome é encontrada havendo ou não um servidor com o nome exato do login
+    email = "ana.lima@sefaz.teste.gov.br"
+    sem_nome_exato = criar_etl(_servidores("JOSE ANA LIMA PEREIRA"), dominio='sem-nome-exato.teste.gov.br')
+    com_nome_exato = criar_etl(_servidores("ANA LIMA", "JOSE ANA LIMA PEREIRA"))
+
+    assert [servidor.nome for servidor in sem_nome_exato.filter_by_email_login(email)] == ["JOSE ANA LIMA PEREIRA"]
+    assert sorted(servidor.nome for servidor in com_nome_exato.filter_by_email_login(email)) == ["ANA LIMA", "JOSE ANA LIMA PEREIRA"]
+    assert sorted(servidor.nome for servidor in com_nome_exato.filter_by_email_login_batch([email])[0]) == ["ANA LIMA", "JOSE ANA LIMA PEREIRA"]
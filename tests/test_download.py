@@ -0,0 +1,97 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import commons.HTTPRequestManager as modulo_http
+from commons.HTTPRequestManager import HTTPRequestManager
+
+CONTEUDO = bytes(range(256)) * 400
+
+
+class _Portal(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    validador = None
+    conteudo = CONTEUDO
+    requisicoes = []
+
+    def do_GET(self):
+        _Portal.requisicoes.append(self.headers.get('Range'))
+        inicio = 0
+        if self.headers.get('Range') and self.headers.get('If-Range') == _Portal.validador:
+            inicio = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {inicio}-{len(_Portal.conteudo) - 1}/{len(_Portal.conteudo)}')
+        else:
+            self.send_response(200)
+        if _Portal.validador:
+            self.send_header('ETag', _Portal.validador)
+        self.send_header('Content-Length', str(len(_Portal.conteudo) - inicio))
+        self.end_headers()
+        # A primeira resposta é interrompida no meio do corpo
+        if len(_Portal.requisicoes) == 1:
+            self.wfile.write(_Portal.conteudo[:len(_Portal.conteudo) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(_Portal.conteudo[inicio:])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo_http, 'CACHE_DIRECTORY', str(tmp_path))
+    monkeypatch.setattr(modulo_http, 'tempo_backoff', lambda tentativa, host: 0)
+    _Portal.requisicoes = []
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Portal)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{servidor.server_address[1]}/dados.csv'
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _ler(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+
+def test_retomada_com_validador_usa_range(portal, monkeypatch):
+    monkeypatch.setattr(_Portal, 'validador', '"v1"')
+
+    caminho = HTTPRequestManager().download(portal, tamanho_bloco=4096)
+
+    assert _ler(caminho) == CONTEUDO
+    # A retomada parte do último bloco gravado em disco
+    assert _Portal.requisicoes[0] is None and _Portal.requisicoes[1].startswith('bytes=') and _Portal.requisicoes[1] != 'bytes=0-'
+
+
+def test_retomada_sem_validador_recomeca_do_inicio(portal):
+    caminho = HTTPRequestManager().download(portal, tamanho_bloco=4096)
+
+    assert _ler(caminho) == CONTEUDO
+    assert _Portal.requisicoes == [None, None]
+
+
+def test_downloads_da_mesma_url_nao_compartilham_arquivos(portal, tmp_path):
+    _Portal.requisicoes = [None]
+    cliente = HTTPRequestManager()
+
+    caminhos = [cliente.download(portal, tamanho_bloco=4096), cliente.download(portal, tamanho_bloco=4096)]
+
+    assert caminhos[0] != caminhos[1]
+    assert all(_ler(caminho) == CONTEUDO for caminho in caminhos)
+    assert sorted(os.listdir(tmp_path / 'downloads')) == sorted(os.path.basename(caminho) for caminho in caminhos)
+
+
+@pytest.mark.parametrize('conteudo', [CONTEUDO, b''], ids=['com_conteudo', 'vazio'])
+def test_download_mapeado_nao_deixa_arquivos(portal, tmp_path, monkeypatch, conteudo):
+    monkeypatch.setattr(_Portal, 'conteudo', conteudo)
+    _Portal.requisicoes = [None]
+
+    buffer = HTTPRequestManager().download(portal, tamanho_bloco=4096, mapear=True)
+
+    with buffer:
+        assert buffer.read() == conteudo
+    assert os.listdir(tmp_path / 'downloads') == []
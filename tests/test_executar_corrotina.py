@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import pytest
+from commons.AsyncHTTPRequestManager import AsyncHTTPRequestManager, executar_corrotina, THREADS_PADRAO
+
+
+async def _thread_atual():
+    await asyncio.sleep(0)
+    return threading.current_thread().name
+
+
+async def _falhar():
+    raise ValueError("falha na corrotina")
+
+
+def test_sem_event_loop_em_execucao():
+    assert executar_corrotina(_thread_atual()) == threading.current_thread().name
+
+
+def test_com_event_loop_em_execucao():
+    async def chamador():
+        # Um método síncrono chamado de dentro de uma corrotina bloquearia o event loop
+        return executar_corrotina(_thread_atual())
+
+    with pytest.raises(RuntimeError, match="variante assíncrona"):
+        asyncio.run(chamador())
+
+
+def test_excecao_da_corrotina_e_propagada():
+    with pytest.raises(ValueError, match="falha na corrotina"):
+        executar_corrotina(_falhar())
+
+
+class _Resposta:
+    status_code = 200
+
+
+def test_gerenciadores_compartilham_o_pool_de_threads(monkeypatch):
+    gerenciadores = [AsyncHTTPRequestManager(dominio=f'{indice}.gov.br') for indice in range(2 * THREADS_PADRAO)]
+    threads = set()
+    for gerenciador in gerenciadores:
+        monkeypatch.setattr(gerenciador.http_client, 'get', lambda url, **parametros: threads.add(threading.current_thread()) or _Resposta())
+
+    async def requisitar():
+        await asyncio.gather(*(gerenciador.get('https://portal.gov.br') for gerenciador in gerenciadores))
+
+    asyncio.run(requisitar())
+
+    assert all(thread.name.startswith('http-async') for thread in threads)
+    assert len([thread for thread in threading.enumerate() if thread.name.startswith('http-async')]) <= THREADS_PADRAO
@@ -0,0 +1,31 @@
+import threading
+import commons.FreshnessCache as modulo_freshness
+from commons.FreshnessCache import FreshnessCache
+
+
+def test_escritores_simultaneos_do_mesmo_dominio(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo_freshness, 'CACHE_DIRECTORY', str(tmp_path))
+    # Instâncias distintas do mesmo domínio não compartilham o lock, apenas o arquivo
+    caches = [FreshnessCache('teste.gov.br') for _ in range(4)]
+    erros = []
+    inicio = threading.Barrier(8)
+
+    def registrar(cache, indice):
+        inicio.wait()
+        try:
+            for repeticao in range(50):
+                cache.registrar([('fonte', indice, repeticao)])
+                cache.obter_ultimo()
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=registrar, args=(caches[indice % len(caches)], indice)) for indice in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert erros == []
+    links = FreshnessCache('teste.gov.br').obter()
+    assert len(links) == 1 and links[0][0] == 'fonte' and links[0][2] == 49
+    assert sorted(arquivo.name for arquivo in tmp_path.iterdir()) == ['teste.gov.br.freshness']
@@ -0,0 +1,50 @@
+import asyncio
+import threading
+from commons.Cassette import Cassette, MODO_REPRODUZIR, cassette, usar_cassette
+from commons.HTTPRequestManager import HTTPRequestManager
+from commons.AsyncHTTPRequestManager import AsyncHTTPRequestManager, executar_corrotina
+
+
+class _Resposta:
+    status_code = 200
+
+
+def test_gravacao_vale_apenas_para_o_contexto(tmp_path):
+    cliente = HTTPRequestManager()
+    gravacao = Cassette(MODO_REPRODUZIR, str(tmp_path))
+    em_uso = threading.Event()
+    liberar = threading.Event()
+    outra_thread = []
+
+    def consulta_simultanea():
+        em_uso.wait()
+        outra_thread.append(cliente._gravacao())
+        liberar.set()
+
+    thread = threading.Thread(target=consulta_simultanea)
+    thread.start()
+    with usar_cassette(gravacao):
+        em_uso.set()
+        liberar.wait()
+        assert cliente._gravacao() is gravacao
+    thread.join()
+
+    assert outra_thread == [cassette]
+    assert cliente._gravacao() is cassette
+
+
+def test_gravacao_propagada_as_requisicoes_assincronas(tmp_path, monkeypatch):
+    cliente = AsyncHTTPRequestManager()
+    gravacao = Cassette(MODO_REPRODUZIR, str(tmp_path))
+    usadas = []
+    monkeypatch.setattr(cliente.http_client, 'get', lambda url, **parametros: usadas.append(cliente.http_client._gravacao()) or _Resposta())
+
+    async def requisitar():
+        await asyncio.gather(*(cliente.get(f'https://portal.gov.br/{indice}') for indice in range(4)))
+
+    with usar_cassette(gravacao):
+        executar_corrotina(requisitar())
+    asyncio.run(requisitar())
+
+    assert usadas[:4] == [gravacao] * 4
+    assert usadas[4:] == [cassette] * 4
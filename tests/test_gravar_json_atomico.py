@@ -0,0 +1,39 @@
+import os
+import json
+import threading
+import pytest
+from commons.utils import gravar_json_atomico
+
+
+def test_gravacoes_simultaneas_do_mesmo_arquivo(tmp_path):
+    caminho = str(tmp_path / 'dominio.manifest')
+    erros = []
+    inicio = threading.Barrier(8)
+
+    def gravar(indice):
+        inicio.wait()
+        try:
+            for repeticao in range(50):
+                gravar_json_atomico(caminho, {"escritor": indice, "repeticao": repeticao})
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar, args=(indice,)) for indice in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert erros == []
+    with open(caminho, encoding='utf-8') as arquivo:
+        assert json.load(arquivo)["repeticao"] == 49
+    assert os.listdir(tmp_path) == ['dominio.manifest']
+
+
+def test_falha_na_gravacao_remove_o_temporario(tmp_path):
+    caminho = str(tmp_path / 'dominio.digest')
+
+    with pytest.raises(TypeError):
+        gravar_json_atomico(caminho, {"valor": object()})
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,47 @@
+import pytest
+import commons.HostPolicy as modulo_politica
+from commons.HostPolicy import obter_limitador, tempo_backoff, TAXAS_PADRAO_POR_HOST
+
+
+@pytest.fixture
+def configuracao(monkeypatch):
+    # Configuração em memória no lugar do app.conf, com contagem das leituras
+    valores = {}
+    leituras = []
+
+    def get_configuration_value(chave, valor_padrao=None):
+        leituras.append(chave)
+        return valores.get(chave, valor_padrao)
+
+    monkeypatch.setattr(modulo_politica, 'get_configuration_value', get_configuration_value)
+    monkeypatch.setattr(modulo_politica, '_limitadores', {})
+    monkeypatch.setattr(modulo_politica, '_backoffs', {})
+    return valores, leituras
+
+
+def test_hosts_das_coletas_sao_limitados_por_padrao(configuracao):
+    assert obter_limitador('https://www.al.es.gov.br/Transparencia/ListagemServidoresTable').taxa == TAXAS_PADRAO_POR_HOST['www.al.es.gov.br']
+    assert obter_limitador('https://portaldatransparencia.gov.br/download-de-dados').taxa == TAXAS_PADRAO_POR_HOST['portaldatransparencia.gov.br']
+    assert obter_limitador('https://transparencia.es.gov.br').taxa == 0
+
+
+def test_configuracao_do_host_sobrescreve_a_taxa_padrao(configuracao):
+    valores, _ = configuracao
+    valores['HTTP_TAXA'] = '2'
+    valores['HTTP_TAXA_www.al.es.gov.br'] = '1'
+
+    assert obter_limitador('https://www.al.es.gov.br').taxa == 1
+    assert obter_limitador('https://portaldatransparencia.gov.br').taxa == TAXAS_PADRAO_POR_HOST['portaldatransparencia.gov.br']
+    assert obter_limitador('https://transparencia.es.gov.br').taxa == 2
+
+
+def test_backoff_le_a_configuracao_uma_vez_por_host(configuracao):
+    valores, leituras = configuracao
+    valores['HTTP_BACKOFF_MAXIMO_www.al.es.gov.br'] = '0.5'
+
+    esperas = [tempo_backoff(tentativa, 'www.al.es.gov.br') for tentativa in range(1, 6)]
+    leituras_do_host = len(leituras)
+    tempo_backoff(6, 'www.al.es.gov.br')
+
+    assert all(0 <= espera <= 0.5 for espera in esperas)
+    assert len(leituras) == leituras_do_host
@@ -0,0 +1,75 @@
+import os
+import pandas as pd
+import pytest
+import commons.utils as utils
+from commons.UnifiedIndex import unified_index
+from commons.DatabaseRegistry import database_registry
+
+EMAIL = "ana.lima@sefaz.teste.gov.br"
+
+
+@pytest.fixture
+def indice(cache_directory, monkeypatch):
+    monkeypatch.setattr(unified_index, 'habilitado', True)
+    monkeypatch.setattr(unified_index, 'diretorio', str(cache_directory / 'indice_unificado'))
+    return unified_index
+
+
+@pytest.fixture
+def etl(criar_etl, indice):
+    etl = criar_etl(pd.DataFrame([{"ORGAO": "SECRETARIA DA FAZENDA", "NOME": "ANA LIMA", "REMUNERACAO_MENSAL_MEDIA": 1000.0,
+                                   "SIGLA": "SEFAZ", "DOMINIO": "teste.gov.br"}]))
+    etl.freshness_cache.registrar(['fonte'])
+    return etl
+
+
+def test_particao_atualizada_resolve_o_email(etl, indice):
+    resultado = indice.buscar([EMAIL, "jose.souza@outro.gov.br"])
+
+    assert [servidor.nome for servidor in resultado[0]] == ["ANA LIMA"]
+    assert resultado[1] is None
+
+
+def test_particao_de_geracao_anterior_nao_e_usada(etl, indice):
+    manifesto = database_registry.ler_manifesto(etl.dominio)
+    database_registry.publicar(etl.dominio, dict(manifesto, geracao=manifesto["geracao"] + 1))
+
+    assert indice.buscar([EMAIL]) == [None]
+
+
+def test_fonte_expirada_segue_pelo_dominio(etl, indice, tmp_path, monkeypatch):
+    etl.freshness_cache.invalidar()
+    (tmp_path / 'teste_gov_br.py').touch()
+    monkeypatch.setitem(utils._apis_carregadas, etl.dominio, etl)
+    consultados = []
+    monkeypatch.setattr(etl, 'get_remuneracao_batch', lambda emails: consultados.extend(emails) or [[] for _ in emails])
+
+    assert indice.buscar([EMAIL]) == [None]
+    assert utils.get_remuneracao_em_lote([EMAIL], str(tmp_path)) == [[]]
+    assert consultados == [EMAIL]
+
+
+def test_lote_usa_o_indice_sem_consultar_o_dominio(etl, tmp_path, monkeypatch):
+    (tmp_path / 'teste_gov_br.py').touch()
+    monkeypatch.setitem(utils._apis_carregadas, etl.dominio, etl)
+    monkeypatch.setattr(etl, 'get_remuneracao_batch', lambda emails: pytest.fail("domínio consultado"))
+
+    resultado = utils.get_remuneracao_em_lote([EMAIL], str(tmp_path))
+
+    assert [servidor.nome for servidor in resultado[0]] == ["ANA LIMA"]
+
+
+def test_particao_publicada_depois_do_manifesto(criar_etl, indice, monkeypatch):
+    publicar_manifesto = database_registry.publicar
+    particoes_no_manifesto = []
+
+    def publicar(dominio, manifesto):
+        particoes_no_manifesto.append(os.path.exists(os.path.join(indice._caminho_particao(dominio), 'servidores.parquet')))
+        publicar_manifesto(dominio, manifesto)
+    monkeypatch.setattr(database_registry, 'publicar', publicar)
+
+    criar_etl(pd.DataFrame([{"ORGAO": "SECRETARIA DA FAZENDA", "NOME": "ANA LIMA", "REMUNERACAO_MENSAL_MEDIA": 1000.0,
+                             "SIGLA": "SEFAZ", "DOMINIO": "teste.gov.br"}]))
+
+    assert particoes_no_manifesto == [False]
+    assert sorted(os.listdir(indice._caminho_particao('teste.gov.br'))) == ['geracao.json', 'servidores.parquet']
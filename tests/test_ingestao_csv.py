@@ -0,0 +1,51 @@
+import duckdb
+import pandas as pd
+import commons.IngestaoCSV as modulo_ingestao
+from commons.IngestaoCSV import IngestaoCSV, detectar_encoding
+
+CONSULTA = '''SELECT fonte.NOME, fonte.SALARIO AS REMUNERACAO_MENSAL_MEDIA, orgaos.ORGAO, orgaos.SIGLA, orgaos.DOMINIO
+              FROM fonte JOIN orgaos ON fonte.ORGAO = orgaos.ORGAO ORDER BY fonte.NOME'''
+
+
+def test_caractere_interrompido_no_fim_da_amostra(tmp_path, monkeypatch):
+    caminho = tmp_path / 'servidores.csv'
+    caminho.write_bytes('NOME\nJOÃO\n'.encode('utf-8'))
+    # A amostra termina no meio dos dois bytes do Ã
+    monkeypatch.setattr(modulo_ingestao, 'TAMANHO_AMOSTRA_DETECCAO', len('NOME\nJO'.encode('utf-8')) + 1)
+
+    assert detectar_encoding(str(caminho)) == 'utf-8'
+
+
+def test_latin1(tmp_path):
+    caminho = tmp_path / 'servidores.csv'
+    caminho.write_bytes('NOME\nJOÃO\n'.encode('latin-1'))
+
+    assert detectar_encoding(str(caminho)) == 'latin-1'
+
+
+def test_carga_com_tabela_de_orgaos(tmp_path):
+    caminho = tmp_path / 'servidores.csv'
+    caminho.write_bytes(('"ÓRGÃO";NOME;CARGO;"SALÁRIO";CARGO\n'
+                         'SEFAZ;JOSÉ;AUDITOR;"1234,50";X\n'
+                         'SEDU;ANA;PROFESSORA;abc;X\n'
+                         'SEFAZ;BIA;ANALISTA;10,5;X\n').encode('latin-1'))
+    orgaos_consultados = []
+
+    def obter_orgaos(orgaos):
+        orgaos_consultados.extend(orgaos)
+        return pd.DataFrame([('SEFAZ', 'sefaz', 'sefaz.teste.gov.br')], columns=['ORGAO', 'SIGLA', 'DOMINIO'])
+
+    ingestao = IngestaoCSV(str(caminho), {'ÓRGÃO': 'ORGAO', 1: 'NOME', 'SALÁRIO': 'SALARIO'}, CONSULTA, delimitador=';',
+                           decimal=',', numericas=['SALARIO'], fn_obter_orgaos=obter_orgaos)
+    con = duckdb.connect(str(tmp_path / 'teste.db'))
+    try:
+        consulta, parametros = ingestao.preparar(con)
+        rows = con.execute(consulta, parametros).fetchall()
+    finally:
+        ingestao.liberar(con)
+
+    assert sorted(orgaos_consultados) == ['SEDU', 'SEFAZ']
+    assert rows == [('BIA', 10.5, 'SEFAZ', 'sefaz', 'sefaz.teste.gov.br'), ('JOSÉ', 1234.5, 'SEFAZ', 'sefaz', 'sefaz.teste.gov.br')]
+    assert con.execute("SELECT count(*) FROM duckdb_tables() WHERE temporary").fetchone()[0] == 0
+    assert not caminho.exists()
+    con.close()
@@ -0,0 +1,154 @@
+import zipfile
+import pandas as pd
+import pytest
+from commons.planilhas import iterar_linhas_ods, ler_ods, iterar_linhas_xlsx, ler_xlsx_em_blocos, converter_decimal
+
+
+def _celula_ods(valor=None, repeticoes=1):
+    from odf.table import TableCell
+    from odf.text import P
+
+    atributos = {'numbercolumnsrepeated': repeticoes} if repeticoes > 1 else {}
+    if valor is None:
+        return TableCell(**atributos)
+    if isinstance(valor, float):
+        celula = TableCell(valuetype='float', value=valor, **atributos)
+    else:
+        celula = TableCell(valuetype='string', **atributos)
+    celula.addElement(P(text=str(valor)))
+    return celula
+
+
+def _normalizar(df):
+    # Células vazias como None em todas as colunas, para comparar leituras que usam None ou NaN
+    return df.astype(object).where(df.notna(), None)
+
+
+@pytest.fixture
+def arquivo_ods(tmp_path):
+    pytest.importorskip('odf')
+    from odf.opendocument import OpenDocumentSpreadsheet
+    from odf.table import Table, TableRow
+
+    documento = OpenDocumentSpreadsheet()
+    # Linhas: (valores, repetições da linha); (valor, n) são células repetidas na linha
+    planilhas = {
+        'Capa': [(['RELATORIO'], 1)],
+        'Dados': [
+            (['NOME', 'CARGO', 'VALOR', 'TEXTO', 'SIGLA'], 1),
+            (['ANA', None, 1234.5, '1.234,56', ('SEFAZ', 1)], 1),
+            (['BIA', 'TECNICO', None, '7,5', None], 2),
+            ([None, 'ANALISTA', 3.0, None, None], 1),
+            ([('JOSE', 2), (10.0, 2), 'SEDU'], 1),
+        ],
+    }
+    for nome, linhas in planilhas.items():
+        tabela = Table(name=nome)
+        for valores, repeticoes in linhas:
+            linha = TableRow(numberrowsrepeated=repeticoes) if repeticoes > 1 else TableRow()
+            for valor in valores:
+                linha.addElement(_celula_ods(*valor) if isinstance(valor, tuple) else _celula_ods(valor))
+            # Como nos arquivos gerados pelo LibreOffice, a linha termina com as células vazias repetidas até a última coluna
+            linha.addElement(_celula_ods(None, 1024))
+            tabela.addElement(linha)
+        documento.spreadsheet.addElement(tabela)
+
+    caminho = str(tmp_path / 'planilha.ods')
+    documento.save(caminho)
+    return caminho
+
+
+def test_ods_igual_ao_read_excel(arquivo_ods):
+    esperado = pd.read_excel(arquivo_ods, sheet_name='Dados', engine='odf')
+
+    pd.testing.assert_frame_equal(_normalizar(ler_ods(arquivo_ods, planilha='Dados')), _normalizar(esperado))
+    pd.testing.assert_frame_equal(_normalizar(ler_ods(arquivo_ods, planilha=1, colunas=['VALOR', 3])), _normalizar(esperado[['VALOR', 'TEXTO']]))
+
+
+def test_ods_expande_celulas_e_linhas_repetidas(arquivo_ods):
+    linhas = list(iterar_linhas_ods(arquivo_ods, planilha='Dados'))
+
+    assert linhas[2] == linhas[3] == ['BIA', 'TECNICO', None, '7,5']
+    assert linhas[5] == ['JOSE', 'JOSE', 10.0, 10.0, 'SEDU']
+    assert list(iterar_linhas_ods(arquivo_ods, planilha='Capa')) == [['RELATORIO']]
+    with pytest.raises(ValueError):
+        list(iterar_linhas_ods(arquivo_ods, planilha='Inexistente'))
+
+
+NS_XLSX = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_RELACIONAMENTOS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+TIPO_PLANILHA = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+# Textos compartilhados, o índice 6 é um texto com formatação (rich text) dividido em trechos
+TEXTOS_XLSX = ['NOME', 'CARGO', 'VALOR', 'SALARIO', 'SIGLA', 'ANA', None, '1.234,56', 'SEFAZ', 'TECNICO', '7,5', 'SEDU']
+LINHAS_XLSX = (
+    '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c><c r="C1" t="s"><v>2</v></c>'
+    '<c r="D1" t="s"><v>3</v></c><c r="E1" t="s"><v>4</v></c></row>'
+    # Célula vazia (B2) omitida, como grava o Excel
+    '<row r="2"><c r="A2" t="s"><v>5</v></c><c r="C2"><v>1234.5</v></c><c r="D2" t="s"><v>7</v></c><c r="E2" t="s"><v>8</v></c></row>'
+    # Linha totalmente vazia, apenas com estilo
+    '<row r="3"><c r="A3" s="1"/></row>'
+    # Células sem referência (r), posicionadas em sequência, e texto em linha (inlineStr)
+    '<row r="4"><c t="s"><v>6</v></c><c t="inlineStr"><is><t>ANALISTA</t></is></c><c t="e"><v>#N/A</v></c><c t="s"><v>10</v></c><c t="s"><v>8</v></c></row>'
+    '<row r="5"><c r="B5" t="s"><v>9</v></c><c r="C5"><v>3</v></c><c r="D5" t="s"><v>7</v></c><c r="E5" t="s"><v>11</v></c></row>'
+)
+
+
+def _texto_compartilhado(texto):
+    if texto is None:
+        return '<si><r><t>JOSE </t></r><r><rPr><b/></rPr><t>SILVA</t></r><rPh sb="0" eb="4"><t>X</t></rPh></si>'
+    return f'<si><t>{texto}</t></si>'
+
+
+@pytest.fixture
+def arquivo_xlsx(tmp_path):
+    # Pacote XLSX mínimo montado à mão, com tabela de textos compartilhados (o openpyxl grava os textos em linha)
+    arquivos = {
+        '[Content_Types].xml': (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="{TIPO_PLANILHA}"/>'
+            f'<Override PartName="/xl/worksheets/sheet2.xml" ContentType="{TIPO_PLANILHA}"/>'
+            '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+            '</Types>'),
+        '_rels/.rels': (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{NS_RELACIONAMENTOS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'),
+        'xl/workbook.xml': (
+            f'<workbook xmlns="{NS_XLSX}" xmlns:r="{NS_RELACIONAMENTOS}"><sheets>'
+            '<sheet name="Capa" sheetId="1" r:id="rId1"/><sheet name="Dados" sheetId="2" r:id="rId2"/></sheets></workbook>'),
+        'xl/_rels/workbook.xml.rels': (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{NS_RELACIONAMENTOS}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{NS_RELACIONAMENTOS}/worksheet" Target="/xl/worksheets/sheet2.xml"/>'
+            f'<Relationship Id="rId3" Type="{NS_RELACIONAMENTOS}/sharedStrings" Target="sharedStrings.xml"/></Relationships>'),
+        'xl/sharedStrings.xml': f'<sst xmlns="{NS_XLSX}">' + ''.join(_texto_compartilhado(texto) for texto in TEXTOS_XLSX) + '</sst>',
+        'xl/worksheets/sheet1.xml': f'<worksheet xmlns="{NS_XLSX}"><sheetData><row r="1"><c r="A1" t="inlineStr"><is><t>RELATORIO</t></is></c></row></sheetData></worksheet>',
+        'xl/worksheets/sheet2.xml': f'<worksheet xmlns="{NS_XLSX}"><sheetData>{LINHAS_XLSX}</sheetData></worksheet>',
+    }
+    caminho = str(tmp_path / 'planilha.xlsx')
+    with zipfile.ZipFile(caminho, 'w') as zip_file:
+        for nome, conteudo in arquivos.items():
+            zip_file.writestr(nome, conteudo)
+    return caminho
+
+
+def test_xlsx_igual_ao_read_excel(arquivo_xlsx):
+    pytest.importorskip('openpyxl')
+    esperado = pd.read_excel(arquivo_xlsx, sheet_name='Dados', thousands='.', decimal=',')
+    # Linhas vazias são descartadas na leitura incremental
+    esperado = esperado.dropna(how='all').reset_index(drop=True)
+
+    lido = pd.concat(ler_xlsx_em_blocos(arquivo_xlsx, 2, planilha='Dados', numericas=[3]), ignore_index=True)
+
+    pd.testing.assert_frame_equal(_normalizar(lido), _normalizar(esperado))
+
+
+def test_xlsx_textos_compartilhados_e_colunas_selecionadas(arquivo_xlsx):
+    linhas = list(iterar_linhas_xlsx(arquivo_xlsx, planilha=1, colunas=[3, 0]))
+
+    assert linhas == [['SALARIO', 'NOME'], ['1.234,56', 'ANA'], ['7,5', 'JOSE SILVA'], ['1.234,56', None]]
+    assert list(iterar_linhas_xlsx(arquivo_xlsx, planilha='Capa')) == [['RELATORIO']]
+    assert [converter_decimal(linha[0]) for linha in linhas[1:]] == [1234.56, 7.5, 1234.56]
@@ -0,0 +1,48 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from commons.HTTPRequestManager import HTTPRequestManager, estatisticas_pool
+
+
+class _Portal(BaseHTTPRequestHandler):
+    def do_GET(self):
+        corpo = (self.headers.get('Cookie') or '').encode()
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'sessao=dominio-a; Path=/')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal():
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), _Portal)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{servidor.server_address[1]}'
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_cookies_nao_vazam_entre_dominios(portal):
+    HTTPRequestManager(dominio='a.gov.br').get(f'{portal}/login')
+
+    response = HTTPRequestManager(dominio='b.gov.br').get(f'{portal}/dados')
+
+    assert response.text == ''
+
+
+def test_estatisticas_contabilizadas_pelo_gerenciador(portal):
+    cliente = HTTPRequestManager(dominio='a.gov.br')
+    for _ in range(3):
+        cliente.get(f'{portal}/dados')
+
+    estatisticas = estatisticas_pool()[portal]
+
+    assert estatisticas["requisicoes"] == 3
+    assert estatisticas["em_andamento"] == 0
+    assert estatisticas["pico_simultaneas"] == 1
+    assert estatisticas["tamanho_pool"] > 0